@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import ( 
     AvailabilitySchedule, TimeOff, Appointment,
-    MedicalRecord, Prescription, Notification
+    MedicalRecord, Prescription, ActiveMedication, DoctorDailyStats, Notification, WaitlistEntry
 )
 
 class AvailabilityScheduleAdmin(admin.ModelAdmin):
@@ -31,13 +31,13 @@ class AppointmentAdmin(admin.ModelAdmin):
 
 
 class MedicalRecordAdmin(admin.ModelAdmin):
-    list_display = ('doctor', 'record_type', 'title', 'date_recorded', 'is_sensitive')
+    list_display = ('patient', 'doctor', 'record_type', 'title', 'date_recorded', 'is_sensitive')
     list_filter = ('record_type', 'is_sensitive', 'date_recorded', 'doctor')
     search_fields = (
         'patient__user__first_name', 'patient__user__last_name',
         'doctor__user__first_name', 'doctor__user__last_name', 'title', 'description'
     )
-    raw_id_fields = ('doctor', 'appointment')
+    raw_id_fields = ('patient', 'doctor', 'appointment')
     date_hierarchy = 'date_recorded'
 
 
@@ -53,6 +53,29 @@ class PrescriptionAdmin(admin.ModelAdmin):
     date_hierarchy = 'start_date'
 
 
+class ActiveMedicationAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'medication_name', 'dosage', 'end_date', 'refills_remaining')
+    list_filter = ('end_date',)
+    search_fields = ('patient__user__first_name', 'patient__user__last_name', 'medication_name')
+    raw_id_fields = ('prescription', 'patient')
+
+
+class DoctorDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('doctor', 'date', 'appointments', 'booked_minutes', 'completed', 'cancelled', 'no_show')
+    list_filter = ('date',)
+    search_fields = ('doctor__user__first_name', 'doctor__user__last_name')
+    raw_id_fields = ('doctor',)
+    date_hierarchy = 'date'
+
+
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'doctor', 'specialization', 'earliest_start', 'latest_end', 'status', 'offer_expires_at')
+    list_filter = ('status', 'specialization')
+    search_fields = ('patient__user__first_name', 'patient__user__last_name', 'reason')
+    raw_id_fields = ('patient', 'doctor', 'offered_doctor', 'appointment')
+    date_hierarchy = 'created_at'
+
+
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'message_short', 'is_read', 'created_at')
     list_filter = ('is_read', 'created_at')
@@ -69,4 +92,7 @@ admin.site.register(TimeOff, TimeOffAdmin)
 admin.site.register(Appointment, AppointmentAdmin)
 admin.site.register(MedicalRecord, MedicalRecordAdmin)
 admin.site.register(Prescription, PrescriptionAdmin)
+admin.site.register(ActiveMedication, ActiveMedicationAdmin)
+admin.site.register(DoctorDailyStats, DoctorDailyStatsAdmin)
+admin.site.register(WaitlistEntry, WaitlistEntryAdmin)
 admin.site.register(Notification, NotificationAdmin)
\ No newline at end of file
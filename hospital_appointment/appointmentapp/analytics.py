@@ -0,0 +1,276 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from users.models import Doctor
+from .models import Appointment, AvailabilitySchedule, DoctorDailyStats
+from .projections import full_name
+
+COUNTERS = ('appointments', 'booked_minutes', 'completed', 'cancelled', 'no_show')
+STATUS_COUNTERS = {'COMPLETED': 'completed', 'CANCELLED': 'cancelled', 'NO_SHOW': 'no_show'}
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+
+
+def stats_date(value):
+    """Day an appointment is counted on: its start in the hospital time zone, whatever zone the request activated"""
+    return timezone.localtime(value, timezone.get_default_timezone()).date()
+
+
+def _as_datetime(value):
+    # Views may assign the raw request string before saving, which the field parses on save
+    value = Appointment._meta.get_field('scheduled_time').to_python(value)
+    return value if timezone.is_aware(value) else timezone.make_aware(value, timezone.get_default_timezone())
+
+
+def snapshot(appointment):
+    """The rollup row key and counters one appointment contributes, taken before and after a change.
+
+    Returns ((doctor_id, date), counters), or None for no appointment.
+    """
+    if appointment is None:
+        return None
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters['appointments'] = 1
+    if appointment.status in STATUS_COUNTERS:
+        counters[STATUS_COUNTERS[appointment.status]] = 1
+    scheduled_time = _as_datetime(appointment.scheduled_time)
+    if appointment.status != 'CANCELLED':
+        counters['booked_minutes'] = int((_as_datetime(appointment.end_time) - scheduled_time).total_seconds() // 60)
+    return (appointment.doctor_id, stats_date(scheduled_time)), counters
+
+
+def apply_appointment_changes(changes):
+    """Apply (before, after) snapshot pairs to the rollup, merged into one update per affected row"""
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for before, after in changes:
+        for side, sign in ((before, -1), (after, 1)):
+            if side is not None:
+                key, counters = side
+                for field, value in counters.items():
+                    deltas[key][field] += sign * value
+    for (doctor_id, day), counters in deltas.items():
+        changed = {field: value for field, value in counters.items() if value}
+        if changed:
+            _increment(doctor_id, day, changed)
+
+
+def apply_appointment_change(before, after):
+    """Move one appointment's contribution from `before` to `after`; None stands for created or deleted"""
+    apply_appointment_changes([(before, after)])
+
+
+def _increment(doctor_id, day, changed):
+    rows = DoctorDailyStats.objects.filter(doctor_id=doctor_id, date=day)
+    increments = {field: F(field) + value for field, value in changed.items()}
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DoctorDailyStats.objects.create(doctor_id=doctor_id, date=day, **changed)
+    except IntegrityError:
+        # Another request created the row between our update and insert
+        rows.update(**increments)
+
+
+def parse_range(start=None, end=None):
+    """(start, end) dates from YYYY-MM-DD strings, the last DEFAULT_RANGE_DAYS days by default"""
+    try:
+        end = date.fromisoformat(end) if end else timezone.localdate()
+        start = date.fromisoformat(start) if start else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        raise ValueError('start and end must be dates in YYYY-MM-DD format')
+    if start > end:
+        raise ValueError('start must not be after end')
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'The range cannot exceed {MAX_RANGE_DAYS} days')
+    return start, end
+
+
+def _minutes_between(start, end):
+    return max(0, (datetime.combine(date.min, end) - datetime.combine(date.min, start)).seconds // 60)
+
+
+def available_minutes(start, end, doctor_ids=None):
+    """{(doctor_id, date): minutes} from the weekly schedules valid on each day of the range.
+
+    Schedules are a few rows per doctor, so they are expanded here instead of being stored per day.
+    """
+    schedules = AvailabilitySchedule.objects.filter(valid_from__lte=end).filter(
+        Q(valid_until__isnull=True) | Q(valid_until__gte=start)
+    )
+    if doctor_ids is not None:
+        schedules = schedules.filter(doctor_id__in=doctor_ids)
+    by_weekday = defaultdict(list)
+    for doctor_id, weekday, start_time, end_time, valid_from, valid_until in schedules.values_list(
+        'doctor_id', 'day_of_week', 'start_time', 'end_time', 'valid_from', 'valid_until'
+    ):
+        by_weekday[weekday].append((doctor_id, valid_from, valid_until, _minutes_between(start_time, end_time)))
+
+    available = defaultdict(int)
+    day = start
+    while day <= end:
+        for doctor_id, valid_from, valid_until, minutes in by_weekday[day.weekday()]:
+            if valid_from <= day and (valid_until is None or day <= valid_until):
+                available[(doctor_id, day)] += minutes
+        day += timedelta(days=1)
+    return available
+
+
+def _with_rates(row):
+    appointments = row['appointments']
+    row['utilization'] = round(row['booked_minutes'] / row['available_minutes'], 4) if row['available_minutes'] else None
+    row['no_show_rate'] = round(row['no_show'] / appointments, 4) if appointments else None
+    row['cancellation_rate'] = round(row['cancelled'] / appointments, 4) if appointments else None
+    return row
+
+
+def _totals():
+    return {field: Sum(field, default=0) for field in COUNTERS}
+
+
+def doctor_daily(doctor_id, start, end):
+    """One row per day of the range for a doctor, including days with availability but no appointments"""
+    stats = {
+        row['date']: row
+        for row in DoctorDailyStats.objects.filter(doctor_id=doctor_id, date__gte=start, date__lte=end)
+        .values('date', *COUNTERS)
+    }
+    available = available_minutes(start, end, [doctor_id])
+    rows = []
+    day = start
+    while day <= end:
+        row = stats.get(day) or {'date': day, **dict.fromkeys(COUNTERS, 0)}
+        row['available_minutes'] = available.get((doctor_id, day), 0)
+        if row['appointments'] or row['available_minutes']:
+            rows.append(_with_rates(row))
+        day += timedelta(days=1)
+    return rows
+
+
+def doctor_summary(start, end, doctor_ids=None):
+    """Range totals and rates per doctor, busiest first"""
+    stats = DoctorDailyStats.objects.filter(date__gte=start, date__lte=end)
+    if doctor_ids is not None:
+        stats = stats.filter(doctor_id__in=doctor_ids)
+    rows = list(
+        stats.values('doctor_id')
+        .annotate(doctor_name=full_name('doctor__user'), **_totals())
+        .order_by('-booked_minutes', 'doctor_id')
+    )
+    available = defaultdict(int)
+    for (doctor_id, _), minutes in available_minutes(start, end, doctor_ids).items():
+        available[doctor_id] += minutes
+    for row in rows:
+        row['available_minutes'] = available[row['doctor_id']]
+        _with_rates(row)
+    return rows
+
+
+def specialization_summary(start, end):
+    """Range totals and rates per specialization; a doctor counts towards each of their specializations"""
+    rows = list(
+        DoctorDailyStats.objects.filter(date__gte=start, date__lte=end, doctor__specializations__isnull=False)
+        .values(specialization_id=F('doctor__specializations__id'), specialization=F('doctor__specializations__name'))
+        .annotate(doctors=Count('doctor_id', distinct=True), **_totals())
+        .order_by('specialization')
+    )
+    available = defaultdict(int)
+    doctor_minutes = defaultdict(int)
+    for (doctor_id, _), minutes in available_minutes(start, end).items():
+        doctor_minutes[doctor_id] += minutes
+    for doctor_id, specialization_id in Doctor.specializations.through.objects.filter(
+        doctor_id__in=list(doctor_minutes)
+    ).values_list('doctor_id', 'specialization_id'):
+        available[specialization_id] += doctor_minutes[doctor_id]
+    for row in rows:
+        row['available_minutes'] = available[row['specialization_id']]
+        _with_rates(row)
+    return rows
+
+
+def rebuild_range(start, end, batch_size=5000):
+    """Recompute the rollup for the days start..end (inclusive) from Appointment in one transaction"""
+    zone = timezone.get_default_timezone()
+    lower = datetime.combine(start, time.min, tzinfo=zone)
+    upper = datetime.combine(end + timedelta(days=1), time.min, tzinfo=zone)
+    duration = ExpressionWrapper(F('end_time') - F('scheduled_time'), output_field=DurationField())
+    rows = (
+        Appointment.objects.filter(scheduled_time__gte=lower, scheduled_time__lt=upper)
+        .annotate(day=TruncDate('scheduled_time', tzinfo=zone))
+        .values('doctor_id', 'day')
+        .annotate(
+            appointments=Count('id'),
+            booked=Sum(duration, filter=~Q(status='CANCELLED')),
+            **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_COUNTERS.items()},
+        )
+        .order_by()
+    )
+    stats = [
+        DoctorDailyStats(
+            doctor_id=row['doctor_id'], date=row['day'], appointments=row['appointments'],
+            booked_minutes=int(row['booked'].total_seconds() // 60) if row['booked'] else 0,
+            completed=row['completed'], cancelled=row['cancelled'], no_show=row['no_show'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        DoctorDailyStats.objects.filter(date__gte=start, date__lte=end).delete()
+        DoctorDailyStats.objects.bulk_create(stats, batch_size=batch_size)
+    return len(stats)
+
+
+def _rebuild_chunk(bounds):
+    try:
+        return rebuild_range(*bounds)
+    finally:
+        # Worker threads each open their own connection
+        connection.close()
+
+
+def appointment_date_range():
+    """First and last local day with appointments, or None"""
+    bounds = Appointment.objects.aggregate(first=Min('scheduled_time'), last=Max('scheduled_time'))
+    if bounds['first'] is None:
+        return None
+    return stats_date(bounds['first']), stats_date(bounds['last'])
+
+
+def rebuild(start=None, end=None, workers=1, chunk_days=31, on_chunk=None):
+    """Recompute the rollup from scratch in date chunks, `workers` chunks at a time.
+
+    Without a range every day with appointments is rebuilt and rows outside it are dropped.
+    Chunks cover disjoint days, so they never contend for the same rows.
+    """
+    if start is None or end is None:
+        bounds = appointment_date_range()
+        if bounds is None:
+            DoctorDailyStats.objects.all().delete()
+            return 0
+        start, end = bounds
+        DoctorDailyStats.objects.filter(Q(date__lt=start) | Q(date__gt=end)).delete()
+
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(end, chunk_start + timedelta(days=chunk_days - 1))
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            counts = pool.map(_rebuild_chunk, chunks)
+    else:
+        counts = (rebuild_range(*chunk) for chunk in chunks)
+
+    total = 0
+    for chunk, count in zip(chunks, counts):
+        total += count
+        if on_chunk:
+            on_chunk(chunk, count)
+    return total
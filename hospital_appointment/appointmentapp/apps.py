@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AppointmentappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "appointmentapp"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import metrics
+
+        connection_created.connect(metrics.install_query_wrappers, dispatch_uid='appointmentapp.query_wrappers')
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from oauth2_provider.models import get_access_token_model
+from rest_framework import status as http_status
+
+from users.models import Doctor, Specialization
+from . import retention
+from .datetimes import parse_datetime
+from .models import AvailabilitySchedule, Notification
+from .notifications import newest_first
+from .renderers import ORJSONRenderer
+from .projections import (
+    AVAILABILITY_LIST_FIELDS, DOCTOR_LIST_FIELDS, NOTIFICATION_LIST_FIELDS, SPECIALIZATION_LIST_FIELDS,
+    aproject, requested_fields,
+)
+
+# Async variants of the hottest read endpoints, served under api/v1/async/. They return the compact
+# rows of the matching sync endpoint (?view=compact there) and accept the same ?fields= selection.
+# DRF has no async views, so bearer tokens are checked here through the async ORM.
+
+AccessToken = get_access_token_model()
+
+
+async def token_user(request, scopes=('read',)):
+    """User of a valid bearer token carrying `scopes`, or None, as OAuth2Authentication would decide"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    checksum = hashlib.sha256(token.strip().encode()).hexdigest()
+    access_token = await AccessToken.objects.select_related('user').filter(token_checksum=checksum).afirst()
+    if access_token is None or not access_token.is_valid(scopes):
+        return None
+    return access_token.user
+
+
+def async_get(view=None, *, public=False):
+    """Allow only GET on an async view and, unless `public`, require a bearer token with read scope"""
+    if view is None:
+        return lambda view: async_get(view, public=public)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(['GET'])
+        if not public:
+            user = await token_user(request)
+            if user is None:
+                return JsonResponse({'message': 'Authentication credentials were not provided or are invalid'},
+                                    status=http_status.HTTP_401_UNAUTHORIZED)
+            request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def rows_response(rows):
+    """Rows rendered like the sync compact views. JsonResponse would cut datetimes to milliseconds,
+    so a client passing the last created_at back as ?since= would get that row again"""
+    return HttpResponse(ORJSONRenderer().render(rows), content_type='application/json')
+
+
+async def list_response(request, queryset, spec):
+    try:
+        fields = requested_fields(request.GET, spec)
+    except ValueError as e:
+        return JsonResponse({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+    return rows_response(await aproject(queryset, spec, fields))
+
+
+@async_get
+async def notifications(request):
+    """Unread notifications of the caller. With ?wait=<seconds> it long-polls until there is one to return"""
+    try:
+        fields = requested_fields(request.GET, NOTIFICATION_LIST_FIELDS)
+        wait = min(max(int(request.GET.get('wait', 0)), 0), settings.ASYNC_LONG_POLL_MAX_SECONDS)
+        since = parse_datetime(request.GET['since']) if request.GET.get('since') else None
+    except ValueError as e:
+        return JsonResponse({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+
+    unread = Notification.objects.filter(user=request.user, is_read=False)
+    window_start = retention.unread_window_start()
+    if window_start is not None:
+        unread = unread.filter(created_at__gte=window_start)
+    if since is not None:
+        # Digests merged into since then count as new
+        unread = unread.filter(Q(created_at__gt=since) | Q(last_event_at__gt=since))
+    unread = newest_first(unread)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        rows = await aproject(unread, NOTIFICATION_LIST_FIELDS, fields)
+        if rows or loop.time() >= deadline:
+            return rows_response(rows)
+        # Sleeping holds no thread or database connection, unlike a sync view
+        await asyncio.sleep(min(settings.ASYNC_LONG_POLL_INTERVAL_SECONDS, max(deadline - loop.time(), 0)))
+
+
+@async_get
+async def doctors(request):
+    return await list_response(request, Doctor.objects.all(), DOCTOR_LIST_FIELDS)
+
+
+@async_get(public=True)
+async def specializations(request):
+    return await list_response(request, Specialization.objects.all(), SPECIALIZATION_LIST_FIELDS)
+
+
+@async_get
+async def availability_schedules(request):
+    return await list_response(request, AvailabilitySchedule.objects.all(), AVAILABILITY_LIST_FIELDS)
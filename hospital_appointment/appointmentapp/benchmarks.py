@@ -0,0 +1,209 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application
+from rest_framework.renderers import JSONRenderer
+
+from appointmentapp.renderers import ORJSONRenderer
+
+from appointmentapp.metrics import QueryTimer
+from users.models import Doctor, Patient, UserDetails
+
+BASELINE_DIR = Path(settings.BASE_DIR) / 'benchmarks'
+
+
+class Scenario:
+    """A single endpoint call to benchmark"""
+
+    def __init__(self, name, method, path, data=None, user='doctor'):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.user = user
+
+
+class BenchmarkContext:
+    """Users, tokens and fixtures resolved from the current database"""
+
+    def __init__(self):
+        self.doctor = (
+            Doctor.objects.filter(appointments__isnull=False).select_related('user').first()
+            or Doctor.objects.select_related('user').first()
+        )
+        self.admin = UserDetails.objects.filter(user_type='ADMIN').first()
+        self.patient = Patient.objects.select_related('user').first()
+        if not self.doctor or not self.patient:
+            raise ValueError('The database needs at least one doctor and one patient, run seed_hospital first')
+
+        application, _ = Application.objects.get_or_create(
+            name='benchmark',
+            defaults={'client_type': Application.CLIENT_CONFIDENTIAL,
+                      'authorization_grant_type': Application.GRANT_PASSWORD},
+        )
+        self.tokens = {'doctor': self.issue_token(application, self.doctor.user)}
+        if self.admin:
+            self.tokens['admin'] = self.issue_token(application, self.admin)
+        self.host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*',) and not host.startswith('.')), 'localhost')
+        self.client = Client(HTTP_HOST=self.host)
+        self.booking_slot = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=3650)
+
+    def issue_token(self, application, user):
+        return AccessToken.objects.create(
+            user=user, application=application, token=f'benchmark-{user.pk}-{time.time_ns()}',
+            expires=timezone.now() + timedelta(hours=1), scope='read write',
+        ).token
+
+    def next_booking(self):
+        """A unique far-future slot so repeated bookings never collide"""
+        self.booking_slot += timedelta(hours=1)
+        end = self.booking_slot + timedelta(minutes=30)
+        return {
+            'patient_id': self.patient.id,
+            'scheduled_time': timezone.localtime(self.booking_slot).strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': timezone.localtime(end).strftime('%Y-%m-%d %H:%M:%S'),
+            'reason': 'Benchmark booking',
+            'notes': 'Benchmark booking',
+        }
+
+    def scenarios(self):
+        search_term = (self.patient.user.last_name or self.patient.user.first_name or 'a')[:3]
+        return [
+            Scenario('appointment_list', 'get', '/api/v1/appointment/'),
+            Scenario('appointment_list_compact', 'get', '/api/v1/appointment/?view=compact'),
+            Scenario('appointment_book', 'post', '/api/v1/appointment/', data=self.next_booking),
+            Scenario('medical_record_list', 'get', '/api/v1/all-medical-record/'),
+            Scenario('prescription_list', 'get', '/api/v1/all-prescription/'),
+            Scenario('patient_timeline', 'get', f'/api/v1/patients/{self.patient.id}/timeline/'),
+            Scenario('patient_search', 'get', f'/api/v1/auth/patients/search/?q={search_term}'),
+            Scenario('doctor_list', 'get', '/api/v1/auth/doctor-list/'),
+            Scenario('notification_list', 'get', '/api/v1/notification/'),
+        ]
+
+    def call(self, scenario):
+        token = self.tokens.get(scenario.user) or self.tokens['doctor']
+        kwargs = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        if scenario.data is not None:
+            data = scenario.data() if callable(scenario.data) else scenario.data
+            kwargs.update(data=json.dumps(data), content_type='application/json')
+        return getattr(self.client, scenario.method)(scenario.path, **kwargs)
+
+
+def run_scenario(context, scenario, iterations, warmup):
+    """Call a scenario repeatedly and summarise latency, query count and payload size"""
+    timings, queries, sizes, statuses = [], [], [], {}
+    for i in range(warmup + iterations):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = context.call(scenario)
+        elapsed = time.perf_counter() - start
+        if i < warmup:
+            continue
+        timings.append(elapsed * 1000)
+        queries.append(timer.count)
+        sizes.append(len(response.content))
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return summarise(timings, queries, sizes, statuses)
+
+
+RENDERERS = [('json', JSONRenderer), ('orjson', ORJSONRenderer)]
+
+
+def run_renderer_comparison(context, iterations, warmup):
+    """Time each renderer encoding the response data of every GET scenario"""
+    results = {}
+    for scenario in context.scenarios():
+        if scenario.method != 'get':
+            continue
+        data = getattr(context.call(scenario), 'data', None)
+        if data is None:
+            continue
+        for label, renderer_class in RENDERERS:
+            renderer = renderer_class()
+            timings, sizes = [], []
+            for i in range(warmup + iterations):
+                start = time.perf_counter()
+                content = renderer.render(data, 'application/json')
+                elapsed = time.perf_counter() - start
+                if i >= warmup:
+                    timings.append(elapsed * 1000)
+                    sizes.append(len(content))
+            results[f'{scenario.name}[{label}]'] = summarise(timings, sizes=sizes)
+    return results
+
+
+def summarise(timings, queries=(), sizes=(), statuses=None):
+    ordered = sorted(timings)
+    return {
+        'iterations': len(ordered),
+        'min_ms': round(ordered[0], 3),
+        'median_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'max_ms': round(ordered[-1], 3),
+        'queries': round(statistics.mean(queries), 1) if queries else 0,
+        'bytes': int(statistics.mean(sizes)) if sizes else 0,
+        'statuses': {str(code): count for code, count in sorted((statuses or {}).items())},
+    }
+
+
+def baseline_path(name):
+    path = Path(name)
+    if path.suffix != '.json':
+        path = BASELINE_DIR / f'{name}.json'
+    return path
+
+
+def save_baseline(name, results):
+    path = baseline_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {'created_at': timezone.now().isoformat(), 'database': connection.vendor, 'results': results}
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True))
+    return path
+
+
+def load_baseline(name):
+    return json.loads(baseline_path(name).read_text())['results']
+
+
+def compare(results, baseline, threshold):
+    """Rows of (name, current median, baseline median, change %, regressed) for shared scenarios"""
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            rows.append((name, current['median_ms'], None, None, False))
+            continue
+        change = (current['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100 if previous['median_ms'] else 0.0
+        rows.append((name, current['median_ms'], previous['median_ms'], round(change, 1), change > threshold))
+    return rows
+
+
+def regressions(results, baseline, threshold=None):
+    """Descriptions of the scenarios that got worse than their baseline.
+
+    More queries per call or a different set of status codes always count. Latency is only
+    checked with a `threshold` (median slowdown in %), as it depends on the machine.
+    """
+    problems = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if sorted(current['statuses']) != sorted(previous['statuses']):
+            problems.append(f'{name}: statuses {sorted(current["statuses"])}, baseline {sorted(previous["statuses"])}')
+        if current['queries'] > previous['queries']:
+            problems.append(f'{name}: {current["queries"]} queries per call, baseline {previous["queries"]}')
+    if threshold is not None:
+        problems.extend(
+            f'{name}: median {current} ms, baseline {previous} ms ({change:+}%)'
+            for name, current, previous, change, regressed in compare(results, baseline, threshold) if regressed
+        )
+    return problems
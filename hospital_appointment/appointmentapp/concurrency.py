@@ -0,0 +1,99 @@
+from drf_yasg import openapi
+from rest_framework import status as http_status
+from rest_framework.response import Response
+
+IF_MATCH_PARAMETER = openapi.Parameter(
+    name='If-Match',
+    in_=openapi.IN_HEADER,
+    type=openapi.TYPE_STRING,
+    required=False,
+    description='ETag from a previous read, e.g. "3". The update is refused with 412 if the record changed since'
+)
+
+PREFER_PARAMETER = openapi.Parameter(
+    name='Prefer',
+    in_=openapi.IN_HEADER,
+    type=openapi.TYPE_STRING,
+    required=False,
+    description='return=minimal to get 204 No Content instead of the updated record'
+)
+
+
+def etag(instance):
+    return f'"{instance.version}"'
+
+
+def with_etag(response, instance):
+    """Attach the ETag of `instance` to `response`"""
+    response['ETag'] = etag(instance)
+    return response
+
+
+def expected_version(request):
+    """Version named by the If-Match header, None when it is absent or '*'. Raises ValueError if malformed"""
+    value = request.headers.get('If-Match', '').strip()
+    if value in ('', '*'):
+        return None
+    if value.startswith('W/'):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise ValueError('If-Match must be an ETag returned by this API, e.g. "3"')
+
+
+def precondition_failed(instance):
+    """412 response carrying the record's current ETag, so the client can reload it and retry"""
+    response = Response(
+        {'message': 'This record was changed by another request. Reload it and try again'},
+        status=http_status.HTTP_412_PRECONDITION_FAILED
+    )
+    version = type(instance).objects.filter(pk=instance.pk).values_list('version', flat=True).first()
+    if version is not None:
+        response['ETag'] = f'"{version}"'
+    return response
+
+
+def check_if_match(request, instance):
+    """412 response when If-Match names another version than `instance` was read at, otherwise None"""
+    expected = expected_version(request)
+    if expected is not None and expected != instance.version:
+        return precondition_failed(instance)
+    return None
+
+
+def assign(instance, values):
+    """Set the values that are given and differ from the instance; returns the changed names for update_fields.
+
+    None and empty strings are skipped, as the hand-parsed views read a missing field as data.get() -> None.
+    """
+    return _assign(instance, {name: value for name, value in values.items() if value is not None and value != ''})
+
+
+def assign_validated(instance, validated_data):
+    """assign() for serializer validated_data, where every key was sent, so None or '' clears the field"""
+    return _assign(instance, validated_data)
+
+
+def _assign(instance, values):
+    changed = []
+    for name, value in values.items():
+        field = instance._meta.get_field(name)
+        if not field.is_relation and value is not None:
+            value = field.to_python(value)
+        if getattr(instance, name) != value:
+            setattr(instance, name, value)
+            changed.append(name)
+    return changed
+
+
+def update_response(request, instance, serializer_class):
+    """Response to a successful update: 204 when the client prefers return=minimal, else the serialized record"""
+    if 'return=minimal' in request.headers.get('Prefer', ''):
+        response = Response(status=http_status.HTTP_204_NO_CONTENT)
+        response['Preference-Applied'] = 'return=minimal'
+    else:
+        response = Response(serializer_class(instance).data)
+    if hasattr(instance, 'version'):
+        with_etag(response, instance)
+    return response
@@ -0,0 +1,112 @@
+from datetime import datetime, tzinfo
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils import timezone
+
+DISPLAY_FORMAT = '%b %d, %Y %I:%M %p'
+INVALID_FORMAT = 'Invalid datetime format. Use ISO-8601, e.g. YYYY-MM-DD HH:MM:SS or YYYY-MM-DDTHH:MM:SS+03:00'
+TIMEZONE_HEADER = 'HTTP_X_TIMEZONE'
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """ZoneInfo for an IANA name, built once per process"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f'Unknown time zone {name}')
+
+
+def resolve_zone(tz=None):
+    if tz is None:
+        return timezone.get_current_timezone()
+    return tz if isinstance(tz, tzinfo) else get_zone(tz)
+
+
+def _parse(value, zone):
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = value.strip()
+        if text[-1:] in ('Z', 'z'):
+            # Only Python 3.11+ accepts the UTC designator
+            text = text[:-1] + '+00:00'
+        parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=zone)
+    return parsed
+
+
+def parse_datetime(value, tz=None):
+    """Timezone-aware datetime from ISO-8601 text, naive values are read in `tz` (default: the active time zone)"""
+    if not value:
+        raise ValueError('Datetime string is required')
+    try:
+        return _parse(value, resolve_zone(tz))
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError(INVALID_FORMAT)
+
+
+def parse_datetimes(values, tz=None, errors='raise'):
+    """parse_datetime over a batch, resolving the zone once and parsing repeated values once.
+
+    With errors='coerce' unparsable values become None instead of raising.
+    """
+    zone = resolve_zone(tz)
+    parsed = {}
+    results = []
+    for value in values:
+        key = value if isinstance(value, str) else id(value)
+        if key not in parsed:
+            try:
+                if not value:
+                    raise ValueError
+                parsed[key] = _parse(value, zone)
+            except (ValueError, TypeError, AttributeError):
+                if errors != 'coerce':
+                    raise ValueError(f'{INVALID_FORMAT}: {value!r}')
+                parsed[key] = None
+        results.append(parsed[key])
+    return results
+
+
+def format_local(value, tz=None, fmt=DISPLAY_FORMAT):
+    """Render an aware datetime in `tz` (default: the active time zone) for messages"""
+    return timezone.localtime(value, resolve_zone(tz)).strftime(fmt)
+
+
+class TimezoneMiddleware:
+    """Activate the clinic time zone sent in the X-Timezone header for the duration of the request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        zone = self.requested_zone(request)
+        if zone is None:
+            return self.get_response(request)
+        with timezone.override(zone):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        zone = self.requested_zone(request)
+        if zone is None:
+            return await self.get_response(request)
+        with timezone.override(zone):
+            return await self.get_response(request)
+
+    def requested_zone(self, request):
+        name = request.META.get(TIMEZONE_HEADER)
+        try:
+            return get_zone(name) if name else None
+        except ValueError:
+            return None
@@ -0,0 +1,188 @@
+import csv
+import gzip
+import os
+from datetime import date, datetime
+
+from django.utils import timezone
+
+from .models import Appointment, MedicalRecord, Prescription
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional, exports fall back to gzipped CSV
+    pyarrow = None
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class Dataset:
+    """One exported table: the columns to read and the column its output is partitioned by month on.
+
+    Columns are (name, lookup, type) with type one of int, str, bool, date, datetime. Free-text clinical
+    fields (reasons, notes, descriptions, instructions) are left out on purpose.
+    """
+
+    def __init__(self, name, model, columns, partition_by):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.partition_by = partition_by
+
+    @property
+    def column_names(self):
+        return [name for name, _, _ in self.columns]
+
+    def rows(self, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Tuples in partition order, streamed with a server-side cursor where the database supports one"""
+        queryset = self.model.objects.all()
+        if since is not None:
+            queryset = queryset.filter(updated_at__gt=since)
+        if until is not None:
+            queryset = queryset.filter(updated_at__lte=until)
+        return (
+            queryset.values_list(*[lookup for _, lookup, _ in self.columns])
+            .order_by(self.partition_by, 'id')
+            .iterator(chunk_size=chunk_size)
+        )
+
+    @property
+    def partition_index(self):
+        return [lookup for _, lookup, _ in self.columns].index(self.partition_by)
+
+    def month(self, value):
+        if isinstance(value, datetime):
+            value = timezone.localtime(value, timezone.get_default_timezone())
+        return value.strftime('%Y-%m')
+
+
+DATASETS = {
+    'appointments': Dataset('appointments', Appointment, [
+        ('id', 'id', 'int'),
+        ('patient_id', 'patient_id', 'int'),
+        ('doctor_id', 'doctor_id', 'int'),
+        ('scheduled_time', 'scheduled_time', 'datetime'),
+        ('end_time', 'end_time', 'datetime'),
+        ('status', 'status', 'str'),
+        ('created_at', 'created_at', 'datetime'),
+        ('updated_at', 'updated_at', 'datetime'),
+    ], partition_by='scheduled_time'),
+    'medical_records': Dataset('medical_records', MedicalRecord, [
+        ('id', 'id', 'int'),
+        ('patient_id', 'patient_id', 'int'),
+        ('doctor_id', 'doctor_id', 'int'),
+        ('appointment_id', 'appointment_id', 'int'),
+        ('record_type', 'record_type', 'str'),
+        ('date_recorded', 'date_recorded', 'date'),
+        ('is_sensitive', 'is_sensitive', 'bool'),
+        ('created_at', 'created_at', 'datetime'),
+        ('updated_at', 'updated_at', 'datetime'),
+    ], partition_by='created_at'),
+    'prescriptions': Dataset('prescriptions', Prescription, [
+        ('id', 'id', 'int'),
+        ('medical_record_id', 'medical_record_id', 'int'),
+        ('patient_id', 'medical_record__patient_id', 'int'),
+        ('medication_name', 'medication_name', 'str'),
+        ('dosage', 'dosage', 'str'),
+        ('frequency', 'frequency', 'str'),
+        ('start_date', 'start_date', 'date'),
+        ('end_date', 'end_date', 'date'),
+        ('refills_remaining', 'refills_remaining', 'int'),
+        ('updated_at', 'updated_at', 'datetime'),
+    ], partition_by='start_date'),
+}
+
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+class CSVPartWriter:
+    extension = 'csv.gz'
+
+    def __init__(self, path, dataset):
+        self.file = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(dataset.column_names)
+
+    def write(self, rows):
+        self.writer.writerows([_csv_value(value) for value in row] for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetPartWriter:
+    extension = 'parquet'
+
+    def __init__(self, path, dataset):
+        types = {
+            'int': pyarrow.int64(), 'str': pyarrow.string(), 'bool': pyarrow.bool_(),
+            'date': pyarrow.date32(), 'datetime': pyarrow.timestamp('us', tz='UTC'),
+        }
+        self.schema = pyarrow.schema([(name, types[kind]) for name, _, kind in dataset.columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows):
+        # One row group per chunk keeps memory bounded by the chunk size
+        columns = list(zip(*rows))
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'csv': CSVPartWriter, 'parquet': ParquetPartWriter}
+
+
+def default_format():
+    return 'parquet' if pyarrow is not None else 'csv'
+
+
+def export_dataset(dataset, out_dir, run_id, fmt=None, since=None, until=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write the rows of `dataset` changed in (since, until] under out_dir/<dataset>/month=YYYY-MM/.
+
+    Rows arrive in partition order, so only one file is open at a time and at most `chunk_size` rows
+    are held in memory. Every run writes its own part-<run_id> files; rows updated after an earlier
+    export appear again in a later part, and the latest updated_at per id wins.
+    Returns {month: row count}.
+    """
+    fmt = fmt or default_format()
+    if fmt == 'parquet' and pyarrow is None:
+        raise ValueError('Parquet export needs pyarrow installed, use the csv format instead')
+    writer_class = WRITERS[fmt]
+    partition_index = dataset.partition_index
+
+    counts = {}
+    writer, month, batch = None, None, []
+    try:
+        for row in dataset.rows(since, until, chunk_size):
+            row_month = dataset.month(row[partition_index])
+            if row_month != month:
+                if writer is not None:
+                    if batch:
+                        writer.write(batch)
+                    writer.close()
+                    writer = None
+                batch = []
+                month = row_month
+                directory = os.path.join(out_dir, dataset.name, f'month={month}')
+                os.makedirs(directory, exist_ok=True)
+                writer = writer_class(os.path.join(directory, f'part-{run_id}.{writer_class.extension}'), dataset)
+                counts[month] = 0
+            batch.append(row)
+            counts[month] += 1
+            if len(batch) >= chunk_size:
+                writer.write(batch)
+                batch = []
+        if writer is not None and batch:
+            writer.write(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return counts
@@ -0,0 +1,136 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from drf_yasg import openapi
+from rest_framework import status as http_status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+CLAIM_SECONDS = 60  # How long a request that never finished (e.g. a crashed worker) holds its key
+# Client errors that the same request would get again, e.g. a missing field. Anything else
+# (409 conflicts, 5xx, unstored() errors that depend on the current state) releases the key for a retry.
+STORED_CLIENT_ERRORS = {
+    http_status.HTTP_400_BAD_REQUEST, http_status.HTTP_403_FORBIDDEN,
+    http_status.HTTP_404_NOT_FOUND, http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+}
+
+IDEMPOTENCY_KEY_PARAMETER = openapi.Parameter(
+    name=HEADER,
+    in_=openapi.IN_HEADER,
+    type=openapi.TYPE_STRING,
+    required=False,
+    description='Unique value per create, e.g. a UUID. Retries with the same key return the original response '
+                'instead of creating a duplicate'
+)
+
+
+def _digest(*parts):
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else part.encode())
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def unstored(response):
+    """Mark an error response as not stored, for errors a retry may not get, e.g. a slot that is taken now"""
+    response.idempotent_store = False
+    return response
+
+
+def failed(exc):
+    """400 for an unexpected exception in an idempotent view. It is not stored, so a retry runs the view again"""
+    return unstored(Response({'message': str(exc)}, status=http_status.HTTP_400_BAD_REQUEST))
+
+
+def _storable(response):
+    if not getattr(response, 'idempotent_store', True):
+        return False
+    return 200 <= response.status_code < 300 or response.status_code in STORED_CLIENT_ERRORS
+
+
+def _claim(user, key, request_hash, now):
+    """Create the key row for this request, or return the unexpired row an earlier request left"""
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user=user, key=key, request_hash=request_hash, expires_at=now + timedelta(seconds=CLAIM_SECONDS)
+                )
+            return None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+            if existing is not None and existing.expires_at > now:
+                return existing
+            # Expired but not purged yet: drop it and claim again
+            IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+    raise IntegrityError('Could not claim the idempotency key')
+
+
+def idempotent(view_method):
+    """Let clients retry a create safely by sending an Idempotency-Key header.
+
+    The first request with a key runs the view and stores its response. Retries within
+    IDEMPOTENCY_KEY_TTL_HOURS get that response back without running the view again. Only
+    successes and validation errors are stored; conflicts, server errors and failed() or unstored()
+    responses release the key so they can be retried. Requests without the header are unaffected.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        raw_key = request.headers.get(HEADER)
+        if not raw_key:
+            return view_method(self, request, *args, **kwargs)
+        if len(raw_key) > MAX_KEY_LENGTH:
+            return Response({'message': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                            status=http_status.HTTP_400_BAD_REQUEST)
+
+        key = _digest(raw_key)
+        # The parsed payload, as authentication may already have consumed the raw body
+        request_hash = _digest(request.method, request.path, json.dumps(request.data, sort_keys=True, default=str))
+        now = timezone.now()
+        existing = _claim(request.user, key, request_hash, now)
+        if existing is not None:
+            if existing.request_hash != request_hash:
+                return Response({'message': f'This {HEADER} was already used for a different request'},
+                                status=http_status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if existing.status_code is None:
+                return Response({'message': f'A request with this {HEADER} is still being processed'},
+                                status=http_status.HTTP_409_CONFLICT)
+            response = Response(existing.response, status=existing.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        claimed = IdempotencyKey.objects.filter(user=request.user, key=key)
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            claimed.delete()
+            raise
+        if _storable(response):
+            claimed.update(
+                status_code=response.status_code, response=response.data,
+                expires_at=timezone.now() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+            )
+        else:
+            claimed.delete()
+        return response
+    return wrapper
+
+
+def purge_expired(batch_size=5000, now=None):
+    """Delete expired keys in batches so no single statement holds locks for long. Returns how many were deleted"""
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
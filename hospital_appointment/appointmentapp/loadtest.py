@@ -0,0 +1,292 @@
+import asyncio
+import json
+import random
+import ssl
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlsplit
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams, one per virtual user"""
+
+    def __init__(self, base_url, timeout):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.secure = url.scheme == 'https'
+        self.port = url.port or (443 if self.secure else 80)
+        self.host_header = url.netloc
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        context = ssl.create_default_context() if self.secure else None
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=None):
+        try:
+            return await asyncio.wait_for(self._request(method, path, headers or {}, body), self.timeout)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _request(self, method, path, headers, body):
+        if self.writer is None:
+            await self.connect()
+        payload = b''
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers = {**headers, 'Content-Type': 'application/json'}
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host_header}', f'Content-Length: {len(payload)}',
+                 'Accept: application/json']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by server')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = b''
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                content += await self.reader.readexactly(size)
+                await self.reader.readline()
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()
+            await self.close()
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+
+class StepStats:
+    """Latencies and outcomes of one step across all virtual users"""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, latency, status=None, error=None):
+        self.latencies.append(latency)
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        else:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, elapsed):
+        count = len(self.latencies)
+        ordered = sorted(self.latencies)
+        failed = sum(n for code, n in self.statuses.items() if code >= 400) + sum(self.errors.values())
+        return {
+            'requests': count,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0,
+            'error_rate': round(failed / count, 4) if count else 0,
+            'conflict_400_rate': round(self.statuses.get(400, 0) / count, 4) if count else 0,
+            'conflict_409_rate': round(self.statuses.get(409, 0) / count, 4) if count else 0,
+            'p50_ms': percentile(ordered, 50),
+            'p90_ms': percentile(ordered, 90),
+            'p99_ms': percentile(ordered, 99),
+            'max_ms': round(ordered[-1], 2) if ordered else 0,
+            'statuses': {str(code): n for code, n in sorted(self.statuses.items())},
+            'errors': self.errors,
+        }
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 2)
+
+
+class VirtualUser:
+    """Replays scenario flows for one account over a single keep-alive connection"""
+
+    def __init__(self, runner, account):
+        self.runner = runner
+        self.scenario = runner.scenario
+        self.account = account
+        self.connection = HttpConnection(self.scenario['base_url'], self.scenario.get('timeout', 30))
+        self.token = None
+        self.patient_ids = []
+        self.rng = random.Random()
+
+    async def call(self, step, method, path, body=None):
+        headers = {'Authorization': f'Bearer {self.token}'} if self.token and step != 'login' else {}
+        start = time.perf_counter()
+        try:
+            status, content = await self.connection.request(method, path, headers, body)
+        except Exception as e:
+            self.runner.stats(step).record((time.perf_counter() - start) * 1000, error=type(e).__name__)
+            return None, None
+        self.runner.stats(step).record((time.perf_counter() - start) * 1000, status=status)
+        if status == 401 and step != 'login':
+            self.token = None
+        return status, content
+
+    async def run(self, deadline):
+        flows = self.scenario['flows']
+        names = list(self.scenario['mix'])
+        weights = [self.scenario['mix'][name] for name in names]
+        try:
+            while time.monotonic() < deadline:
+                flow = self.rng.choices(names, weights)[0]
+                for step in flows[flow]:
+                    if time.monotonic() >= deadline:
+                        break
+                    if step != 'login' and self.token is None:
+                        await self.login()
+                        if self.token is None:
+                            break
+                    if step in self.scenario.get('requests', {}):
+                        await self.custom_step(step)
+                    else:
+                        await getattr(self, f'step_{step}')()
+                    think = self.scenario.get('think_time_ms', 0)
+                    if think:
+                        await asyncio.sleep(self.rng.uniform(0, think) / 1000)
+        finally:
+            await self.connection.close()
+
+    async def login(self):
+        status, content = await self.call('login', 'POST', '/api/v1/auth/login', self.account)
+        if status == 200:
+            self.token = json.loads(content)['access_token']
+        else:
+            # Back off so a bad account does not spin
+            await asyncio.sleep(1)
+
+    async def step_login(self):
+        await self.login()
+
+    async def step_patient_search(self):
+        term = quote(self.rng.choice(self.scenario.get('search_terms', ['a'])))
+        status, content = await self.call('patient_search', 'GET', f'/api/v1/auth/patients/search/?q={term}')
+        if status == 200:
+            found = [patient['id'] for patient in json.loads(content)]
+            if found:
+                self.patient_ids = found
+
+    async def step_availability(self):
+        await self.call('availability', 'GET', '/api/v1/doctor-availability-schedule/')
+
+    async def step_book(self):
+        booking = self.scenario.get('booking', {})
+        patient_id = self.rng.choice(self.patient_ids) if self.patient_ids else booking.get('fallback_patient_id')
+        if not patient_id:
+            return
+        slot_minutes = booking.get('slot_minutes', 30)
+        first_hour, last_hour = booking.get('hours', [8, 17])
+        # A narrow window of days keeps virtual users competing for the same slots
+        day = datetime.now().date() + timedelta(days=self.rng.randint(*booking.get('days_ahead', [1, 14])))
+        slots_per_day = (last_hour - first_hour) * 60 // slot_minutes
+        start = datetime.combine(day, datetime.min.time()) + timedelta(
+            hours=first_hour, minutes=slot_minutes * self.rng.randrange(slots_per_day)
+        )
+        await self.call('book', 'POST', '/api/v1/appointment/', {
+            'patient_id': patient_id,
+            'scheduled_time': start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': (start + timedelta(minutes=slot_minutes)).strftime('%Y-%m-%d %H:%M:%S'),
+            'reason': 'Load test booking',
+            'notes': 'Load test booking',
+        })
+
+    async def step_notifications(self):
+        await self.call('notifications', 'GET', '/api/v1/notification/')
+
+    async def custom_step(self, step):
+        request = self.scenario['requests'][step]
+        await self.call(step, request.get('method', 'GET'), request['path'], request.get('body'))
+
+
+class LoadTestRunner:
+    """Drive a scenario with a fixed number of concurrent virtual users"""
+
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.step_stats = {}
+
+    def stats(self, step):
+        if step not in self.step_stats:
+            self.step_stats[step] = StepStats()
+        return self.step_stats[step]
+
+    def accounts(self):
+        users = self.scenario.get('users')
+        if isinstance(users, dict):
+            return [
+                {'username': users['pattern'].format(i=i), 'password': users['password']}
+                for i in range(users.get('start', 0), users.get('start', 0) + users['count'])
+            ]
+        return users
+
+    async def run(self):
+        accounts = self.accounts()
+        concurrency = self.scenario['concurrency']
+        if len(accounts) < concurrency:
+            # Login revokes the account's other tokens, so virtual users cannot share accounts
+            raise ValueError(f'Scenario needs at least {concurrency} accounts, found {len(accounts)}')
+        ramp_up = self.scenario.get('ramp_up', 0)
+        start = time.monotonic()
+        deadline = start + ramp_up + self.scenario['duration']
+        tasks = []
+        for i, account in enumerate(accounts[:concurrency]):
+            tasks.append(asyncio.create_task(VirtualUser(self, account).run(deadline)))
+            if ramp_up:
+                await asyncio.sleep(ramp_up / concurrency)
+        await asyncio.gather(*tasks)
+        return self.report(time.monotonic() - start)
+
+    def report(self, elapsed):
+        steps = {step: stats.summary(elapsed) for step, stats in self.step_stats.items()}
+        total = sum(step['requests'] for step in steps.values())
+        return {
+            'elapsed_s': round(elapsed, 2),
+            'concurrency': self.scenario['concurrency'],
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+            'steps': steps,
+        }
+
+
+def load_scenario(path, overrides=None):
+    with open(path) as f:
+        scenario = json.load(f)
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            scenario[key] = value
+    known = {name[len('step_'):] for name in dir(VirtualUser) if name.startswith('step_')}
+    unknown = {step for flow in scenario['flows'].values() for step in flow} - known - set(scenario.get('requests', {}))
+    if unknown:
+        raise ValueError(f'Unknown steps in scenario: {", ".join(sorted(unknown))}')
+    return scenario
+
+
+def run(scenario):
+    return asyncio.run(LoadTestRunner(scenario).run())
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+
+from appointmentapp.models import Appointment, MedicalRecord
+
+
+class Command(BaseCommand):
+    help = 'Copy appointment.patient onto medical records that predate MedicalRecord.patient, in id batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Record ids covered per UPDATE')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to leave room for live traffic')
+        parser.add_argument('--start-id', type=int, default=None, help='Resume from this record id')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = MedicalRecord.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write('No medical records')
+            return
+
+        patient = Subquery(Appointment.objects.filter(id=OuterRef('appointment_id')).values('patient_id')[:1])
+        start = options['start_id'] or bounds['first']
+        updated = 0
+        # Walking the primary key keeps every batch a short range scan and a short transaction
+        while start <= bounds['last']:
+            end = start + batch_size
+            with transaction.atomic():
+                count = MedicalRecord.objects.filter(
+                    id__gte=start, id__lt=end, patient__isnull=True, appointment__isnull=False
+                ).update(patient_id=patient)
+            updated += count
+            self.stdout.write(f'ids {start}-{end - 1}: {count} updated')
+            start = end
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {updated} medical records'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from appointmentapp import waitlist
+
+
+class Command(BaseCommand):
+    help = 'Release waitlist offers that were not answered in time and offer each slot to the next patient'
+
+    def handle(self, *args, **options):
+        expired = waitlist.expire_offers()
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} waitlist offers'))
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointmentapp import loadtest
+
+DEFAULT_SCENARIO = Path(loadtest.__file__).resolve().parent / 'loadtest_scenarios' / 'booking.json'
+
+
+class Command(BaseCommand):
+    help = 'Replay booking traffic from a scenario file against a running server and report latency and errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', default=str(DEFAULT_SCENARIO), help='Scenario JSON file')
+        parser.add_argument('--base-url', help='Override the scenario base_url')
+        parser.add_argument('--concurrency', type=int, help='Override the number of virtual users')
+        parser.add_argument('--duration', type=int, help='Override the test duration in seconds')
+        parser.add_argument('--output', help='Also write the report as JSON to this file')
+
+    def handle(self, *args, **options):
+        try:
+            scenario = loadtest.load_scenario(options['scenario'], {
+                'base_url': options['base_url'],
+                'concurrency': options['concurrency'],
+                'duration': options['duration'],
+            })
+            self.stdout.write(
+                f'Running {Path(options["scenario"]).name} against {scenario["base_url"]} with '
+                f'{scenario["concurrency"]} virtual users for {scenario["duration"]}s'
+            )
+            report = loadtest.run(scenario)
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Load test failed: {e}')
+
+        self.print_report(report)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'\n{report["requests"]} requests in {report["elapsed_s"]}s '
+            f'({report["throughput_rps"]} req/s, {report["concurrency"]} virtual users)\n'
+        )
+        header = (f'{"step":<18}{"requests":>9}{"req/s":>9}{"errors":>8}{"400":>7}{"409":>7}'
+                  f'{"p50 ms":>9}{"p90 ms":>9}{"p99 ms":>9}{"max ms":>9}')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for step, stats in report['steps'].items():
+            self.stdout.write(
+                f'{step:<18}{stats["requests"]:>9}{stats["throughput_rps"]:>9}'
+                f'{stats["error_rate"]:>8.1%}{stats["conflict_400_rate"]:>7.1%}{stats["conflict_409_rate"]:>7.1%}'
+                f'{stats["p50_ms"]:>9}{stats["p90_ms"]:>9}{stats["p99_ms"]:>9}{stats["max_ms"]:>9}'
+            )
+            if stats['errors']:
+                self.stdout.write(f'  transport errors: {stats["errors"]}')
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointmentapp import partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly partitions and detach (optionally archive) old ones on PostgreSQL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.PARTITION_MONTHS_AHEAD,
+                            help='Months of future partitions to keep ready')
+        parser.add_argument('--retain-months', type=int, default=settings.PARTITION_RETAIN_MONTHS,
+                            help='Detach partitions that ended more than this many months ago (0 keeps all)')
+        parser.add_argument('--archive-dir', help='Write detached partitions to <dir>/<partition>.csv.gz, then drop them')
+        parser.add_argument('--drop', action='store_true', help='Drop detached partitions without an archive')
+
+    def handle(self, *args, **options):
+        for table in partitions.PARTITIONED:
+            if not partitions.is_partitioned(table):
+                self.stdout.write(f'{table} is not partitioned (PostgreSQL only); nothing to do')
+                continue
+            for name in partitions.ensure_partitions(table, options['months_ahead']):
+                self.stdout.write(f'Created {name}')
+            if options['retain_months'] > 0:
+                detached = partitions.detach_partitions(
+                    table, options['retain_months'], options['archive_dir'], options['drop']
+                )
+                for name in detached:
+                    self.stdout.write(f'Detached {name}')
+        self.stdout.write(self.style.SUCCESS('Partitions are up to date'))
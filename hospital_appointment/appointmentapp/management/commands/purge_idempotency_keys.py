@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from appointmentapp import idempotency
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Keys deleted per statement')
+
+    def handle(self, *args, **options):
+        deleted = idempotency.purge_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
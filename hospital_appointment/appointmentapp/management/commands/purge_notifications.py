@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointmentapp import retention
+
+
+class Command(BaseCommand):
+    help = 'Delete (optionally archive) notifications past their retention period in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--read-ttl-days', type=int, default=settings.NOTIFICATION_READ_TTL_DAYS,
+                            help='Keep read notifications this many days (0 keeps all)')
+        parser.add_argument('--unread-ttl-days', type=int, default=settings.NOTIFICATION_UNREAD_TTL_DAYS,
+                            help='Keep unread notifications this many days (0 keeps all)')
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATION_PURGE_BATCH_SIZE,
+                            help='Notifications deleted per transaction')
+        parser.add_argument('--archive', action='store_true', default=settings.NOTIFICATION_ARCHIVE,
+                            help='Copy purged notifications to the archive table first')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the notifications that would be purged')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = retention.expired_notifications(options['read_ttl_days'], options['unread_ttl_days']).count()
+            self.stdout.write(f'{count} notifications are past their retention period')
+            return
+        purged = retention.purge_notifications(
+            options['read_ttl_days'], options['unread_ttl_days'], options['batch_size'], options['archive']
+        )
+        verb = 'Archived' if options['archive'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {purged} expired notifications'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from appointmentapp import medications
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the active medication set from prescriptions, or only prune courses that have ended'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune-only', action='store_true',
+                            help='Only remove entries whose end date has passed (run daily)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['prune_only']:
+            removed = medications.prune()
+            self.stdout.write(self.style.SUCCESS(f'Removed {removed} ended medications'))
+            return
+        with transaction.atomic():
+            created = medications.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} active medications'))
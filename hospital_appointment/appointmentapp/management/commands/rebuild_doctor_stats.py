@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointmentapp import analytics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-doctor daily appointment rollup from appointments, in parallel date chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--workers', type=int, default=1, help='Chunks rebuilt concurrently, one connection each')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days covered per chunk and transaction')
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+        if (start is None) != (end is None):
+            raise CommandError('Pass both --start and --end, or neither to rebuild everything')
+        if start and start > end:
+            raise CommandError('--start must not be after --end')
+        if options['workers'] < 1 or options['chunk_days'] < 1:
+            raise CommandError('--workers and --chunk-days must be positive')
+
+        def on_chunk(chunk, count):
+            self.stdout.write(f'{chunk[0]} to {chunk[1]}: {count} rows')
+
+        total = analytics.rebuild(start, end, options['workers'], options['chunk_days'], on_chunk=on_chunk)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} doctor daily stats rows'))
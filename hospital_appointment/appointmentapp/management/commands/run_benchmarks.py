@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from appointmentapp import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the booking, list, search and notification endpoints against the current database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Only run the named scenario (repeatable)')
+        parser.add_argument('--save-baseline', metavar='NAME', help='Store the results as a named baseline')
+        parser.add_argument('--compare', metavar='NAME', help='Compare the results with a stored baseline')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Median slowdown (%%) reported as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--renderers', action='store_true',
+                            help='Time the stdlib and orjson renderers on each list payload instead of full requests')
+
+    def handle(self, *args, **options):
+        results = {}
+        # Bookings, tokens and notifications created while benchmarking are rolled back
+        with transaction.atomic():
+            try:
+                context = benchmarks.BenchmarkContext()
+            except ValueError as e:
+                raise CommandError(str(e))
+            if options['renderers']:
+                results = benchmarks.run_renderer_comparison(context, options['iterations'], options['warmup'])
+            else:
+                scenarios = context.scenarios()
+                if options['scenarios']:
+                    scenarios = [scenario for scenario in scenarios if scenario.name in options['scenarios']]
+                for scenario in scenarios:
+                    results[scenario.name] = benchmarks.run_scenario(
+                        context, scenario, options['iterations'], options['warmup']
+                    )
+            transaction.set_rollback(True)
+
+        self.print_results(results)
+
+        if options['save_baseline']:
+            path = benchmarks.save_baseline(options['save_baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {path}'))
+
+        if options['compare']:
+            try:
+                baseline = benchmarks.load_baseline(options['compare'])
+            except FileNotFoundError:
+                raise CommandError(f'Baseline {options["compare"]} not found')
+            regressions = self.print_comparison(benchmarks.compare(results, baseline, options['threshold']))
+            # Query counts and statuses do not depend on the machine, so any change there counts
+            changed = benchmarks.regressions(results, baseline)
+            for problem in changed:
+                self.stdout.write(self.style.ERROR(problem))
+            if (regressions or changed) and options['fail_on_regression']:
+                raise CommandError(f'{regressions} scenario(s) regressed by more than {options["threshold"]}%, '
+                                   f'{len(changed)} query count or status change(s)')
+
+    def print_results(self, results):
+        header = f'{"scenario":<32}{"median ms":>11}{"p95 ms":>10}{"max ms":>10}{"queries":>9}{"bytes":>10}  statuses'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, result in results.items():
+            statuses = ' '.join(f'{code}x{count}' for code, count in result['statuses'].items())
+            self.stdout.write(
+                f'{name:<32}{result["median_ms"]:>11.2f}{result["p95_ms"]:>10.2f}{result["max_ms"]:>10.2f}'
+                f'{result["queries"]:>9}{result["bytes"]:>10}  {statuses}'
+            )
+
+    def print_comparison(self, rows):
+        self.stdout.write('')
+        self.stdout.write(f'{"scenario":<32}{"median ms":>11}{"baseline":>10}{"change":>9}')
+        regressions = 0
+        for name, current, previous, change, regressed in rows:
+            if previous is None:
+                self.stdout.write(f'{name:<32}{current:>11.2f}{"-":>10}{"new":>9}')
+                continue
+            line = f'{name:<32}{current:>11.2f}{previous:>10.2f}{change:>+8.1f}%'
+            if regressed:
+                regressions += 1
+                line = self.style.ERROR(line + '  REGRESSION')
+            self.stdout.write(line)
+        return regressions
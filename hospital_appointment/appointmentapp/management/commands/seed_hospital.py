@@ -0,0 +1,328 @@
+import io
+import random
+import re
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from appointmentapp import analytics, medications
+from appointmentapp.models import (
+    Appointment, AvailabilitySchedule, MedicalRecord, Notification, Prescription, TimeOff
+)
+from users.models import Doctor, Patient, Specialization, UserDetails
+
+SPECIALIZATIONS = [
+    'General Practice', 'Cardiology', 'Dermatology', 'Neurology', 'Pediatrics',
+    'Orthopedics', 'Gynecology', 'Psychiatry', 'Ophthalmology', 'Oncology',
+    'Radiology', 'Urology', 'Endocrinology', 'Gastroenterology', 'ENT',
+]
+MEDICATIONS = [
+    ('Amoxicillin', '500mg', 'Three times daily'),
+    ('Paracetamol', '1g', 'Every 6 hours'),
+    ('Metformin', '850mg', 'Twice daily'),
+    ('Amlodipine', '5mg', 'Once daily'),
+    ('Atorvastatin', '20mg', 'Once daily at night'),
+    ('Omeprazole', '20mg', 'Once daily before breakfast'),
+    ('Salbutamol', '100mcg', 'As needed'),
+    ('Ibuprofen', '400mg', 'Every 8 hours'),
+]
+SLOT_MINUTES = 30
+DAY_START = time(8, 0)
+SLOTS_PER_DAY = 18  # 08:00 - 17:00
+PHONE_PREFIXES = {'PATIENT': '+2547', 'DOCTOR': '+2541'}
+PHONE_DIGITS = 8
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic hospital dataset (doctors, patients, appointments, time off, records) for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=1000)
+        parser.add_argument('--patients', type=int, default=100000)
+        parser.add_argument('--appointments', type=int, default=1000000)
+        parser.add_argument('--time-off-per-doctor', type=int, default=2)
+        parser.add_argument('--record-ratio', type=float, default=0.3,
+                            help='Share of completed appointments that get a medical record')
+        parser.add_argument('--prescription-ratio', type=float, default=0.5,
+                            help='Share of medical records that get a prescription')
+        parser.add_argument('--notifications-per-doctor', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help='Username prefix, so several runs do not collide')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Use bulk_create instead of COPY for appointments on PostgreSQL')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker()
+        Faker.seed(options['seed'])
+        self.password = make_password('password')
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+
+        specializations = self.create_specializations()
+        doctor_ids = self.create_doctors(options['doctors'], specializations)
+        patient_ids = self.create_patients(options['patients'])
+        self.create_availability(doctor_ids)
+        self.create_time_off(doctor_ids, options['time_off_per_doctor'])
+        self.create_appointments(doctor_ids, patient_ids, options['appointments'])
+        self.log('Rebuilding doctor daily stats')
+        analytics.rebuild()
+        record_ids = self.create_medical_records(doctor_ids, options['record_ratio'])
+        self.create_prescriptions(record_ids, options['prescription_ratio'])
+        self.create_notifications(doctor_ids, options['notifications_per_doctor'])
+        self.stdout.write(self.style.SUCCESS('Synthetic dataset generated'))
+
+    def log(self, message):
+        self.stdout.write(f'[{timezone.now():%H:%M:%S}] {message}')
+
+    def batches(self, iterable):
+        batch = []
+        for item in iterable:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def create_specializations(self):
+        existing = set(Specialization.objects.filter(name__in=SPECIALIZATIONS).values_list('name', flat=True))
+        Specialization.objects.bulk_create(
+            [Specialization(name=name, description=f'{name} department') for name in SPECIALIZATIONS if name not in existing]
+        )
+        return list(Specialization.objects.filter(name__in=SPECIALIZATIONS).values_list('id', flat=True))
+
+    def create_users(self, user_type, count):
+        """Bulk insert users of one type and return their ids in creation order"""
+        label = user_type.lower()
+        phone_prefix = PHONE_PREFIXES[user_type]
+        first_phone = self.next_phone_number(phone_prefix)
+        ids = []
+        for batch in self.batches(range(count)):
+            users = [
+                UserDetails(
+                    username=f'{self.prefix}_{label}_{i}',
+                    password=self.password,
+                    email=f'{self.prefix}.{label}.{i}@example.com',
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    user_type=user_type,
+                    phone_number=f'{phone_prefix}{first_phone + i:0{PHONE_DIGITS}d}',
+                    date_of_birth=self.fake.date_of_birth(minimum_age=1, maximum_age=90),
+                )
+                for i in batch
+            ]
+            # bulk_create skips the post_save profile signal; profiles are created explicitly below
+            created = UserDetails.objects.bulk_create(users)
+            if created and created[0].pk is None:
+                created = list(UserDetails.objects.filter(username__in=[u.username for u in users]).order_by('id'))
+            ids.extend(user.pk for user in created)
+        return ids
+
+    def next_phone_number(self, phone_prefix):
+        """First number after every seeded phone in the range, so a run with another --prefix gets new phones"""
+        last = UserDetails.objects.filter(
+            phone_number__regex=rf'^{re.escape(phone_prefix)}[0-9]{{{PHONE_DIGITS}}}$'
+        ).aggregate(last=Max('phone_number'))['last']
+        return int(last[len(phone_prefix):]) + 1 if last else 0
+
+    def create_doctors(self, count, specializations):
+        self.log(f'Creating {count} doctors')
+        user_ids = self.create_users('DOCTOR', count)
+        doctors = Doctor.objects.bulk_create(
+            [
+                Doctor(
+                    user_id=user_id,
+                    license_number=f'{self.prefix.upper()}-LIC-{user_id}',
+                    years_of_experience=self.rng.randint(1, 40),
+                    hospital_affiliation=self.fake.company(),
+                    biography=self.fake.paragraph(nb_sentences=3),
+                    consultation_fee=self.rng.choice([1000, 1500, 2000, 2500, 3000, 5000]),
+                )
+                for user_id in user_ids
+            ],
+            batch_size=self.batch_size,
+        )
+        doctor_ids = [doctor.pk for doctor in doctors] if doctors and doctors[0].pk else list(
+            Doctor.objects.filter(user_id__in=user_ids).order_by('id').values_list('id', flat=True)
+        )
+        through = Doctor.specializations.through
+        through.objects.bulk_create(
+            [
+                through(doctor_id=doctor_id, specialization_id=spec_id)
+                for doctor_id in doctor_ids
+                for spec_id in self.rng.sample(specializations, self.rng.randint(1, 3))
+            ],
+            batch_size=self.batch_size,
+        )
+        return doctor_ids
+
+    def create_patients(self, count):
+        self.log(f'Creating {count} patients')
+        user_ids = self.create_users('PATIENT', count)
+        patient_ids = []
+        for batch in self.batches(user_ids):
+            patients = Patient.objects.bulk_create([
+                Patient(
+                    user_id=user_id,
+                    gender=self.rng.choice('MFOU'),
+                    address=self.fake.city(),
+                    emergency_contact_name=self.fake.name(),
+                    emergency_contact_phone=self.fake.msisdn()[:15],
+                    insurance_provider=self.rng.choice(['NHIF', 'AAR', 'Jubilee', 'Britam', None]),
+                    insurance_policy_number=self.fake.bothify('POL-########'),
+                )
+                for user_id in batch
+            ])
+            if patients and patients[0].pk is None:
+                patients = Patient.objects.filter(user_id__in=batch).order_by('id')
+            patient_ids.extend(patient.pk for patient in patients)
+        return patient_ids
+
+    def create_availability(self, doctor_ids):
+        self.log('Creating availability schedules')
+        valid_from = timezone.localdate() - timedelta(days=365)
+        AvailabilitySchedule.objects.bulk_create(
+            [
+                AvailabilitySchedule(
+                    doctor_id=doctor_id, day_of_week=day, start_time=DAY_START, end_time=time(17, 0),
+                    valid_from=valid_from, valid_until=valid_from + timedelta(days=730),
+                )
+                for doctor_id in doctor_ids
+                for day in range(5)
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def create_time_off(self, doctor_ids, per_doctor):
+        self.log('Creating time off')
+        now = timezone.now()
+        time_offs = []
+        for doctor_id in doctor_ids:
+            for _ in range(per_doctor):
+                start = now + timedelta(days=self.rng.randint(-180, 180))
+                time_offs.append(TimeOff(
+                    doctor_id=doctor_id, start_datetime=start,
+                    end_datetime=start + timedelta(days=self.rng.randint(1, 5)),
+                    reason=self.rng.choice(['Annual leave', 'Conference', 'Sick leave', 'Training']),
+                    is_approved=self.rng.random() < 0.8,
+                ))
+        TimeOff.objects.bulk_create(time_offs, batch_size=self.batch_size)
+
+    def appointment_rows(self, doctor_ids, patient_ids, count):
+        """Non-overlapping half-hour slots per doctor spread around today"""
+        per_doctor = max(1, count // len(doctor_ids))
+        days = per_doctor // SLOTS_PER_DAY + 1
+        tz = timezone.get_current_timezone()
+        first_day = timezone.localdate() - timedelta(days=int(days * 0.7))
+        now = timezone.now()
+        produced = 0
+        for doctor_id in doctor_ids:
+            for slot in range(per_doctor):
+                if produced >= count:
+                    return
+                day = first_day + timedelta(days=slot // SLOTS_PER_DAY)
+                start = datetime.combine(day, DAY_START, tzinfo=tz) + timedelta(minutes=SLOT_MINUTES * (slot % SLOTS_PER_DAY))
+                if start < now:
+                    status = self.rng.choices(['COMPLETED', 'NO_SHOW', 'CANCELLED'], weights=[80, 10, 10])[0]
+                else:
+                    status = self.rng.choices(['SCHEDULED', 'CONFIRMED'], weights=[60, 40])[0]
+                produced += 1
+                appointment = Appointment(
+                    patient_id=self.rng.choice(patient_ids), doctor_id=doctor_id,
+                    scheduled_time=start, end_time=start + timedelta(minutes=SLOT_MINUTES),
+                    status=status, reason=self.fake.sentence(nb_words=6), notes='Synthetic appointment',
+                )
+                # Bulk inserts skip save(), which schedules the reminder
+                appointment.reminder_due_at = appointment.next_reminder_due()
+                yield appointment
+
+    def create_appointments(self, doctor_ids, patient_ids, count):
+        self.log(f'Creating {count} appointments ({"COPY" if self.use_copy else "bulk_create"})')
+        for batch in self.batches(self.appointment_rows(doctor_ids, patient_ids, count)):
+            if self.use_copy:
+                copy_insert(Appointment, batch)
+            else:
+                Appointment.objects.bulk_create(batch)
+
+    def create_medical_records(self, doctor_ids, ratio):
+        self.log('Creating medical records')
+        completed = (
+            Appointment.objects.filter(doctor_id__in=doctor_ids, status='COMPLETED')
+            .values_list('id', 'doctor_id', 'patient_id').iterator(chunk_size=self.batch_size)
+        )
+        record_ids = []
+        for batch in self.batches(row for row in completed if self.rng.random() < ratio):
+            records = MedicalRecord.objects.bulk_create([
+                MedicalRecord(
+                    doctor_id=doctor_id, appointment_id=appointment_id, patient_id=patient_id,
+                    record_type=self.rng.choice(['DIAGNOSIS', 'PRESCRIPTION', 'TEST_RESULT', 'TREATMENT', 'NOTE']),
+                    title=self.fake.sentence(nb_words=4), description=self.fake.paragraph(nb_sentences=2),
+                    is_sensitive=self.rng.random() < 0.1,
+                )
+                for appointment_id, doctor_id, patient_id in batch
+            ])
+            if records and records[0].pk is None:
+                records = MedicalRecord.objects.filter(appointment_id__in=[a for a, _, _ in batch])
+            record_ids.extend(record.pk for record in records)
+        return record_ids
+
+    def create_prescriptions(self, record_ids, ratio):
+        self.log('Creating prescriptions')
+        today = timezone.localdate()
+        for batch in self.batches(record_id for record_id in record_ids if self.rng.random() < ratio):
+            prescriptions = []
+            for record_id in batch:
+                name, dosage, frequency = self.rng.choice(MEDICATIONS)
+                start = today + timedelta(days=self.rng.randint(-200, 10))
+                prescriptions.append(Prescription(
+                    medical_record_id=record_id, medication_name=name, dosage=dosage, frequency=frequency,
+                    start_date=start, end_date=start + timedelta(days=self.rng.choice([5, 7, 14, 30, 90])),
+                    refills_remaining=self.rng.randint(0, 3), instructions='Take after meals',
+                ))
+            Prescription.objects.bulk_create(prescriptions)
+        # bulk_create skips the signals that maintain the active set
+        medications.rebuild(self.batch_size)
+
+    def create_notifications(self, doctor_ids, per_doctor):
+        self.log('Creating notifications')
+        user_ids = Doctor.objects.filter(id__in=doctor_ids).values_list('user_id', flat=True).iterator()
+        notifications = (
+            Notification(user_id=user_id, message=self.fake.sentence(nb_words=8), is_read=self.rng.random() < 0.5)
+            for user_id in user_ids
+            for _ in range(per_doctor)
+        )
+        for batch in self.batches(notifications):
+            Notification.objects.bulk_create(batch)
+
+
+def copy_value(value):
+    """Encode a database value for PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_insert(model, objs):
+    """Insert unsaved model instances with COPY ... FROM STDIN"""
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    buffer = io.StringIO()
+    for obj in objs:
+        values = [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields]
+        buffer.write('\t'.join(copy_value(value) for value in values))
+        buffer.write('\n')
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN', buffer)
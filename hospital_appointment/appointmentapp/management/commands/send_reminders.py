@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointmentapp import reminders
+
+
+class Command(BaseCommand):
+    help = 'Send due appointment reminders as notifications, once (cron) or continuously (--loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.REMINDER_BATCH_SIZE,
+                            help='Reminders claimed and sent per transaction')
+        parser.add_argument('--loop', action='store_true', help='Keep running as a worker')
+        parser.add_argument('--interval', type=float, default=30.0, help='Seconds between scans in --loop mode')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = reminders.send_all_due_reminders(options['batch_size'])
+            if sent or not options['loop']:
+                self.stdout.write(f'Processed {sent} due reminders')
+            if not options['loop']:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from appointmentapp import sweeper
+
+
+class Command(BaseCommand):
+    help = 'Close appointments left open past their end time (e.g. SCHEDULED -> NO_SHOW) in batched UPDATEs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policy', help=f'FROM=TO pairs, default "{settings.APPOINTMENT_SWEEP_POLICY}"')
+        parser.add_argument('--grace-minutes', type=int, default=settings.APPOINTMENT_SWEEP_GRACE_MINUTES,
+                            help='How long after end_time an appointment may stay open')
+        parser.add_argument('--batch-size', type=int, default=settings.APPOINTMENT_SWEEP_BATCH_SIZE,
+                            help='Appointments changed per transaction')
+        parser.add_argument('--no-notify', action='store_true', help='Do not notify patients')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many appointments would change')
+
+    def handle(self, *args, **options):
+        try:
+            policy = sweeper.sweep_policy(options['policy'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        if options['dry_run']:
+            for source, count in sweeper.pending(policy, options['grace_minutes']).items():
+                self.stdout.write(f'{source} -> {policy[source]}: {count} appointments')
+            return
+
+        def on_batch(source, target, changed):
+            self.stdout.write(f'{source} -> {target}: {changed} appointments')
+
+        counts = sweeper.sweep(
+            policy, options['grace_minutes'], options['batch_size'],
+            notify=False if options['no_notify'] else None, on_batch=on_batch,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Swept {sum(counts.values())} appointments'))
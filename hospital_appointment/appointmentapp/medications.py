@@ -0,0 +1,98 @@
+import base64
+from datetime import date, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ActiveMedication, Prescription
+from .projections import full_name
+from .timeline import InvalidCursor
+
+ACTIVE_MEDICATION_FIELDS = [
+    'prescription_id', 'medication_name', 'dosage', 'frequency', 'start_date', 'end_date', 'refills_remaining'
+]
+MAX_REFILL_WINDOW_DAYS = 90
+DEFAULT_REFILL_LIMIT = 50
+MAX_REFILL_LIMIT = 200
+
+
+def active_medications(patient_id, today=None):
+    """Medications the patient is currently taking, soonest to end first"""
+    today = today or timezone.localdate()
+    return list(
+        ActiveMedication.objects.filter(patient_id=patient_id, start_date__lte=today)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
+        .values(*ACTIVE_MEDICATION_FIELDS)
+    )
+
+
+def encode_refill_cursor(end_date, prescription_id):
+    raw = f'{end_date.isoformat()}|{prescription_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_refill_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        end_date, prescription_id = raw.split('|')
+        return date.fromisoformat(end_date), int(prescription_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def refills_due(days, cursor=None, limit=DEFAULT_REFILL_LIMIT, today=None):
+    """One page of refillable prescriptions across the hospital whose course ends within `days` days.
+
+    Keyset-paginated on (end_date, prescription_id) like the patient timeline, so every page is one
+    index range scan of at most `limit + 1` rows.
+    """
+    today = today or timezone.localdate()
+    queryset = ActiveMedication.objects.filter(
+        refills_remaining__gt=0, end_date__gte=today, end_date__lte=today + timedelta(days=days)
+    )
+    if cursor:
+        end_date, prescription_id = decode_refill_cursor(cursor)
+        queryset = queryset.filter(Q(end_date__gt=end_date) | Q(end_date=end_date, prescription_id__gt=prescription_id))
+    page = list(
+        queryset.order_by('end_date', 'prescription_id')
+        .values('patient_id', *ACTIVE_MEDICATION_FIELDS, patient_name=full_name('patient__user'))[:limit + 1]
+    )
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_refill_cursor(page[-1]['end_date'], page[-1]['prescription_id'])
+    return {'results': page, 'next_cursor': next_cursor}
+
+
+def prune(today=None):
+    """Drop entries whose course has ended, returns how many were removed"""
+    today = today or timezone.localdate()
+    deleted, _ = ActiveMedication.objects.filter(end_date__lt=today).delete()
+    return deleted
+
+
+def rebuild(batch_size=5000, today=None):
+    """Recompute the whole active set from Prescription, e.g. after bulk loads that skip signals"""
+    today = today or timezone.localdate()
+    ActiveMedication.objects.all().delete()
+    rows = (
+        Prescription.objects.filter(medical_record__patient__isnull=False)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
+        .values_list('id', 'medical_record__patient_id', 'medication_name', 'dosage', 'frequency',
+                     'start_date', 'end_date', 'refills_remaining')
+        .order_by('id')
+        .iterator(chunk_size=batch_size)
+    )
+    created, batch = 0, []
+    for prescription_id, patient_id, name, dosage, frequency, start_date, end_date, refills in rows:
+        batch.append(ActiveMedication(
+            prescription_id=prescription_id, patient_id=patient_id, medication_name=name, dosage=dosage,
+            frequency=frequency, start_date=start_date, end_date=end_date, refills_remaining=refills,
+        ))
+        if len(batch) >= batch_size:
+            created += len(ActiveMedication.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        created += len(ActiveMedication.objects.bulk_create(batch))
+    return created
@@ -0,0 +1,263 @@
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+
+def log_linear_bounds(lowest, highest, steps_per_doubling):
+    """Bucket upper bounds growing geometrically from lowest to highest (HDR-style)"""
+    factor = 2 ** (1 / steps_per_doubling)
+    bounds = []
+    value = lowest
+    while value < highest * factor:
+        bounds.append(float('%.6g' % value))
+        value *= factor
+    return bounds
+
+
+# Seconds: 0.25ms .. ~32s, two buckets per doubling
+LATENCY_BUCKETS = log_linear_bounds(0.00025, 32, 2)
+# Queries per request: 1 .. 1024
+QUERY_COUNT_BUCKETS = log_linear_bounds(1, 1024, 1)
+# Response bytes: 64B .. 64MB
+SIZE_BUCKETS = log_linear_bounds(64, 64 * 1024 * 1024, 1)
+# Methods labelled as sent; anything else a client invents is counted as OTHER, bounding the series
+HTTP_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'))
+
+
+class Histogram:
+    """Fixed-bucket histogram, cheap to record and exportable as a Prometheus histogram"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def record(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.bounds + [float('inf')], self.counts):
+            running += count
+            yield bound, running
+
+
+class EndpointStats:
+    """All histograms recorded for one (endpoint, method) pair"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_duration = Histogram(LATENCY_BUCKETS)
+        self.render_duration = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.status_counts = {}
+
+    def observe(self, status, duration, queries, db_time, render_time, size):
+        with self.lock:
+            self.duration.record(duration)
+            self.db_queries.record(queries)
+            self.db_duration.record(db_time)
+            self.render_duration.record(render_time)
+            self.response_size.record(size)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+
+class MetricsRegistry:
+    """In-process store of per-endpoint request statistics"""
+
+    HISTOGRAMS = (
+        ('http_request_duration_seconds', 'duration', 'Wall time spent handling the request'),
+        ('http_request_db_queries', 'db_queries', 'Database queries issued per request'),
+        ('http_request_db_duration_seconds', 'db_duration', 'Time spent executing database queries per request'),
+        ('http_response_render_seconds', 'render_duration', 'Time spent rendering the response body'),
+        ('http_response_size_bytes', 'response_size', 'Size of the response body'),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def get(self, endpoint, method):
+        key = (endpoint, method)
+        stats = self.endpoints.get(key)
+        if stats is None:
+            with self.lock:
+                stats = self.endpoints.setdefault(key, EndpointStats())
+        return stats
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+
+    def export(self):
+        """Render every series in the Prometheus text exposition format"""
+        with self.lock:
+            items = sorted(self.endpoints.items())
+        lines = [
+            '# HELP http_requests_total Requests handled, by endpoint, method and status',
+            '# TYPE http_requests_total counter',
+        ]
+        snapshots = []
+        for (endpoint, method), stats in items:
+            labels = 'endpoint="%s",method="%s"' % (_escape(endpoint), method)
+            with stats.lock:
+                for status, count in sorted(stats.status_counts.items()):
+                    lines.append('http_requests_total{%s,status="%s"} %d' % (labels, status, count))
+                snapshots.append((labels, {
+                    attr: (list(getattr(stats, attr).cumulative()), getattr(stats, attr).total, getattr(stats, attr).count)
+                    for _, attr, _ in self.HISTOGRAMS
+                }))
+
+        for name, attr, help_text in self.HISTOGRAMS:
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s histogram' % name)
+            for labels, histograms in snapshots:
+                buckets, total, count = histograms[attr]
+                for bound, running in buckets:
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, le, running))
+                lines.append('%s_sum{%s} %r' % (name, labels, total))
+                lines.append('%s_count{%s} %d' % (name, labels, count))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class QueryTimer:
+    """Connection execute wrapper counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+# Execute wrappers of the current request. Database connections are per thread and the async ORM runs
+# queries in a worker thread, so connection.execute_wrapper() in an async view would never see them;
+# a context variable is copied into that thread by sync_to_async.
+_query_wrappers = ContextVar('query_wrappers', default=())
+
+
+@contextmanager
+def query_wrapper(wrapper):
+    """connection.execute_wrapper() for every connection the current context uses, sync or async"""
+    token = _query_wrappers.set(_query_wrappers.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _query_wrappers.reset(token)
+
+
+def _run_query_wrappers(execute, sql, params, many, context):
+    for wrapper in reversed(_query_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_wrappers(sender, connection, **kwargs):
+    """connection_created receiver hooking query_wrapper() into each new connection"""
+    if _run_query_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_run_query_wrappers)
+
+
+def method_label(request):
+    return request.method if request.method in HTTP_METHODS else 'OTHER'
+
+
+def endpoint_name(request):
+    """Resolved URL name of the request, falling back to its route pattern"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route or match.view_name
+
+
+class RequestMetricsMiddleware:
+    """Record latency, query count/time, render time and response size per endpoint"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        request._metrics_render_time = 0.0
+        start = time.perf_counter()
+        with query_wrapper(timer):
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        request._metrics_render_time = 0.0
+        start = time.perf_counter()
+        with query_wrapper(timer):
+            response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start, timer)
+        return response
+
+    def observe(self, request, response, duration, timer):
+        size = 0 if response.streaming else len(response.content)
+        registry.get(endpoint_name(request), method_label(request)).observe(
+            response.status_code, duration, timer.count, timer.duration,
+            request._metrics_render_time, size,
+        )
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered by the handler right after this hook runs
+        render_start = time.perf_counter()
+
+        def record_render_time(rendered):
+            request._metrics_render_time = time.perf_counter() - render_start
+
+        response.add_post_render_callback(record_render_time)
+        return response
+
+
+def metrics_view(request):
+    """Expose collected request metrics in the Prometheus text format.
+
+    Scrapers must send METRICS_TOKEN as a bearer token. Without a token the endpoint only exists
+    when METRICS_PUBLIC opts in.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not getattr(settings, 'METRICS_PUBLIC', False):
+            raise Http404
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(registry.export(), content_type='text/plain; version=0.0.4; charset=utf-8')
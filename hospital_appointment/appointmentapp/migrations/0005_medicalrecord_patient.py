@@ -0,0 +1,34 @@
+# Generated by Django 4.2.18 on 2026-10-19 17:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+        ("appointmentapp", "0004_alter_medicalrecord_date_recorded"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="medicalrecord",
+            name="patient",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="medical_records",
+                to="users.patient",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="medicalrecord",
+            index=models.Index(
+                fields=["patient", "-date_recorded"],
+                name="medicalrecord_patient_date_idx",
+            ),
+        ),
+    ]
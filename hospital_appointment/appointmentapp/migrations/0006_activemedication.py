@@ -0,0 +1,58 @@
+# Generated by Django 4.2.18 on 2026-10-19 17:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+        ("appointmentapp", "0005_medicalrecord_patient"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActiveMedication",
+            fields=[
+                (
+                    "prescription",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="active_medication",
+                        serialize=False,
+                        to="appointmentapp.prescription",
+                    ),
+                ),
+                ("medication_name", models.CharField(max_length=200)),
+                ("dosage", models.CharField(max_length=100)),
+                ("frequency", models.CharField(max_length=100)),
+                ("start_date", models.DateField()),
+                ("end_date", models.DateField(blank=True, null=True)),
+                ("refills_remaining", models.PositiveIntegerField(default=0)),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="active_medications",
+                        to="users.patient",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["end_date"],
+                "indexes": [
+                    models.Index(
+                        fields=["patient", "end_date"], name="activemed_patient_end_idx"
+                    ),
+                    models.Index(
+                        condition=models.Q(("refills_remaining__gt", 0)),
+                        fields=["end_date"],
+                        name="activemed_refill_due_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
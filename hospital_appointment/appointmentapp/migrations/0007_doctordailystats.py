@@ -0,0 +1,56 @@
+# Generated by Django 4.2.18 on 2026-10-19 17:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_userdetails_contact_indexes"),
+        ("appointmentapp", "0006_activemedication"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DoctorDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("appointments", models.IntegerField(default=0)),
+                ("booked_minutes", models.IntegerField(default=0)),
+                ("completed", models.IntegerField(default=0)),
+                ("cancelled", models.IntegerField(default=0)),
+                ("no_show", models.IntegerField(default=0)),
+                (
+                    "doctor",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="users.doctor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["date"],
+                "indexes": [
+                    models.Index(fields=["date"], name="doctordailystats_date_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="doctordailystats",
+            constraint=models.UniqueConstraint(
+                fields=("doctor", "date"), name="doctordailystats_doctor_date_uniq"
+            ),
+        ),
+    ]
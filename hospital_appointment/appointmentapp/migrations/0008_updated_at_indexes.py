@@ -0,0 +1,30 @@
+# Generated by Django 4.2.18 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointmentapp", "0007_doctordailystats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prescription",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["updated_at"], name="appointment_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="medicalrecord",
+            index=models.Index(fields=["updated_at"], name="medicalrecord_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="prescription",
+            index=models.Index(fields=["updated_at"], name="prescription_updated_idx"),
+        ),
+    ]
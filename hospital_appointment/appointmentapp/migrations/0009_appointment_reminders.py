@@ -0,0 +1,47 @@
+# Generated by Django 4.2.18 on 2026-10-19 18:04
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def schedule_upcoming_reminders(apps, schema_editor):
+    # Only upcoming appointments need a reminder; past ones keep reminder_due_at empty
+    Appointment = apps.get_model("appointmentapp", "Appointment")
+    Appointment.objects.filter(
+        scheduled_time__gt=timezone.now(), status__in=["SCHEDULED", "CONFIRMED"]
+    ).update(
+        reminder_due_at=models.F("scheduled_time")
+        - timedelta(minutes=settings.APPOINTMENT_REMINDER_LEAD_MINUTES)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointmentapp", "0008_updated_at_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="appointment",
+            name="reminder_due_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="appointment",
+            name="reminder_sent_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                condition=models.Q(("reminder_due_at__isnull", False)),
+                fields=["reminder_due_at"],
+                name="appointment_reminder_due_idx",
+            ),
+        ),
+        migrations.RunPython(schedule_upcoming_reminders, migrations.RunPython.noop),
+    ]
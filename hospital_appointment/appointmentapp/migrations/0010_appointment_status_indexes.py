@@ -0,0 +1,31 @@
+# Generated by Django 4.2.18 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointmentapp", "0009_appointment_reminders"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                condition=models.Q(("status__in", ["SCHEDULED", "CONFIRMED"])),
+                fields=["doctor", "scheduled_time", "end_time"],
+                name="appointment_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                condition=models.Q(
+                    ("status__in", ["SCHEDULED", "CONFIRMED", "IN_PROGRESS"])
+                ),
+                fields=["end_time"],
+                name="appointment_open_end_idx",
+            ),
+        ),
+    ]
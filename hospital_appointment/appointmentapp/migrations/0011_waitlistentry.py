@@ -0,0 +1,163 @@
+# Generated by Django 4.2.18 on 2026-10-19 18:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_userdetails_contact_indexes"),
+        ("appointmentapp", "0010_appointment_status_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WaitlistEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("earliest_start", models.DateTimeField()),
+                ("latest_end", models.DateTimeField()),
+                ("duration_minutes", models.PositiveIntegerField(default=30)),
+                ("reason", models.TextField(blank=True, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("WAITING", "Waiting"),
+                            ("OFFERED", "Offered"),
+                            ("BOOKED", "Booked"),
+                            ("WITHDRAWN", "Withdrawn"),
+                        ],
+                        default="WAITING",
+                        max_length=20,
+                    ),
+                ),
+                ("offered_start", models.DateTimeField(blank=True, null=True)),
+                ("offered_end", models.DateTimeField(blank=True, null=True)),
+                ("offer_expires_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["created_at"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(
+                fields=["doctor", "scheduled_time"], name="appointment_doctor_time_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="appointment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status", "CANCELLED"), _negated=True),
+                fields=("doctor", "scheduled_time"),
+                name="appointment_doctor_slot_uniq",
+            ),
+        ),
+        # Dropped only once the partial constraint and plain index replacing it exist
+        migrations.AlterUniqueTogether(
+            name="appointment",
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name="waitlistentry",
+            name="appointment",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="appointmentapp.appointment",
+            ),
+        ),
+        migrations.AddField(
+            model_name="waitlistentry",
+            name="doctor",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="waitlist_entries",
+                to="users.doctor",
+            ),
+        ),
+        migrations.AddField(
+            model_name="waitlistentry",
+            name="offered_doctor",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="users.doctor",
+            ),
+        ),
+        migrations.AddField(
+            model_name="waitlistentry",
+            name="patient",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="waitlist_entries",
+                to="users.patient",
+            ),
+        ),
+        migrations.AddField(
+            model_name="waitlistentry",
+            name="specialization",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="waitlist_entries",
+                to="users.specialization",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="waitlistentry",
+            index=models.Index(
+                condition=models.Q(("status", "WAITING")),
+                fields=["doctor", "earliest_start"],
+                name="waitlist_doctor_window_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="waitlistentry",
+            index=models.Index(
+                condition=models.Q(("status", "WAITING")),
+                fields=["specialization", "earliest_start"],
+                name="waitlist_spec_window_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="waitlistentry",
+            index=models.Index(
+                condition=models.Q(("status", "OFFERED")),
+                fields=["offer_expires_at"],
+                name="waitlist_offer_expiry_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="waitlistentry",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    ("doctor__isnull", False),
+                    ("specialization__isnull", False),
+                    _connector="OR",
+                ),
+                name="waitlist_doctor_or_specialization",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.18 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointmentapp", "0011_waitlistentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="appointment",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="medicalrecord",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="prescription",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="timeoff",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
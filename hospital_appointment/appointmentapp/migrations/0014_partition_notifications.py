@@ -0,0 +1,102 @@
+# Range-partitions appointmentapp_notification by month on created_at (PostgreSQL only)
+
+from datetime import datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+TABLE = "appointmentapp_notification"
+OLD = TABLE + "_unpartitioned"
+SEQUENCE = TABLE + "_id_seq_partitioned"
+MONTHS_AHEAD = 3
+
+
+def _month(year, month):
+    index = year * 12 + month - 1
+    return timezone.make_aware(datetime(index // 12, index % 12 + 1, 1), timezone.get_default_timezone())
+
+
+def _indexes_and_foreign_keys(cursor, table):
+    # Primary keys differ between the two layouts and are recreated explicitly
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s", [table, TABLE + "_pkey"]
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    return indexes, cursor.fetchall()
+
+
+def _restore(cursor, quote, table, indexes, foreign_keys):
+    for definition in indexes:
+        cursor.execute(definition.replace(OLD, table))
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+
+
+def partition_notifications(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(OLD)}")
+        indexes, foreign_keys = _indexes_and_foreign_keys(cursor, OLD)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1, MIN(created_at) FROM {quote(OLD)}")
+        next_id, oldest = cursor.fetchone()
+
+        # Identity columns are not allowed on partitioned tables before PostgreSQL 17, so ids come from a sequence
+        cursor.execute(
+            f"CREATE TABLE {quote(TABLE)} (LIKE {quote(OLD)} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(f"CREATE SEQUENCE {quote(SEQUENCE)} START WITH {int(next_id)} OWNED BY {quote(TABLE)}.id")
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+
+        cursor.execute(f"CREATE TABLE {quote(TABLE + '_default')} PARTITION OF {quote(TABLE)} DEFAULT")
+        now = timezone.localtime(timezone.now(), timezone.get_default_timezone())
+        first = timezone.localtime(oldest, timezone.get_default_timezone()) if oldest else now
+        month = _month(first.year, first.month)
+        last = _month(now.year, now.month + MONTHS_AHEAD)
+        while month <= last:
+            end = _month(month.year, month.month + 1)
+            cursor.execute(
+                f"CREATE TABLE {quote(f'{TABLE}_p{month:%Y%m}')} PARTITION OF {quote(TABLE)} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            month = end
+
+        cursor.execute(f"INSERT INTO {quote(TABLE)} SELECT * FROM {quote(OLD)}")
+        cursor.execute(f"DROP TABLE {quote(OLD)}")
+        # A primary key on a partitioned table has to include the partition key
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(TABLE + '_pkey')} PRIMARY KEY (id, created_at)")
+        _restore(cursor, quote, TABLE, indexes, foreign_keys)
+
+
+def unpartition_notifications(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(OLD)}")
+        indexes, foreign_keys = _indexes_and_foreign_keys(cursor, OLD)
+        cursor.execute(f"CREATE TABLE {quote(TABLE)} (LIKE {quote(OLD)} INCLUDING DEFAULTS)")
+        cursor.execute(f"ALTER SEQUENCE {quote(SEQUENCE)} OWNED BY {quote(TABLE)}.id")
+        cursor.execute(f"INSERT INTO {quote(TABLE)} SELECT * FROM {quote(OLD)}")
+        # Dropping the parent drops every partition, the default one included
+        cursor.execute(f"DROP TABLE {quote(OLD)}")
+        cursor.execute(f"ALTER TABLE {quote(TABLE)} ADD CONSTRAINT {quote(TABLE + '_pkey')} PRIMARY KEY (id)")
+        _restore(cursor, quote, TABLE, indexes, foreign_keys)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointmentapp", "0013_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_notifications, unpartition_notifications),
+    ]
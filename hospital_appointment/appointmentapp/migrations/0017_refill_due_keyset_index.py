@@ -0,0 +1,25 @@
+# Generated by Django 4.2.18 on 2026-10-19 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointmentapp", "0016_notification_digests"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="activemedication",
+            name="activemed_refill_due_idx",
+        ),
+        migrations.AddIndex(
+            model_name="activemedication",
+            index=models.Index(
+                condition=models.Q(("refills_remaining__gt", 0)),
+                fields=["end_date", "prescription"],
+                name="activemed_refill_due_idx",
+            ),
+        ),
+    ]
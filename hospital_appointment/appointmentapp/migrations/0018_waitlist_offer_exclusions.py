@@ -0,0 +1,32 @@
+# Generated by Django 4.2.18 on 2026-10-19 18:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_userdetails_email_lower_index"),
+        ("appointmentapp", "0017_refill_due_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="waitlistentry",
+            name="offer_excluded_patient",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="users.patient",
+            ),
+        ),
+        migrations.AddField(
+            model_name="waitlistentry",
+            name="offer_passed_over",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
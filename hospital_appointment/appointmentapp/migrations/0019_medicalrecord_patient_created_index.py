@@ -0,0 +1,20 @@
+# Generated by Django 4.2.18 on 2026-10-19 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointmentapp", "0018_waitlist_offer_exclusions"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="medicalrecord",
+            index=models.Index(
+                fields=["patient", "-created_at", "-id"],
+                name="medicalrecord_patient_at_idx",
+            ),
+        ),
+    ]
@@ -1,6 +1,61 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.utils import timezone
-from users.models import Doctor, Patient, UserDetails
+from users.models import Doctor, Patient, Specialization, UserDetails
+
+class VersionConflict(Exception):
+    """Raised when a versioned row was changed by someone else after it was read"""
+
+
+class VersionedModel(models.Model):
+    """Model saved with a compare-and-set on `version`.
+
+    Saving an existing row bumps the version and only matches the row while it is still at the version this
+    instance was read at, so concurrent edits raise VersionConflict instead of overwriting each other.
+    """
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if not update_fields:
+                return
+            # Only the listed columns are written, plus the version and the auto_now timestamps exports rely on
+            kwargs['update_fields'] = {*update_fields, 'version', *(
+                field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)
+            )}
+        self.version += 1
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        try:
+            if transaction.get_connection(using).in_atomic_block:
+                # A savepoint keeps the caller's transaction usable after a VersionConflict, e.g. to read the current version
+                with transaction.atomic(using=using):
+                    super().save(*args, **kwargs)
+            else:
+                super().save(*args, **kwargs)
+        except Exception:
+            self.version -= 1
+            raise
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update, *args, **kwargs):
+        updated = super()._do_update(
+            base_qs.filter(version=self.version - 1), using, pk_val, values, update_fields, forced_update,
+            *args, **kwargs
+        )
+        if not updated and base_qs.filter(pk=pk_val).exists():
+            raise VersionConflict(f'{self._meta.verbose_name.capitalize()} was changed by another request')
+        return updated
+
 
 class AvailabilitySchedule(models.Model):
     """Doctor's availability schedule"""
@@ -30,7 +85,7 @@ class AvailabilitySchedule(models.Model):
         return f"{self.doctor.user.get_full_name()} - {self.get_day_of_week_display()} {self.start_time}-{self.end_time}"
 
 
-class TimeOff(models.Model):
+class TimeOff(VersionedModel):
     """Doctor's time off schedule"""
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='time_offs')
     start_datetime = models.DateTimeField()
@@ -47,7 +102,7 @@ class TimeOff(models.Model):
         return f"{self.doctor.user.get_full_name()} off from {self.start_datetime} to {self.end_datetime}"
 
 
-class Appointment(models.Model):
+class Appointment(VersionedModel):
     """Appointment between patient and doctor"""
     STATUS_CHOICES = (
         ('SCHEDULED', 'Scheduled'),
@@ -65,18 +120,58 @@ class Appointment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SCHEDULED')
     reason = models.TextField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
+    # When the reminder worker should notify the patient, cleared once sent or when no reminder applies
+    reminder_due_at = models.DateTimeField(blank=True, null=True)
+    reminder_sent_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    REMINDER_STATUSES = ('SCHEDULED', 'CONFIRMED')
+    OPEN_STATUSES = ('SCHEDULED', 'CONFIRMED', 'IN_PROGRESS')
     
     class Meta:
         ordering = ['scheduled_time']
-        unique_together = ('doctor', 'scheduled_time')  # Prevent double bookings
+        constraints = [
+            # Prevent double bookings; a cancelled appointment no longer holds its slot, so it can be rebooked
+            models.UniqueConstraint(fields=['doctor', 'scheduled_time'], condition=~models.Q(status='CANCELLED'),
+                                    name='appointment_doctor_slot_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'scheduled_time'], name='appointment_doctor_time_idx'),
+            # Incremental exports select rows changed since the previous run
+            models.Index(fields=['updated_at'], name='appointment_updated_idx'),
+            # Only pending reminders are indexed, so the worker's scan stays small however large the table grows
+            models.Index(fields=['reminder_due_at'], condition=models.Q(reminder_due_at__isnull=False),
+                         name='appointment_reminder_due_idx'),
+            # Overlap checks only look at active appointments, which the sweeper keeps to upcoming ones
+            models.Index(fields=['doctor', 'scheduled_time', 'end_time'],
+                         condition=models.Q(status__in=['SCHEDULED', 'CONFIRMED']), name='appointment_active_idx'),
+            # Appointments the sweeper may still close, by when they ended
+            models.Index(fields=['end_time'], condition=models.Q(status__in=['SCHEDULED', 'CONFIRMED', 'IN_PROGRESS']),
+                         name='appointment_open_end_idx'),
+        ]
     
     def __str__(self):
         return f"Appointment: {self.patient.user.get_full_name()} with Dr. {self.doctor.user.get_full_name()} at {self.scheduled_time}"
 
+    def next_reminder_due(self):
+        """When the reminder should go out, or None when it was sent or the appointment is no longer upcoming"""
+        if self.reminder_sent_at is not None or self.status not in self.REMINDER_STATUSES:
+            return None
+        # scheduled_time may still be the raw string a view assigned
+        scheduled_time = self._meta.get_field('scheduled_time').to_python(self.scheduled_time)
+        return scheduled_time - timedelta(minutes=settings.APPOINTMENT_REMINDER_LEAD_MINUTES)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'scheduled_time', 'status', 'reminder_sent_at'} & set(update_fields):
+            self.reminder_due_at = self.next_reminder_due()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'reminder_due_at'}
+        super().save(*args, **kwargs)
+
 
-class MedicalRecord(models.Model):
+class MedicalRecord(VersionedModel):
     """Medical records for patients (Bonus feature)"""
     RECORD_TYPE_CHOICES = (
         ('DIAGNOSIS', 'Diagnosis'),
@@ -88,6 +183,9 @@ class MedicalRecord(models.Model):
     
     doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_records')
     appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='records')
+    # Copy of appointment.patient kept on save, so per-patient lookups use one index instead of joining appointments
+    patient = models.ForeignKey(Patient, on_delete=models.SET_NULL, null=True, blank=True, related_name='medical_records',
+                                db_index=False)
     record_type = models.CharField(max_length=20, choices=RECORD_TYPE_CHOICES)
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -99,12 +197,26 @@ class MedicalRecord(models.Model):
     
     class Meta:
         ordering = ['-date_recorded']
+        indexes = [
+            models.Index(fields=['patient', '-date_recorded'], name='medicalrecord_patient_date_idx'),
+            # Patient timeline keyset order for records and, through them, prescriptions
+            models.Index(fields=['patient', '-created_at', '-id'], name='medicalrecord_patient_at_idx'),
+            models.Index(fields=['updated_at'], name='medicalrecord_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_record_type_display()} for {self.appointment.patient.user.get_full_name()}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.appointment_id is not None and (update_fields is None or 'appointment' in update_fields):
+            self.patient_id = self.appointment.patient_id
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'patient'}
+        super().save(*args, **kwargs)
 
-class Prescription(models.Model):
+
+class Prescription(VersionedModel):
     """Prescriptions linked to medical records"""
     medical_record = models.OneToOneField(MedicalRecord, on_delete=models.CASCADE, related_name='prescription')
     medication_name = models.CharField(max_length=200)
@@ -114,24 +226,216 @@ class Prescription(models.Model):
     end_date = models.DateField(blank=True, null=True)
     refills_remaining = models.PositiveIntegerField(default=0)
     instructions = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='prescription_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.medication_name} for {self.medical_record.appointment.patient.user.get_full_name()}"
 
 
+class ActiveMedication(models.Model):
+    """Per-patient copy of prescriptions that have not ended yet, kept in sync by the Prescription signals"""
+    prescription = models.OneToOneField(Prescription, on_delete=models.CASCADE, primary_key=True, related_name='active_medication')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='active_medications', db_index=False)
+    medication_name = models.CharField(max_length=200)
+    dosage = models.CharField(max_length=100)
+    frequency = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField(blank=True, null=True)
+    refills_remaining = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['end_date']
+        indexes = [
+            models.Index(fields=['patient', 'end_date'], name='activemed_patient_end_idx'),
+            # Only refillable rows are ever scanned by date, so the index leaves the rest out
+            models.Index(fields=['end_date', 'prescription'], condition=models.Q(refills_remaining__gt=0), name='activemed_refill_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.medication_name} until {self.end_date or 'further notice'}"
+
+    @staticmethod
+    def _date(prescription, name):
+        # The dates may still be the raw strings a view assigned
+        return Prescription._meta.get_field(name).to_python(getattr(prescription, name))
+
+    @classmethod
+    def tracks(cls, prescription, today=None):
+        """Whether `prescription` belongs in the active set"""
+        today = today or timezone.localdate()
+        end_date = cls._date(prescription, 'end_date')
+        return end_date is None or end_date >= today
+
+    @classmethod
+    def sync(cls, prescription):
+        """Insert, refresh or drop the active entry of one prescription"""
+        patient_id = prescription.medical_record.patient_id
+        if patient_id is None or not cls.tracks(prescription):
+            cls.objects.filter(prescription_id=prescription.pk).delete()
+            return
+        cls.objects.update_or_create(prescription_id=prescription.pk, defaults={
+            'patient_id': patient_id,
+            'medication_name': prescription.medication_name,
+            'dosage': prescription.dosage,
+            'frequency': prescription.frequency,
+            'start_date': cls._date(prescription, 'start_date'),
+            'end_date': cls._date(prescription, 'end_date'),
+            'refills_remaining': prescription.refills_remaining,
+        })
+
+
+class DoctorDailyStats(models.Model):
+    """Per-doctor, per-day appointment counters, kept current by analytics.apply_appointment_change"""
+    # The (doctor, date) unique constraint already serves per-doctor lookups
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='daily_stats', db_index=False)
+    date = models.DateField()
+    appointments = models.IntegerField(default=0)
+    booked_minutes = models.IntegerField(default=0)  # Every appointment that was not cancelled
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    no_show = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date'], name='doctordailystats_doctor_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='doctordailystats_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor} on {self.date}: {self.appointments} appointments"
+
+
+class WaitlistEntry(models.Model):
+    """A patient waiting for an earlier slot with a doctor, or with any doctor of a specialization"""
+    STATUS_CHOICES = (
+        ('WAITING', 'Waiting'),
+        ('OFFERED', 'Offered'),
+        ('BOOKED', 'Booked'),
+        ('WITHDRAWN', 'Withdrawn'),
+    )
+
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='waitlist_entries')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True, related_name='waitlist_entries',
+                               db_index=False)
+    specialization = models.ForeignKey(Specialization, on_delete=models.CASCADE, null=True, blank=True,
+                                       related_name='waitlist_entries', db_index=False)
+    # Window the patient can attend in, and how long the visit needs
+    earliest_start = models.DateTimeField()
+    latest_end = models.DateTimeField()
+    duration_minutes = models.PositiveIntegerField(default=30)
+    reason = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='WAITING')
+    # The slot currently offered, held until offer_expires_at
+    offered_doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    offered_start = models.DateTimeField(blank=True, null=True)
+    offered_end = models.DateTimeField(blank=True, null=True)
+    offer_expires_at = models.DateTimeField(blank=True, null=True)
+    # Who the offered slot must not go to when it is passed on: the patient who cancelled it and the
+    # entries that already let it go, so it never returns to someone who declined it
+    offer_excluded_patient = models.ForeignKey(Patient, on_delete=models.SET_NULL, null=True, blank=True,
+                                               related_name='+', db_index=False)
+    offer_passed_over = models.JSONField(default=list, blank=True)
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Freed slots are matched against waiting entries by doctor or specialization and window start
+            models.Index(fields=['doctor', 'earliest_start'], condition=models.Q(status='WAITING'),
+                         name='waitlist_doctor_window_idx'),
+            models.Index(fields=['specialization', 'earliest_start'], condition=models.Q(status='WAITING'),
+                         name='waitlist_spec_window_idx'),
+            models.Index(fields=['offer_expires_at'], condition=models.Q(status='OFFERED'),
+                         name='waitlist_offer_expiry_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(doctor__isnull=False) | models.Q(specialization__isnull=False),
+                                   name='waitlist_doctor_or_specialization'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient} waiting for {self.doctor or self.specialization} ({self.status})"
+
+
 class Notification(models.Model):
     """System notifications for users"""
+    # On PostgreSQL the table is range-partitioned by month on created_at (migration 0014, manage_partitions)
     user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='notifications')
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     related_url = models.URLField(blank=True, null=True)
+    # Events of one kind for one user within NOTIFICATION_COALESCE_MINUTES share a row (notifications.notify)
+    kind = models.CharField(max_length=40, blank=True, default='')
+    count = models.PositiveIntegerField(default=1)  # Events merged into this notification
+    last_event_at = models.DateTimeField(blank=True, null=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves the unread list (GetNotifications) without touching read rows
+            models.Index(fields=['user', '-created_at'], condition=models.Q(is_read=False),
+                         name='notification_user_unread_idx'),
+        ]
     
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:50]}..."
+
+
+class NotificationArchive(models.Model):
+    """Notifications past their retention period, kept when purge_notifications runs with --archive"""
+    id = models.BigIntegerField(primary_key=True)  # The id the notification had
+    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='+')
+    message = models.TextField()
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    related_url = models.URLField(blank=True, null=True)
+    kind = models.CharField(max_length=40, blank=True, default='')
+    count = models.PositiveIntegerField(default=1)
+    last_event_at = models.DateTimeField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived notification for {self.user_id}: {self.message[:50]}..."
+
+
+class IdempotencyKey(models.Model):
+    """Outcome of a create request sent with an Idempotency-Key header, replayed to retries until it expires"""
+    user = models.ForeignKey(UserDetails, on_delete=models.CASCADE, related_name='+', db_index=False)
+    key = models.CharField(max_length=64)  # SHA-256 of the header value
+    request_hash = models.CharField(max_length=64)  # SHA-256 of method, path and body, to reject reuse for another request
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)  # None while the first request is running
+    response = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotencykey_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotencykey_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key[:12]} for {self.user_id}"
+
+
+# Deleting a prescription removes its entry through the one-to-one cascade
+@receiver(post_save, sender=Prescription)
+def sync_active_medication(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ActiveMedication.sync(instance)
     
     
     
@@ -0,0 +1,102 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Notification
+
+# Kinds of event that coalesce, and the noun their digest counts
+APPOINTMENT_STATUS = 'appointment_status'
+APPOINTMENT_DELETED = 'appointment_deleted'
+APPOINTMENT_REMINDER = 'appointment_reminder'
+MEDICAL_RECORD_CREATED = 'medical_record_created'
+PRESCRIPTION_CREATED = 'prescription_created'
+TIME_OFF = 'time_off'
+WAITLIST = 'waitlist'
+
+DIGEST_LABELS = {
+    APPOINTMENT_STATUS: 'appointment updates',
+    APPOINTMENT_DELETED: 'deleted appointments',
+    APPOINTMENT_REMINDER: 'appointment reminders',
+    MEDICAL_RECORD_CREATED: 'new medical records',
+    PRESCRIPTION_CREATED: 'new prescriptions',
+    TIME_OFF: 'time off updates',
+    WAITLIST: 'waitlist updates',
+}
+
+
+def digest_message(kind, count, latest):
+    if count == 1:
+        return latest
+    return f"{count} {DIGEST_LABELS[kind]}. Latest: {latest}"
+
+
+def newest_first(notifications):
+    """Order notifications by their latest event, so a digest that just grew moves back to the top"""
+    return notifications.order_by(Coalesce('last_event_at', 'created_at').desc(), '-id')
+
+
+def _open_digests(user_ids, kind, now):
+    """{user_id: notification} of the newest unread notification of `kind` per user inside the coalescing window.
+
+    The rows are locked, so concurrent events for the same user merge one after the other.
+    """
+    minutes = settings.NOTIFICATION_COALESCE_MINUTES
+    if minutes <= 0:
+        return {}
+    # Bounded on created_at so the lookup uses the unread index and only the current partitions
+    candidates = (
+        Notification.objects.select_for_update()
+        .filter(user_id__in=user_ids, kind=kind, is_read=False, created_at__gte=now - timedelta(minutes=minutes))
+        .order_by('user_id', '-created_at')
+    )
+    digests = {}
+    for notification in candidates:
+        digests.setdefault(notification.user_id, notification)
+    return digests
+
+
+def notify(user_id, kind, message, related_url=None, now=None):
+    """Notify one user, merging into their open digest of the same kind if there is one. Returns the notification"""
+    return notify_many([(user_id, message)], kind, related_url, now)[0]
+
+
+def notify_many(events, kind, related_url=None, now=None):
+    """Notify about [(user_id, message)] events of one kind in a few statements; returns the notifications written.
+
+    Events for a user with an unread notification of this kind from the last NOTIFICATION_COALESCE_MINUTES
+    are folded into it: its count grows and its message becomes a digest ending with the latest event.
+    The remaining users get one new row each, itself a digest when they had several events.
+    """
+    now = now or timezone.now()
+    by_user = defaultdict(list)
+    for user_id, message in events:
+        by_user[user_id].append(message)
+    if not by_user:
+        return []
+
+    with transaction.atomic():
+        digests = _open_digests(list(by_user), kind, now)
+        merged, created = [], []
+        for user_id, messages in by_user.items():
+            digest = digests.get(user_id)
+            if digest is not None:
+                digest.count += len(messages)
+                digest.message = digest_message(kind, digest.count, messages[-1])
+                digest.last_event_at = now
+                digest.related_url = related_url
+                merged.append(digest)
+            else:
+                created.append(Notification(
+                    user_id=user_id, kind=kind, count=len(messages),
+                    message=digest_message(kind, len(messages), messages[-1]),
+                    related_url=related_url, last_event_at=now,
+                ))
+        if merged:
+            Notification.objects.bulk_update(merged, ['count', 'message', 'last_event_at', 'related_url'])
+        if created:
+            created = Notification.objects.bulk_create(created)
+    return merged + created
@@ -0,0 +1,120 @@
+import gzip
+import os
+import re
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Notification
+
+# Tables range-partitioned by month on PostgreSQL (migration 0014), with their partition key
+PARTITIONED = {
+    Notification._meta.db_table: 'created_at',
+}
+
+
+def is_partitioned(table):
+    """Whether `table` is a partitioned PostgreSQL table; always False on other databases"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+        return cursor.fetchone() is not None
+
+
+def month_start(value):
+    """Midnight on the first of the month `value` falls in, in the hospital time zone"""
+    local = timezone.localtime(value, timezone.get_default_timezone())
+    return timezone.make_aware(datetime(local.year, local.month, 1), timezone.get_default_timezone())
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return timezone.make_aware(datetime(index // 12, index % 12 + 1, 1), timezone.get_default_timezone())
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def partitions(table):
+    """[(name, month)] of the monthly partitions of `table`, oldest first; the default partition is left out"""
+    pattern = re.compile(rf'^{re.escape(table)}_p(\d{{4}})(\d{{2}})$')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = %s',
+            [table]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    found = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            month = timezone.make_aware(datetime(int(match[1]), int(match[2]), 1), timezone.get_default_timezone())
+            found.append((name, month))
+    return sorted(found, key=lambda item: item[1])
+
+
+def create_partition(table, month):
+    """Create the partition for `month`, moving in rows the default partition caught for it.
+
+    Returns False when it already exists.
+    """
+    quote = connection.ops.quote_name
+    name = partition_name(table, month)
+    column = quote(PARTITIONED[table])
+    start, end = month, add_months(month, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)')
+        # ATTACH refuses a range the default partition already holds rows for, so those rows move first
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {quote(table + "_default")} WHERE {column} >= %s AND {column} < %s '
+            f'RETURNING *) INSERT INTO {quote(name)} SELECT * FROM moved',
+            [start, end]
+        )
+        # Bounds are written as literals: older PostgreSQL versions accept no expressions there
+        cursor.execute(f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} "
+                       f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')")
+    return True
+
+
+def ensure_partitions(table, months_ahead, now=None):
+    """Create the partitions from the current month to `months_ahead` months out; returns the names created"""
+    current = month_start(now or timezone.now())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if create_partition(table, month):
+            created.append(partition_name(table, month))
+    return created
+
+
+def detach_partitions(table, retain_months, archive_dir=None, drop=False, now=None):
+    """Detach the partitions that ended more than `retain_months` months ago; returns their names.
+
+    Detaching leaves each one as a plain table. With `archive_dir` it is first written to
+    <archive_dir>/<name>.csv.gz, then dropped; with `drop` it is dropped without an archive.
+    """
+    cutoff = add_months(month_start(now or timezone.now()), -retain_months)
+    quote = connection.ops.quote_name
+    detached = []
+    for name, month in partitions(table):
+        if add_months(month, 1) > cutoff:
+            break
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+            if archive_dir:
+                os.makedirs(archive_dir, exist_ok=True)
+                with gzip.open(os.path.join(archive_dir, f'{name}.csv.gz'), 'wt', newline='') as handle:
+                    cursor.copy_expert(f'COPY {quote(name)} TO STDOUT WITH (FORMAT csv, HEADER)', handle)
+            if archive_dir or drop:
+                cursor.execute(f'DROP TABLE {quote(name)}')
+        detached.append(name)
+    return detached
@@ -0,0 +1,169 @@
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from appointmentapp import metrics
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = str(settings.BASE_DIR)
+# Execute wrappers chain into each other, so their own frames are never the call site
+INSTRUMENTATION_FILES = {os.path.abspath(__file__), os.path.abspath(metrics.__file__)}
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+_TABLE_RE = re.compile(r'\bFROM\s+"?(\w+)"?', re.IGNORECASE)
+
+
+class NPlusOneDetected(AssertionError):
+    """Raised when a request repeats the same statement more often than allowed"""
+
+
+def fingerprint(sql):
+    """Normalise a statement so queries differing only by literals or IN-list length compare equal"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def call_site():
+    """Innermost project frame (outside Django and third party packages) that led to the query"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_ROOT) and filename not in INSTRUMENTATION_FILES and 'site-packages' not in filename:
+            return f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+class QueryGroup:
+    """Executions of one statement shape within a request"""
+
+    def __init__(self, shape, sql):
+        self.shape = shape
+        self.sql = sql
+        self.count = 0
+        self.duration = 0.0
+        self.params = set()
+        self.call_sites = {}
+
+    @property
+    def table(self):
+        match = _TABLE_RE.search(self.sql)
+        return match.group(1) if match else '?'
+
+    @property
+    def exact_duplicates(self):
+        """Executions that repeated an identical statement with identical parameters"""
+        return self.count - len(self.params)
+
+    def describe(self):
+        sites = ', '.join(f'{site} (x{count})' for site, count in sorted(self.call_sites.items(), key=lambda i: -i[1]))
+        return f'{self.count}x {self.table} [{self.exact_duplicates} identical] {self.duration * 1000:.1f}ms from {sites}: {self.shape[:300]}'
+
+
+class QueryProfiler:
+    """Connection execute wrapper that groups statements by fingerprint and records where they came from"""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or getattr(settings, 'QUERY_PROFILER_THRESHOLD', 5)
+        self.groups = {}
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            shape = fingerprint(sql)
+            group = self.groups.get(shape)
+            if group is None:
+                group = self.groups[shape] = QueryGroup(shape, sql)
+            group.count += 1
+            group.duration += duration
+            group.params.add(repr(params))
+            site = call_site()
+            group.call_sites[site] = group.call_sites.get(site, 0) + 1
+            self.total += 1
+
+    def repeated(self):
+        """Statement shapes executed at least `threshold` times, most frequent first"""
+        flagged = [group for group in self.groups.values() if group.count >= self.threshold]
+        return sorted(flagged, key=lambda group: -group.count)
+
+    def summary_header(self):
+        repeated = self.repeated()
+        parts = [f'queries={self.total}', f'distinct={len(self.groups)}']
+        parts.extend(
+            f'repeated={group.table}x{group.count}@{max(group.call_sites, key=group.call_sites.get)}'
+            for group in repeated[:3]
+        )
+        return '; '.join(parts)
+
+
+@contextmanager
+def profile_queries(threshold=None):
+    """Profile every query issued inside the block, including those the async ORM runs in worker threads"""
+    profiler = QueryProfiler(threshold)
+    with metrics.query_wrapper(profiler):
+        yield profiler
+
+
+@contextmanager
+def assert_no_n_plus_one(threshold=None):
+    """Fail when any statement shape repeats `threshold` or more times inside the block, for use in tests"""
+    with profile_queries(threshold) as profiler:
+        yield profiler
+    repeated = profiler.repeated()
+    if repeated:
+        raise NPlusOneDetected('Repeated queries detected:\n' + '\n'.join(group.describe() for group in repeated))
+
+
+class QueryProfilerMiddleware:
+    """Flag N+1 and duplicate queries per request in the log and the X-Query-Profile header"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.raise_on_repeat = getattr(settings, 'QUERY_PROFILER_RAISE', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profile_queries() as profiler:
+            response = self.get_response(request)
+        return self.report(request, response, profiler)
+
+    async def __acall__(self, request):
+        with profile_queries() as profiler:
+            response = await self.get_response(request)
+        return self.report(request, response, profiler)
+
+    def report(self, request, response, profiler):
+        repeated = profiler.repeated()
+        response['X-Query-Profile'] = profiler.summary_header()
+        if repeated:
+            details = '\n'.join(group.describe() for group in repeated)
+            logger.warning('Repeated queries in %s %s:\n%s', request.method, request.path, details)
+            if self.raise_on_repeat:
+                raise NPlusOneDetected(f'Repeated queries in {request.method} {request.path}:\n{details}')
+        return response
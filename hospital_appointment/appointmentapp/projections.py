@@ -0,0 +1,146 @@
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from drf_yasg import openapi
+from rest_framework import status as http_status
+from rest_framework.response import Response
+
+
+def full_name(user_path):
+    """'First Last' of the user reached through `user_path`"""
+    return Concat(F(f'{user_path}__first_name'), Value(' '), F(f'{user_path}__last_name'))
+
+
+# Compact list representations: output key -> ORM expression (None for a plain column of the same name)
+APPOINTMENT_LIST_FIELDS = {
+    'id': None,
+    'patient_id': None,
+    'patient_name': full_name('patient__user'),
+    'doctor_id': None,
+    'doctor_name': full_name('doctor__user'),
+    'scheduled_time': None,
+    'end_time': None,
+    'status': None,
+}
+
+MEDICAL_RECORD_LIST_FIELDS = {
+    'id': None,
+    'appointment_id': None,
+    'patient_id': None,
+    'patient_name': full_name('patient__user'),
+    'doctor_id': None,
+    'doctor_name': full_name('doctor__user'),
+    'record_type': None,
+    'title': None,
+    'date_recorded': None,
+    'is_sensitive': None,
+}
+
+PRESCRIPTION_LIST_FIELDS = {
+    'id': None,
+    'medical_record_id': None,
+    'patient_name': full_name('medical_record__patient__user'),
+    'medication_name': None,
+    'dosage': None,
+    'frequency': None,
+    'start_date': None,
+    'end_date': None,
+    'refills_remaining': None,
+}
+
+AVAILABILITY_LIST_FIELDS = {
+    'id': None,
+    'doctor_id': None,
+    'doctor_name': full_name('doctor__user'),
+    'day_of_week': None,
+    'start_time': None,
+    'end_time': None,
+    'valid_from': None,
+    'valid_until': None,
+}
+
+NOTIFICATION_LIST_FIELDS = {
+    'id': None,
+    'message': None,
+    'is_read': None,
+    'created_at': None,
+    'related_url': None,
+    'kind': None,
+    'count': None,
+    'last_event_at': None,
+}
+
+SPECIALIZATION_LIST_FIELDS = {
+    'id': None,
+    'name': None,
+    'description': None,
+}
+
+DOCTOR_LIST_FIELDS = {
+    'id': None,
+    'user_id': None,
+    'name': full_name('user'),
+    'consultation_fee': None,
+}
+
+PATIENT_LIST_FIELDS = {
+    'id': None,
+    'user_id': None,
+    'name': full_name('user'),
+    'phone_number': F('user__phone_number'),
+}
+
+LIST_VIEW_PARAMETERS = [
+    openapi.Parameter(
+        name='view',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        enum=['compact'],
+        required=False,
+        description="Return compact rows with ids and display names instead of nested objects"
+    ),
+    openapi.Parameter(
+        name='fields',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        required=False,
+        description="Comma separated subset of the compact fields to return (implies view=compact)"
+    ),
+]
+
+
+def _values(queryset, spec, fields=None):
+    selected = [name for name in spec if not fields or name in fields]
+    columns = [name for name in selected if spec[name] is None]
+    expressions = {name: spec[name] for name in selected if spec[name] is not None}
+    return queryset.values(*columns, **expressions)
+
+
+def project(queryset, spec, fields=None):
+    """Rows of `queryset` as plain dicts built with .values(), without instantiating models"""
+    return list(_values(queryset, spec, fields))
+
+
+async def aproject(queryset, spec, fields=None):
+    """project() through the async ORM, for async views"""
+    return [row async for row in _values(queryset, spec, fields)]
+
+
+def requested_fields(params, spec):
+    """Names listed in ?fields=, all of them known to `spec`. Raises ValueError naming the unknown ones"""
+    fields = [name.strip() for name in params.get('fields', '').split(',') if name.strip()]
+    unknown = [name for name in fields if name not in spec]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}. Available fields: {", ".join(spec)}')
+    return fields
+
+
+def compact_response(request, queryset, spec):
+    """Compact list response when ?view=compact or ?fields= is requested, otherwise None"""
+    params = request.query_params
+    if params.get('view') != 'compact' and 'fields' not in params:
+        return None
+    try:
+        fields = requested_fields(params, spec)
+    except ValueError as e:
+        return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+    return Response(project(queryset, spec, fields))
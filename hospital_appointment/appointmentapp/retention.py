@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification, NotificationArchive
+
+ARCHIVED_FIELDS = (
+    'id', 'user_id', 'message', 'is_read', 'created_at', 'related_url', 'kind', 'count', 'last_event_at'
+)
+
+
+def expired_notifications(read_ttl_days, unread_ttl_days, now=None):
+    """Notifications past their TTL: read ones after `read_ttl_days`, unread ones after `unread_ttl_days`.
+
+    A TTL of 0 keeps that kind forever. Each branch bounds created_at, so a partitioned table
+    only scans the partitions old enough to hold matches.
+    """
+    now = now or timezone.now()
+    condition = Q()
+    if read_ttl_days > 0:
+        condition |= Q(is_read=True, created_at__lt=now - timedelta(days=read_ttl_days))
+    if unread_ttl_days > 0:
+        condition |= Q(is_read=False, created_at__lt=now - timedelta(days=unread_ttl_days))
+    if not condition:
+        return Notification.objects.none()
+    return Notification.objects.filter(condition)
+
+
+def unread_window_start(now=None):
+    """Oldest created_at still shown in the unread list, None when unread notifications never expire"""
+    if settings.NOTIFICATION_UNREAD_TTL_DAYS <= 0:
+        return None
+    return (now or timezone.now()) - timedelta(days=settings.NOTIFICATION_UNREAD_TTL_DAYS)
+
+
+def purge_notifications(read_ttl_days, unread_ttl_days, batch_size=5000, archive=False, now=None):
+    """Delete expired notifications in batches, each in its own short transaction. Returns how many were removed.
+
+    With `archive` every batch is copied to NotificationArchive in the same transaction as its delete.
+    """
+    expired = expired_notifications(read_ttl_days, unread_ttl_days, now).order_by('created_at')
+    purged = 0
+    while True:
+        with transaction.atomic():
+            if archive:
+                rows = list(expired.values(*ARCHIVED_FIELDS)[:batch_size])
+                ids = [row['id'] for row in rows]
+                NotificationArchive.objects.bulk_create(
+                    [NotificationArchive(**row) for row in rows], ignore_conflicts=True
+                )
+            else:
+                ids = list(expired.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return purged
+            # Deleting through `expired` keeps the created_at bounds, so only the old partitions are probed
+            purged += expired.filter(id__in=ids).delete()[0]
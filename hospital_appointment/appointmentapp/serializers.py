@@ -12,8 +12,8 @@ class TimeOffSerializer(serializers.ModelSerializer):
     doctor= DoctorSerializer
     class Meta:
         model= TimeOff
-        fields= ['id', 'doctor', 'start_datetime', 'end_datetime', 'reason', 'is_approved', 'created_at', 'updated_at']
-        read_only_fields= ['created_at', 'updated_at']
+        fields= ['id', 'doctor', 'start_datetime', 'end_datetime', 'reason', 'is_approved', 'version', 'created_at', 'updated_at']
+        read_only_fields= ['version', 'created_at', 'updated_at']
         
     # def validate(self, data):
     #     if data['start_datetime'] >= data['end_datetime']:
@@ -30,8 +30,8 @@ class AppointmentSerializer(serializers.ModelSerializer):
         model = Appointment
         fields = ['id', 'patient', 'doctor',
                  'scheduled_time', 'end_time', 'status', 'reason', 'notes',
-                 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+                 'version', 'created_at', 'updated_at']
+        read_only_fields = ['version', 'created_at', 'updated_at']
     
     # def validate(self, data):
     #     if data['scheduled_time'] >= data['end_time']:
@@ -57,8 +57,8 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
         fields = ['id', 'doctor',
                  'appointment', 'record_type', 'title',
                  'description', 'date_recorded', 'file', 'is_sensitive',
-                 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+                 'version', 'created_at', 'updated_at']
+        read_only_fields = ['version', 'created_at', 'updated_at']
     
     def validate(self, data):
         if 'file' in data and data['file'] and data['file'].size > 10*1024*1024:  # 10MB limit
@@ -72,7 +72,8 @@ class PrescriptionSerializer(serializers.ModelSerializer):
         model = Prescription
         fields = ['id', 'medical_record', 'medication_name',
                  'dosage', 'frequency', 'start_date', 'end_date',
-                 'refills_remaining', 'instructions']
+                 'refills_remaining', 'instructions', 'version']
+        read_only_fields = ['version']
     
     def validate(self, data):
         if 'end_date' in data and data['end_date'] and data['start_date'] > data['end_date']:
@@ -80,11 +81,32 @@ class PrescriptionSerializer(serializers.ModelSerializer):
         return data
 
     
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'patient', 'doctor', 'specialization', 'earliest_start', 'latest_end', 'duration_minutes',
+                  'reason', 'status', 'offered_doctor', 'offered_start', 'offered_end', 'offer_expires_at',
+                  'appointment', 'created_at', 'updated_at']
+        read_only_fields = fields
+
 class NotificationSerializer(serializers.ModelSerializer):
     user= UserSerializer(read_only=True)
     
     class Meta:
         model = Notification
         fields = ['id', 'user', 'message', 'is_read',
-                 'created_at', 'related_url']
-        read_only_fields = ['created_at']
\ No newline at end of file
+                 'created_at', 'related_url', 'kind', 'count', 'last_event_at']
+        read_only_fields = ['created_at', 'kind', 'count', 'last_event_at']
+
+
+# Eager loading for the nested serializers above, see users.serializers.doctor_related
+def appointment_related(queryset, prefix=''):
+    return doctor_related(patient_related(queryset, f'{prefix}patient__'), f'{prefix}doctor__')
+
+
+def medical_record_related(queryset, prefix=''):
+    return appointment_related(doctor_related(queryset, f'{prefix}doctor__'), f'{prefix}appointment__')
+
+
+def prescription_related(queryset):
+    return medical_record_related(queryset, 'medical_record__')
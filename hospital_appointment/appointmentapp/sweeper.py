@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import analytics, notifications
+from .datetimes import format_local
+from .models import Appointment
+from .projections import full_name
+
+STATUS_MESSAGES = {
+    'NO_SHOW': 'Patient no show for appointment with {doctor} on {time}',
+    'COMPLETED': 'Appointment completed with {doctor} on {time}',
+    'CANCELLED': 'Appointment cancelled with {doctor} on {time}',
+}
+
+
+def sweep_policy(value=None):
+    """{from_status: to_status} parsed from APPOINTMENT_SWEEP_POLICY, e.g. 'SCHEDULED=NO_SHOW,IN_PROGRESS=COMPLETED'"""
+    value = settings.APPOINTMENT_SWEEP_POLICY if value is None else value
+    policy = {}
+    for pair in filter(None, (part.strip() for part in value.split(','))):
+        source, _, target = (part.strip().upper() for part in pair.partition('='))
+        if source not in Appointment.OPEN_STATUSES or target not in STATUS_MESSAGES:
+            raise ImproperlyConfigured(
+                f'Invalid sweep rule {pair!r}: use FROM=TO with FROM in {", ".join(Appointment.OPEN_STATUSES)} '
+                f'and TO in {", ".join(STATUS_MESSAGES)}'
+            )
+        policy[source] = target
+    return policy
+
+
+def stale(source, cutoff):
+    """Appointments still in `source` that ended before `cutoff`, oldest first"""
+    # The redundant status__in repeats appointment_open_end_idx's condition so the planner can match it directly
+    return Appointment.objects.filter(
+        status__in=Appointment.OPEN_STATUSES, status=source, end_time__lt=cutoff
+    ).order_by('end_time')
+
+
+def sweep_batch(source, target, cutoff, batch_size, notify=True, now=None):
+    """Move one batch of stale appointments from `source` to `target` in one transaction.
+
+    The status change is a single UPDATE over the claimed ids; rows a doctor is editing are skipped
+    (SKIP LOCKED) and picked up by the next run. Returns how many appointments changed.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(
+            stale(source, cutoff).select_for_update(skip_locked=True, of=('self',))
+            .values_list('id', 'doctor_id', 'scheduled_time', 'end_time', 'patient__user_id', full_name('doctor__user'))
+            [:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [row[0] for row in rows]
+        # updated_at is set explicitly since UPDATE skips auto_now, and incremental exports rely on it;
+        # the version bump makes clients holding the old ETag reload before editing
+        updated = Appointment.objects.filter(id__in=ids, status=source).update(
+            status=target, reminder_due_at=None, updated_at=now, version=F('version') + 1
+        )
+
+        changes = []
+        for _, doctor_id, scheduled_time, end_time, _, _ in rows:
+            before = Appointment(doctor_id=doctor_id, scheduled_time=scheduled_time, end_time=end_time, status=source)
+            after = Appointment(doctor_id=doctor_id, scheduled_time=scheduled_time, end_time=end_time, status=target)
+            changes.append((analytics.snapshot(before), analytics.snapshot(after)))
+        analytics.apply_appointment_changes(changes)
+
+        if notify:
+            notifications.notify_many([
+                (user_id, STATUS_MESSAGES[target].format(doctor=doctor_name, time=format_local(scheduled_time)))
+                for _, _, scheduled_time, _, user_id, doctor_name in rows
+            ], notifications.APPOINTMENT_STATUS, now=now)
+    return updated
+
+
+def sweep(policy=None, grace_minutes=None, batch_size=None, notify=None, now=None, on_batch=None):
+    """Apply the sweep policy to every appointment that ended more than `grace_minutes` ago.
+
+    Returns {from_status: count}.
+    """
+    policy = sweep_policy() if policy is None else policy
+    grace_minutes = settings.APPOINTMENT_SWEEP_GRACE_MINUTES if grace_minutes is None else grace_minutes
+    batch_size = batch_size or settings.APPOINTMENT_SWEEP_BATCH_SIZE
+    notify = settings.APPOINTMENT_SWEEP_NOTIFY if notify is None else notify
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=grace_minutes)
+
+    counts = {}
+    for source, target in policy.items():
+        counts[source] = 0
+        while True:
+            changed = sweep_batch(source, target, cutoff, batch_size, notify, now)
+            counts[source] += changed
+            if on_batch and changed:
+                on_batch(source, target, changed)
+            if changed < batch_size:
+                break
+    return counts
+
+
+def pending(policy=None, grace_minutes=None, now=None):
+    """{from_status: count} a sweep would change, without changing anything"""
+    policy = sweep_policy() if policy is None else policy
+    grace_minutes = settings.APPOINTMENT_SWEEP_GRACE_MINUTES if grace_minutes is None else grace_minutes
+    cutoff = (now or timezone.now()) - timedelta(minutes=grace_minutes)
+    return {source: stale(source, cutoff).count() for source in policy}
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from oauth2_provider.models import AccessToken, Application
+
+from users.models import Doctor, Patient, UserDetails
+from appointmentapp.models import Appointment, MedicalRecord
+
+
+def create_user(username, user_type, **fields):
+    """User with a password; the users app signal adds the Doctor or Patient profile"""
+    user = UserDetails(username=username, email=f'{username}@example.com', user_type=user_type,
+                       first_name=username.title(), last_name='Test', **fields)
+    user.set_password('password')
+    user.save()
+    return user
+
+
+class APITestCase(TestCase):
+    """A doctor, a patient and an admin with bearer tokens, and one appointment with a medical record"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.application = Application.objects.create(
+            name='tests', client_type='confidential', authorization_grant_type='password'
+        )
+        cls.doctor_user = create_user('doctor', 'DOCTOR')
+        cls.patient_user = create_user('patient', 'PATIENT', phone_number='0700000001')
+        cls.admin_user = create_user('admin', 'ADMIN')
+        cls.doctor = Doctor.objects.get(user=cls.doctor_user)
+        cls.patient = Patient.objects.get(user=cls.patient_user)
+        start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        cls.appointment = cls.create_appointment(start)
+        cls.record = MedicalRecord.objects.create(
+            doctor=cls.doctor, appointment=cls.appointment, record_type='DIAGNOSIS',
+            title='Checkup', description='Routine checkup'
+        )
+
+    @classmethod
+    def create_appointment(cls, start, minutes=30, **fields):
+        return Appointment.objects.create(
+            patient=fields.pop('patient', cls.patient), doctor=fields.pop('doctor', cls.doctor),
+            scheduled_time=start, end_time=start + timedelta(minutes=minutes), **fields
+        )
+
+    @classmethod
+    def auth(cls, user):
+        """Request headers carrying a read/write bearer token for `user`"""
+        token, _ = AccessToken.objects.get_or_create(
+            user=user, application=cls.application, token=f'token-{user.username}',
+            defaults={'expires': timezone.now() + timedelta(days=1), 'scope': 'read write'}
+        )
+        return {'HTTP_AUTHORIZATION': f'Bearer {token.token}'}
@@ -0,0 +1,119 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from appointmentapp import analytics
+from appointmentapp.models import Appointment, AvailabilitySchedule, DoctorDailyStats
+from users.models import Specialization
+from .base import APITestCase
+
+
+def rollup():
+    """The rollup rows that count anything, as comparable tuples"""
+    return sorted(
+        row for row in DoctorDailyStats.objects.values_list('doctor_id', 'date', *analytics.COUNTERS)
+        if any(row[2:])
+    )
+
+
+class AnalyticsRollupTests(APITestCase):
+
+    def setUp(self):
+        analytics.rebuild()
+        zone = timezone.get_default_timezone()
+        self.day = analytics.stats_date(self.appointment.scheduled_time) + timedelta(days=2)
+        self.late_start = datetime.combine(self.day, time(22, 30), tzinfo=zone)
+
+    def assertMatchesRebuild(self):
+        incremental = rollup()
+        with transaction.atomic():
+            analytics.rebuild()
+            rebuilt = rollup()
+            transaction.set_rollback(True)
+        self.assertEqual(incremental, rebuilt)
+
+    def book(self, start, minutes=90):
+        response = self.client.post('/api/v1/appointment/', {
+            'patient_id': self.patient.id, 'scheduled_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=minutes)).isoformat(), 'reason': 'Follow-up', 'notes': 'Fasting',
+        }, content_type='application/json', **self.auth(self.doctor_user))
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def update(self, appointment_id, **data):
+        response = self.client.patch(f'/api/v1/appointment-by-id/{appointment_id}/', data,
+                                     content_type='application/json', **self.auth(self.doctor_user))
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_snapshot(self):
+        key, counters = analytics.snapshot(self.appointment)
+        self.assertEqual(key, (self.doctor.id, analytics.stats_date(self.appointment.scheduled_time)))
+        self.assertEqual(counters, {'appointments': 1, 'booked_minutes': 30, 'completed': 0, 'cancelled': 0, 'no_show': 0})
+
+        self.appointment.status = 'CANCELLED'
+        _, counters = analytics.snapshot(self.appointment)
+        self.assertEqual((counters['cancelled'], counters['booked_minutes']), (1, 0))
+        self.assertIsNone(analytics.snapshot(None))
+
+    def test_apply_appointment_changes_merges_deltas_per_row(self):
+        before = analytics.snapshot(self.appointment)
+        self.appointment.status = 'NO_SHOW'
+        after = analytics.snapshot(self.appointment)
+
+        analytics.apply_appointment_changes([(before, after), (None, after), (after, None)])
+
+        stats = DoctorDailyStats.objects.get()
+        self.assertEqual((stats.appointments, stats.booked_minutes, stats.no_show), (1, 30, 1))
+
+    def test_views_keep_the_rollup_equal_to_a_rebuild(self):
+        appointment_id = self.book(self.late_start)
+        self.assertMatchesRebuild()
+
+        self.update(self.appointment.id, status='COMPLETED')
+        self.assertMatchesRebuild()
+
+        # Past midnight in the hospital time zone, so the appointment moves to the next day's row
+        next_day = self.late_start + timedelta(hours=2)
+        self.update(appointment_id, scheduled_time=next_day.isoformat(),
+                    end_time=(next_day + timedelta(minutes=90)).isoformat())
+        self.assertEqual(DoctorDailyStats.objects.get(date=self.day + timedelta(days=1)).appointments, 1)
+        self.assertMatchesRebuild()
+
+        self.update(appointment_id, status='CANCELLED')
+        self.assertMatchesRebuild()
+
+        response = self.client.delete(f'/api/v1/appointment-by-id/{appointment_id}/', **self.auth(self.doctor_user))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertMatchesRebuild()
+
+    def test_rebuild_range_replaces_only_its_days(self):
+        other_day = self.day + timedelta(days=5)
+        DoctorDailyStats.objects.create(doctor=self.doctor, date=self.day, appointments=9)
+        DoctorDailyStats.objects.create(doctor=self.doctor, date=other_day, appointments=9)
+        self.create_appointment(self.late_start, minutes=60)
+
+        self.assertEqual(analytics.rebuild_range(self.day, self.day), 1)
+
+        stats = DoctorDailyStats.objects.get(date=self.day)
+        self.assertEqual((stats.appointments, stats.booked_minutes), (1, 60))
+        self.assertEqual(DoctorDailyStats.objects.get(date=other_day).appointments, 9)
+
+    def test_summaries(self):
+        cardiology = Specialization.objects.create(name='Cardiology')
+        self.doctor.specializations.add(cardiology)
+        day = analytics.stats_date(self.appointment.scheduled_time)
+        AvailabilitySchedule.objects.create(doctor=self.doctor, day_of_week=day.weekday(), start_time=time(8),
+                                            end_time=time(10), valid_from=day)
+        Appointment.objects.filter(id=self.appointment.id).update(status='NO_SHOW')
+        analytics.rebuild()
+
+        [doctor_row] = analytics.doctor_summary(day, day)
+        self.assertEqual(doctor_row['doctor_id'], self.doctor.id)
+        self.assertEqual((doctor_row['booked_minutes'], doctor_row['available_minutes']), (30, 120))
+        self.assertEqual((doctor_row['utilization'], doctor_row['no_show_rate']), (0.25, 1.0))
+
+        [specialization_row] = analytics.specialization_summary(day, day)
+        self.assertEqual(specialization_row['specialization'], 'Cardiology')
+        self.assertEqual((specialization_row['doctors'], specialization_row['available_minutes']), (1, 120))
+        self.assertEqual(specialization_row['cancellation_rate'], 0.0)
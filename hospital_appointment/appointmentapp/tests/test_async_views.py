@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from appointmentapp.models import Notification
+from .base import APITestCase
+
+
+class AsyncNotificationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        for minutes, microsecond in ((2, 123456), (1, 654321)):
+            notification = Notification.objects.create(user=cls.patient_user, message=f'{minutes} minutes ago')
+            # Sub-millisecond parts, which a millisecond timestamp would lose
+            Notification.objects.filter(id=notification.id).update(
+                created_at=(now - timedelta(minutes=minutes)).replace(microsecond=microsecond)
+            )
+        # AsyncClient takes headers by name; the token is created here as the ORM is sync
+        cls.headers = {'Authorization': cls.auth(cls.patient_user)['HTTP_AUTHORIZATION']}
+
+    async def test_since_the_last_timestamp_returns_nothing_new(self):
+        response = await self.async_client.get('/api/v1/async/notification/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()
+        self.assertEqual(len(rows), 2)
+        latest = max(row['created_at'] for row in rows)
+        self.assertTrue(latest.endswith('.654321Z'), latest)
+
+        response = await self.async_client.get('/api/v1/async/notification/', {'since': latest}, headers=self.headers)
+        self.assertEqual(response.json(), [])
+
+    async def test_rows_match_the_sync_compact_view(self):
+        async_rows = await self.async_client.get('/api/v1/async/notification/', headers=self.headers)
+        sync_rows = await self.async_client.get('/api/v1/notification/', {'view': 'compact'}, headers=self.headers)
+
+        self.assertEqual(sync_rows.status_code, 200)
+        self.assertEqual(async_rows.content, sync_rows.content)
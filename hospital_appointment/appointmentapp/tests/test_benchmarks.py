@@ -0,0 +1,40 @@
+import io
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from appointmentapp import benchmarks
+
+ITERATIONS = 5
+WARMUP = 1
+
+
+class BenchmarkRegressionTests(TestCase):
+    """Runs the run_benchmarks scenarios on a small seeded dataset and fails on regressions against
+    benchmarks/test_suite_<database>.json. Regenerate it with BENCHMARK_SAVE_BASELINE=True after an
+    intended change; query counts differ between databases, so each has its own baseline"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_hospital', doctors=4, patients=40, appointments=300, notifications_per_doctor=10,
+                     prefix='bench', stdout=io.StringIO())
+
+    def test_scenarios_match_baseline(self):
+        name = f'test_suite_{connection.vendor}'
+        context = benchmarks.BenchmarkContext()
+        results = {
+            scenario.name: benchmarks.run_scenario(context, scenario, ITERATIONS, WARMUP)
+            for scenario in context.scenarios()
+        }
+        if settings.BENCHMARK_SAVE_BASELINE:
+            path = benchmarks.save_baseline(name, results)
+            self.skipTest(f'Baseline saved to {path}')
+        if not benchmarks.baseline_path(name).exists():
+            self.skipTest(f'No {connection.vendor} baseline yet, run with BENCHMARK_SAVE_BASELINE=True')
+
+        baseline = benchmarks.load_baseline(name)
+        self.assertEqual(sorted(results), sorted(baseline), 'Scenarios changed, regenerate the baseline')
+        problems = benchmarks.regressions(results, baseline, settings.BENCHMARK_TEST_THRESHOLD or None)
+        self.assertFalse(problems, '\n'.join(problems))
@@ -0,0 +1,109 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from appointmentapp import idempotency
+from appointmentapp.models import Appointment, IdempotencyKey, Prescription
+from .base import APITestCase
+
+URL = '/api/v1/prescription/'
+
+
+class IdempotentCreateTests(APITestCase):
+
+    def prescription_data(self, **fields):
+        return {
+            'medical_record_id': self.record.id,
+            'medication_name': 'Amoxicillin',
+            'dosage': '500mg',
+            'frequency': 'Twice a day',
+            'start_date': str(timezone.localdate()),
+            'refills_remaining': 2,
+            **fields,
+        }
+
+    def post(self, data, key='key-1'):
+        return self.client.post(URL, data, content_type='application/json',
+                                HTTP_IDEMPOTENCY_KEY=key, **self.auth(self.doctor_user))
+
+    def test_retry_replays_the_stored_response(self):
+        data = self.prescription_data()
+        first = self.post(data)
+        retry = self.post(data)
+
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Prescription.objects.count(), 1)
+
+    def test_key_reused_for_a_different_request_is_rejected(self):
+        self.post(self.prescription_data())
+        response = self.post(self.prescription_data(dosage='250mg'))
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Prescription.objects.count(), 1)
+
+    def test_key_of_a_request_in_flight_conflicts(self):
+        data = self.prescription_data()
+        request_hash = idempotency._digest('POST', URL, json.dumps(data, sort_keys=True, default=str))
+        IdempotencyKey.objects.create(
+            user=self.doctor_user, key=idempotency._digest('key-1'), request_hash=request_hash,
+            expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        response = self.post(data)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Prescription.objects.exists())
+        # The running request still owns the key
+        self.assertIsNone(IdempotencyKey.objects.get().status_code)
+
+    def test_validation_error_is_stored(self):
+        data = self.prescription_data(dosage='')
+        first = self.post(data)
+        retry = self.post(data)
+
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 400)
+
+    def test_unexpected_error_releases_the_key(self):
+        data = self.prescription_data()
+        with mock.patch.object(Prescription, 'save', side_effect=RuntimeError('database went away')):
+            failed = self.post(data)
+        self.assertEqual(failed.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        retry = self.post(data)
+        self.assertEqual(retry.status_code, 201, retry.content)
+        self.assertFalse(retry.has_header('Idempotent-Replayed'))
+        self.assertEqual(Prescription.objects.count(), 1)
+
+
+class IdempotentAppointmentTests(APITestCase):
+
+    def test_slot_conflict_is_not_stored(self):
+        data = {
+            'patient_id': self.patient.id,
+            'scheduled_time': self.appointment.scheduled_time.isoformat(),
+            'end_time': self.appointment.end_time.isoformat(),
+            'reason': 'Follow-up',
+            'notes': 'Bring results',
+        }
+
+        def post():
+            return self.client.post('/api/v1/appointment/', data, content_type='application/json',
+                                    HTTP_IDEMPOTENCY_KEY='key-1', **self.auth(self.doctor_user))
+
+        taken = post()
+        self.assertEqual(taken.status_code, 400, taken.content)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        # Once the slot is free, the retry books it instead of replaying the overlap error
+        Appointment.objects.filter(id=self.appointment.id).update(status='CANCELLED')
+        retry = post()
+        self.assertEqual(retry.status_code, 201, retry.content)
+        self.assertFalse(retry.has_header('Idempotent-Replayed'))
+
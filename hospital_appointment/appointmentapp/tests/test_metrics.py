@@ -0,0 +1,40 @@
+from django.test import TestCase, override_settings
+
+from appointmentapp import metrics
+
+
+class MetricsViewTests(TestCase):
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_not_served_without_a_token_even_under_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='', METRICS_PUBLIC=True)
+    def test_served_without_a_token_when_public(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape-secret', METRICS_PUBLIC=True)
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    def test_unknown_methods_share_one_label(self):
+        for method in ('BREW', 'PROPFIND', 'GET'):
+            self.client.generic(method, '/api/v1/async/get-specialization/')
+
+        exported = metrics.registry.export()
+        self.assertIn('method="OTHER",status=', exported)
+        self.assertIn('method="GET",status=', exported)
+        self.assertNotIn('BREW', exported)
+        self.assertEqual({method for _, method in metrics.registry.endpoints}, {'GET', 'OTHER'})
+
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from appointmentapp import notifications
+from appointmentapp.models import Notification
+from .base import APITestCase
+
+KIND = notifications.APPOINTMENT_STATUS
+
+
+class NotifyTests(APITestCase):
+
+    def setUp(self):
+        # New rows get the real created_at, which the coalescing window is measured from
+        self.now = timezone.now()
+
+    def notify(self, message, minutes_later=0, user=None):
+        user = user or self.patient_user
+        return notifications.notify(user.id, KIND, message, now=self.now + timedelta(minutes=minutes_later))
+
+    def test_events_inside_the_window_merge_into_one_digest(self):
+        first = self.notify('Appointment confirmed')
+        merged = self.notify('Appointment rescheduled', minutes_later=5)
+
+        self.assertEqual(merged.id, first.id)
+        digest = Notification.objects.get()
+        self.assertEqual(digest.count, 2)
+        self.assertEqual(digest.message, '2 appointment updates. Latest: Appointment rescheduled')
+        self.assertEqual(digest.last_event_at, self.now + timedelta(minutes=5))
+
+    def test_event_after_the_window_gets_a_new_row(self):
+        first = self.notify('Appointment confirmed')
+        later = self.notify('Appointment cancelled', minutes_later=settings.NOTIFICATION_COALESCE_MINUTES + 1)
+
+        self.assertNotEqual(later.id, first.id)
+        self.assertEqual(list(Notification.objects.values_list('count', flat=True)), [1, 1])
+
+    def test_event_after_the_digest_was_read_gets_a_new_row(self):
+        first = self.notify('Appointment confirmed')
+        Notification.objects.filter(id=first.id).update(is_read=True)
+
+        later = self.notify('Appointment cancelled', minutes_later=1)
+
+        self.assertNotEqual(later.id, first.id)
+        self.assertEqual((later.count, later.message), (1, 'Appointment cancelled'))
+
+    def test_other_kinds_and_users_do_not_merge(self):
+        self.notify('Appointment confirmed')
+        notifications.notify(self.patient_user.id, notifications.WAITLIST, 'A slot opened up', now=self.now)
+        self.notify('Appointment confirmed', user=self.doctor_user)
+
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_notify_many_writes_one_digest_per_user(self):
+        written = notifications.notify_many([
+            (self.patient_user.id, 'Appointment confirmed'),
+            (self.doctor_user.id, 'Appointment confirmed'),
+            (self.patient_user.id, 'Appointment completed'),
+        ], KIND, now=self.now)
+
+        self.assertEqual(len(written), 2)
+        digest = Notification.objects.get(user=self.patient_user)
+        self.assertEqual((digest.count, digest.message), (2, '2 appointment updates. Latest: Appointment completed'))
+        self.assertEqual(notifications.notify_many([], KIND), [])
+
+    def test_list_puts_the_latest_event_first(self):
+        older = self.notify('Appointment confirmed')
+        newer = notifications.notify(self.patient_user.id, notifications.WAITLIST, 'A slot opened up',
+                                     now=self.now + timedelta(minutes=1))
+        # The older notification grows and becomes the most recent event
+        self.notify('Appointment rescheduled', minutes_later=2)
+
+        for params in ({}, {'view': 'compact'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/v1/notification/', params, **self.auth(self.patient_user))
+                self.assertEqual([row['id'] for row in response.json()], [older.id, newer.id])
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from appointmentapp import medications
+from appointmentapp.models import ActiveMedication, MedicalRecord, Prescription
+from .base import APITestCase
+
+
+class PrescriptionCreateTests(APITestCase):
+
+    def post_prescription(self, **fields):
+        today = timezone.localdate()
+        data = {
+            'medical_record_id': self.record.id,
+            'medication_name': 'Amoxicillin',
+            'dosage': '500mg',
+            'frequency': 'Twice a day',
+            'start_date': str(today),
+            'refills_remaining': 2,
+            **fields,
+        }
+        return self.client.post('/api/v1/prescription/', data, content_type='application/json',
+                                **self.auth(self.doctor_user))
+
+    def test_create_with_end_date_tracks_active_medication(self):
+        end_date = timezone.localdate() + timedelta(days=5)
+        response = self.post_prescription(end_date=str(end_date))
+
+        self.assertEqual(response.status_code, 201, response.content)
+        prescription = Prescription.objects.get(id=response.json()['id'])
+        active = ActiveMedication.objects.get(prescription=prescription)
+        self.assertEqual(active.patient_id, self.patient.id)
+        self.assertEqual(active.end_date, end_date)
+
+    def test_create_without_end_date_tracks_active_medication(self):
+        response = self.post_prescription()
+
+        self.assertEqual(response.status_code, 201, response.content)
+        active = ActiveMedication.objects.get(prescription_id=response.json()['id'])
+        self.assertIsNone(active.end_date)
+
+    def test_create_that_already_ended_is_not_tracked(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        response = self.post_prescription(start_date=str(yesterday - timedelta(days=7)), end_date=str(yesterday))
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertFalse(ActiveMedication.objects.filter(prescription_id=response.json()['id']).exists())
+
+
+class RefillsDueTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        today = timezone.localdate()
+        start = cls.appointment.scheduled_time
+        # Two courses share each end date, so pages must break ties on the prescription id
+        for i in range(5):
+            appointment = cls.create_appointment(start + timedelta(hours=i + 1))
+            record = MedicalRecord.objects.create(doctor=cls.doctor, appointment=appointment,
+                                                  record_type='DIAGNOSIS', title=f'Visit {i}')
+            Prescription.objects.create(medical_record=record, medication_name='Amoxicillin', dosage='500mg',
+                                        frequency='Daily', start_date=today, end_date=today + timedelta(days=i // 2),
+                                        refills_remaining=1)
+
+    def get(self, **params):
+        return self.client.get('/api/v1/prescriptions/refills-due/', params, **self.auth(self.doctor_user))
+
+    def test_cursor_walks_every_entry_once_in_order(self):
+        seen, cursor = [], None
+        while True:
+            response = self.get(limit=2, **({'cursor': cursor} if cursor else {}))
+            self.assertEqual(response.status_code, 200, response.content)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen.extend((row['end_date'], row['prescription_id']) for row in page['results'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_limit_is_capped(self):
+        with mock.patch.object(medications, 'MAX_REFILL_LIMIT', 3):
+            page = self.get(limit=1000).json()
+        self.assertEqual(len(page['results']), 3)
+        self.assertIsNotNone(page['next_cursor'])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.get(cursor='not-a-cursor').status_code, 400)
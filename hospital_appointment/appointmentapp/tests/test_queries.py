@@ -0,0 +1,67 @@
+from datetime import time, timedelta
+
+from django.utils import timezone
+
+from users.models import Doctor, Patient, Specialization
+from appointmentapp.models import AvailabilitySchedule, MedicalRecord, Notification, Prescription, TimeOff
+from appointmentapp.profiling import assert_no_n_plus_one
+from .base import APITestCase, create_user
+
+ROWS = 6  # More rows than QUERY_PROFILER_THRESHOLD, so a per-row query shows up as a repeat
+
+
+class HotEndpointQueryTests(APITestCase):
+    """The busiest list endpoints issue a fixed number of queries however many rows they return"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        specializations = [Specialization.objects.create(name=f'Specialty {i}') for i in range(2)]
+        start = timezone.now().replace(microsecond=0) + timedelta(days=3)
+        today = timezone.localdate()
+        for i in range(ROWS):
+            doctor = Doctor.objects.get(user=create_user(f'doctor{i}', 'DOCTOR'))
+            doctor.specializations.set(specializations)
+            patient = Patient.objects.get(user=create_user(f'patient{i}', 'PATIENT', phone_number=f'07100000{i:02d}'))
+            AvailabilitySchedule.objects.create(doctor=doctor, day_of_week=i % 7, start_time=time(8), end_time=time(17))
+            TimeOff.objects.create(doctor=doctor, start_datetime=start + timedelta(days=30),
+                                   end_datetime=start + timedelta(days=31))
+            # Every appointment is with the fixture doctor, so their own list has ROWS + 1 entries
+            appointment = cls.create_appointment(start + timedelta(hours=i), patient=patient)
+            record = MedicalRecord.objects.create(doctor=cls.doctor, appointment=appointment,
+                                                  record_type='DIAGNOSIS', title=f'Visit {i}')
+            Prescription.objects.create(medical_record=record, medication_name='Amoxicillin', dosage='500mg',
+                                        frequency='Daily', start_date=today, end_date=today + timedelta(days=2),
+                                        refills_remaining=1)
+            Notification.objects.create(user=cls.doctor_user, message=f'Notification {i}')
+
+    def assertNoRepeatedQueries(self, user, urls):
+        headers = self.auth(user)
+        for url in urls:
+            with self.subTest(url=url), assert_no_n_plus_one():
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code, 200, response.content)
+                body = response.json()
+                rows = body['results'] if isinstance(body, dict) else body
+                self.assertGreaterEqual(len(rows), ROWS if 'search' not in url else 1)
+
+    def test_doctor_endpoints(self):
+        self.assertNoRepeatedQueries(self.doctor_user, [
+            '/api/v1/appointment/',
+            '/api/v1/medical-record/',
+            '/api/v1/prescription/',
+            '/api/v1/notification/',
+            '/api/v1/prescriptions/refills-due/',
+        ])
+
+    def test_shared_lists(self):
+        self.assertNoRepeatedQueries(self.admin_user, [
+            '/api/v1/all-appointment/',
+            '/api/v1/all-availability-schedule/',
+            '/api/v1/all-time-off/',
+            '/api/v1/all-medical-record/',
+            '/api/v1/all-prescription/',
+            '/api/v1/auth/doctor-list/',
+            '/api/v1/auth/patient-list/',
+            '/api/v1/auth/patients/search/?q=patient',
+        ])
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+
+from appointmentapp import reminders
+from appointmentapp.models import Appointment, Notification
+from .base import APITestCase
+
+
+class SendDueRemindersTests(APITestCase):
+
+    def test_sent_reminder_bumps_version_and_updated_at(self):
+        before = Appointment.objects.get(id=self.appointment.id)
+        now = before.scheduled_time - timedelta(minutes=settings.APPOINTMENT_REMINDER_LEAD_MINUTES - 1)
+
+        self.assertEqual(reminders.send_due_reminders(now=now), 1)
+
+        after = Appointment.objects.get(id=self.appointment.id)
+        self.assertEqual(after.reminder_sent_at, now)
+        self.assertIsNone(after.reminder_due_at)
+        self.assertEqual(after.updated_at, now)
+        self.assertEqual(after.version, before.version + 1)
+        self.assertTrue(Notification.objects.filter(user=self.patient_user).exists())
+
+    def test_nothing_due_changes_nothing(self):
+        before = Appointment.objects.get(id=self.appointment.id)
+        now = before.reminder_due_at - timedelta(minutes=1)
+
+        self.assertEqual(reminders.send_due_reminders(now=now), 0)
+        self.assertEqual(Appointment.objects.get(id=self.appointment.id).version, before.version)
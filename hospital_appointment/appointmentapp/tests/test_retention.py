@@ -0,0 +1,83 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appointmentapp import retention
+from appointmentapp.models import Notification, NotificationArchive
+from .base import APITestCase
+
+
+class NotificationRetentionTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.now = timezone.now()
+        cls.old_read = cls.notification(days_old=40, is_read=True)
+        cls.recent_read = cls.notification(days_old=10, is_read=True)
+        cls.old_unread = cls.notification(days_old=200)
+        cls.recent_unread = cls.notification(days_old=40)
+
+    @classmethod
+    def notification(cls, days_old, is_read=False):
+        notification = Notification.objects.create(user=cls.patient_user, message=f'{days_old} days old',
+                                                   is_read=is_read)
+        # created_at is auto_now_add, so it is backdated afterwards
+        Notification.objects.filter(id=notification.id).update(created_at=cls.now - timedelta(days=days_old))
+        return notification
+
+    def remaining(self):
+        return set(Notification.objects.values_list('id', flat=True))
+
+    def test_read_and_unread_have_their_own_ttl(self):
+        expired = retention.expired_notifications(30, 180, now=self.now)
+        self.assertEqual(set(expired.values_list('id', flat=True)), {self.old_read.id, self.old_unread.id})
+
+        self.assertEqual(retention.purge_notifications(30, 180, now=self.now), 2)
+        self.assertEqual(self.remaining(), {self.recent_read.id, self.recent_unread.id})
+
+    def test_zero_ttl_keeps_forever(self):
+        self.assertEqual(retention.purge_notifications(0, 30, now=self.now), 2)
+        self.assertEqual(self.remaining(), {self.old_read.id, self.recent_read.id})
+        self.assertEqual(retention.purge_notifications(0, 0, now=self.now), 0)
+
+    def test_purges_in_batches(self):
+        for _ in range(3):
+            self.notification(days_old=50, is_read=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            purged = retention.purge_notifications(30, 180, batch_size=2, now=self.now)
+
+        self.assertEqual(purged, 5)
+        deletes = [query['sql'] for query in queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertEqual(self.remaining(), {self.recent_read.id, self.recent_unread.id})
+
+    def test_archive_copies_rows_before_deleting(self):
+        call_command('purge_notifications', read_ttl_days=30, unread_ttl_days=180, batch_size=1, archive=True,
+                     stdout=StringIO())
+
+        self.assertEqual(self.remaining(), {self.recent_read.id, self.recent_unread.id})
+        archived = NotificationArchive.objects.get(id=self.old_read.id)
+        self.assertEqual((archived.user_id, archived.message, archived.is_read), (self.patient_user.id, '40 days old', True))
+        self.assertEqual(archived.created_at, self.now - timedelta(days=40))
+        self.assertTrue(NotificationArchive.objects.filter(id=self.old_unread.id).exists())
+
+    @override_settings(NOTIFICATION_UNREAD_TTL_DAYS=100)
+    def test_unread_list_hides_notifications_past_the_unread_ttl(self):
+        response = self.client.get('/api/v1/notification/', **self.auth(self.patient_user))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()], [self.recent_unread.id])
+
+    @override_settings(NOTIFICATION_UNREAD_TTL_DAYS=0)
+    def test_unread_list_shows_everything_without_an_unread_ttl(self):
+        self.assertIsNone(retention.unread_window_start())
+        response = self.client.get('/api/v1/notification/', **self.auth(self.patient_user))
+
+        self.assertEqual({row['id'] for row in response.json()}, {self.old_unread.id, self.recent_unread.id})
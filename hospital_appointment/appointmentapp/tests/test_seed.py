@@ -0,0 +1,22 @@
+import io
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from users.models import UserDetails
+
+
+class SeedHospitalTests(TestCase):
+
+    def seed(self, prefix):
+        call_command('seed_hospital', doctors=2, patients=5, appointments=20, prefix=prefix, stdout=io.StringIO())
+
+    def test_runs_with_different_prefixes_get_distinct_phone_numbers(self):
+        self.seed('first')
+        self.seed('second')
+
+        self.assertEqual(UserDetails.objects.filter(username__startswith='second_').count(), 7)
+        repeated = UserDetails.objects.values('phone_number').annotate(users=Count('id')).filter(users__gt=1)
+        self.assertFalse(repeated.exists(), list(repeated))
+        self.assertTrue(UserDetails.objects.filter(username='second_patient_0', phone_number='+254700000005').exists())
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.utils import timezone
+
+from appointmentapp import analytics, notifications, sweeper
+from appointmentapp.models import Appointment, DoctorDailyStats, Notification
+from .base import APITestCase
+
+POLICY = {'SCHEDULED': 'NO_SHOW', 'IN_PROGRESS': 'COMPLETED'}
+
+
+class SweepPolicyTests(APITestCase):
+
+    def test_parses_pairs_case_and_space_insensitively(self):
+        self.assertEqual(sweeper.sweep_policy(' scheduled = no_show, IN_PROGRESS=completed,'), POLICY)
+        self.assertEqual(sweeper.sweep_policy(''), {})
+
+    def test_rejects_closed_sources_and_unknown_targets(self):
+        for value in ('COMPLETED=NO_SHOW', 'SCHEDULED=CONFIRMED', 'SCHEDULED'):
+            with self.subTest(value=value), self.assertRaises(ImproperlyConfigured):
+                sweeper.sweep_policy(value)
+
+    def test_command_reports_an_invalid_policy(self):
+        with self.assertRaisesMessage(CommandError, "Invalid sweep rule 'SCHEDULED=LATE'"):
+            call_command('sweep_appointments', policy='SCHEDULED=LATE')
+
+
+class SweepTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Close to the real time, as new notifications get a real created_at the coalescing window is measured from
+        cls.now = timezone.now()
+        start = cls.now - timedelta(days=1)
+        cls.create_appointment(start)
+        cls.create_appointment(start + timedelta(hours=1))
+        cls.in_progress = cls.create_appointment(start + timedelta(hours=2), status='IN_PROGRESS')
+        # Ended inside the grace period; the base appointment has not started
+        cls.recent = cls.create_appointment(cls.now - timedelta(minutes=40))
+
+    def sweep(self, **options):
+        return sweeper.sweep(POLICY, grace_minutes=60, now=self.now, **options)
+
+    def test_changes_stale_appointments_in_batches(self):
+        before = {appointment.id: appointment for appointment in Appointment.objects.all()}
+        batches = []
+
+        counts = self.sweep(batch_size=1, notify=False, on_batch=lambda *batch: batches.append(batch))
+
+        self.assertEqual(counts, {'SCHEDULED': 2, 'IN_PROGRESS': 1})
+        self.assertEqual(batches, [('SCHEDULED', 'NO_SHOW', 1)] * 2 + [('IN_PROGRESS', 'COMPLETED', 1)])
+        for appointment in Appointment.objects.exclude(id__in=[self.recent.id, self.appointment.id]):
+            self.assertEqual(appointment.status, 'COMPLETED' if appointment.id == self.in_progress.id else 'NO_SHOW')
+            self.assertIsNone(appointment.reminder_due_at)
+            # Exports and ETags see the change though UPDATE skips auto_now and save()
+            self.assertEqual(appointment.updated_at, self.now)
+            self.assertEqual(appointment.version, before[appointment.id].version + 1)
+        for appointment in Appointment.objects.filter(id__in=[self.recent.id, self.appointment.id]):
+            self.assertEqual((appointment.status, appointment.version), ('SCHEDULED', before[appointment.id].version))
+        self.assertEqual(sweeper.pending(POLICY, 60, now=self.now), {'SCHEDULED': 0, 'IN_PROGRESS': 0})
+
+    def test_rollup_follows_the_new_statuses(self):
+        analytics.rebuild()
+        self.sweep()
+
+        incremental = list(DoctorDailyStats.objects.values_list('date', *analytics.COUNTERS))
+        with transaction.atomic():
+            analytics.rebuild()
+            self.assertEqual(list(DoctorDailyStats.objects.values_list('date', *analytics.COUNTERS)), incremental)
+            transaction.set_rollback(True)
+        totals = DoctorDailyStats.objects.values_list('no_show', 'completed')
+        self.assertEqual([sum(column) for column in zip(*totals)], [2, 1])
+
+    def test_patient_gets_one_digest(self):
+        self.sweep()
+
+        digest = Notification.objects.get(user=self.patient_user, kind=notifications.APPOINTMENT_STATUS)
+        self.assertEqual(digest.count, 3)
+        self.assertTrue(digest.message.startswith('3 appointment updates. Latest: Appointment completed with'))
+        self.assertEqual(digest.last_event_at, self.now)
+
+    def test_no_notify(self):
+        self.sweep(notify=False)
+        self.assertFalse(Notification.objects.exists())
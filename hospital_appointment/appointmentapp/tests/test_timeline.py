@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from users.models import Patient
+from appointmentapp import timeline
+from appointmentapp.models import MedicalRecord, Prescription
+from .base import APITestCase, create_user
+
+
+class PatientTimelineTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        base = cls.appointment.scheduled_time
+        today = timezone.localdate()
+        cls.create_appointment(base - timedelta(days=3))
+        visit = cls.create_appointment(base - timedelta(days=1))
+        # Records sharing a timestamp, with prescriptions created in the opposite order
+        records = [
+            MedicalRecord.objects.create(doctor=cls.doctor, appointment=visit, record_type='DIAGNOSIS', title=title)
+            for title in ('Flu', 'Sprain')
+        ]
+        MedicalRecord.objects.filter(id__in=[record.id for record in records]).update(created_at=base - timedelta(days=1))
+        for record in reversed(records):
+            Prescription.objects.create(medical_record=record, medication_name='Ibuprofen', dosage='200mg',
+                                        frequency='Daily', start_date=today, end_date=today + timedelta(days=5),
+                                        refills_remaining=0)
+        # Another patient's history stays out
+        other = Patient.objects.get(user=create_user('other', 'PATIENT', phone_number='0700000002'))
+        MedicalRecord.objects.create(doctor=cls.doctor, appointment=cls.create_appointment(base - timedelta(hours=5), patient=other),
+                                     record_type='NOTE', title='Other patient')
+
+    def page(self, **params):
+        response = self.client.get(f'/api/v1/patients/{self.patient.id}/timeline/', params,
+                                   **self.auth(self.doctor_user))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def expected(self):
+        """Every entry, newest first, with ties broken by kind and then by the stream's tiebreak column"""
+        entries = [
+            (appointment.scheduled_time, 0, appointment.id, 'appointment', appointment.id)
+            for appointment in self.patient.appointments.all()
+        ] + [
+            (record.created_at, 1, record.id, 'medical_record', record.id)
+            for record in MedicalRecord.objects.filter(patient=self.patient)
+        ] + [
+            (prescription.medical_record.created_at, 2, prescription.medical_record_id, 'prescription', prescription.id)
+            for prescription in Prescription.objects.filter(medical_record__patient=self.patient)
+            .select_related('medical_record')
+        ]
+        return [(kind, entry_id) for *_, kind, entry_id in sorted(entries, reverse=True)]
+
+    def test_merges_the_streams_newest_first(self):
+        page = self.page(limit=timeline.MAX_LIMIT)
+
+        self.assertIsNone(page['next_cursor'])
+        self.assertEqual([(row['kind'], row['id']) for row in page['results']], self.expected())
+        timestamps = [parse_datetime(row['at']) for row in page['results']]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    def test_cursor_pages_cover_every_entry_once(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = self.page(limit=2, **({'cursor': cursor} if cursor else {}))
+            seen += [(row['kind'], row['id']) for row in page['results']]
+            pages += 1
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, self.expected())
+        self.assertEqual(pages, (len(seen) + 1) // 2)
+
+    def test_cursor_round_trip(self):
+        at = timezone.now().replace(microsecond=123456)
+        self.assertEqual(timeline.decode_cursor(timeline.encode_cursor(at, 2, 42)), (at, 2, 42))
+        with self.assertRaises(timeline.InvalidCursor):
+            timeline.decode_cursor('not-a-cursor')
+        self.assertEqual(self.client.get(f'/api/v1/patients/{self.patient.id}/timeline/', {'cursor': 'x'},
+                                         **self.auth(self.doctor_user)).status_code, 400)
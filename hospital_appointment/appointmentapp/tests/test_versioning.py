@@ -0,0 +1,118 @@
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from appointmentapp import concurrency
+from appointmentapp.models import AvailabilitySchedule, MedicalRecord, TimeOff, VersionConflict
+from .base import APITestCase
+
+
+def updates(queries, table):
+    return [query['sql'] for query in queries if query['sql'].startswith(f'UPDATE "{table}"')]
+
+
+class VersionedSaveTests(APITestCase):
+
+    def test_concurrent_save_raises_version_conflict(self):
+        first = MedicalRecord.objects.get(id=self.record.id)
+        second = MedicalRecord.objects.get(id=self.record.id)
+        first.title = 'First'
+        first.save()
+
+        second.title = 'Second'
+        with self.assertRaises(VersionConflict):
+            second.save()
+        self.assertEqual(second.version, 1)
+        record = MedicalRecord.objects.get(id=self.record.id)
+        self.assertEqual((record.title, record.version), ('First', 2))
+
+    def test_empty_update_fields_is_a_no_op(self):
+        record = MedicalRecord.objects.get(id=self.record.id)
+        with self.assertNumQueries(0):
+            record.save(update_fields=[])
+        self.assertEqual(record.version, 1)
+
+
+class MedicalRecordPatchTests(APITestCase):
+
+    def patch(self, data, **headers):
+        return self.client.patch(f'/api/v1/medical-record-by-id/{self.record.id}/', data,
+                                 content_type='application/json', **headers, **self.auth(self.doctor_user))
+
+    def test_stale_if_match_is_refused_with_the_current_etag(self):
+        self.assertEqual(self.patch({'title': 'Follow-up'}, HTTP_IF_MATCH='"1"').status_code, 200)
+
+        response = self.patch({'title': 'Overwrite'}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(MedicalRecord.objects.get(id=self.record.id).title, 'Follow-up')
+
+    def test_edit_between_read_and_save_is_refused(self):
+        assign = concurrency.assign
+
+        def assign_after_concurrent_edit(instance, values):
+            MedicalRecord.objects.filter(id=instance.id).update(version=F('version') + 1)
+            return assign(instance, values)
+
+        with mock.patch.object(concurrency, 'assign', side_effect=assign_after_concurrent_edit):
+            response = self.patch({'title': 'Follow-up'}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(MedicalRecord.objects.get(id=self.record.id).title, 'Checkup')
+
+    def test_patch_writes_only_the_changed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch({'title': 'Follow-up', 'description': 'Routine checkup'})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response['ETag'], '"2"')
+        [update] = updates(queries, MedicalRecord._meta.db_table)
+        assignments = update.split(' SET ', 1)[1].split(' WHERE ', 1)[0]
+        self.assertIn('"title"', assignments)
+        self.assertIn('"version"', assignments)
+        self.assertIn('"updated_at"', assignments)
+        # Unchanged, so not written
+        self.assertNotIn('"description"', assignments)
+        self.assertNotIn('"record_type"', assignments)
+
+    def test_patch_without_changes_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch({'title': 'Checkup'}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response['ETag'], '"1"')
+        self.assertEqual(updates(queries, MedicalRecord._meta.db_table), [])
+        self.assertEqual(MedicalRecord.objects.get(id=self.record.id).version, 1)
+
+
+class SerializerUpdateTests(APITestCase):
+    """Views updating through a serializer clear a field sent as null or empty, as serializer.save() did"""
+
+    def patch(self, url, data):
+        return self.client.patch(url, data, content_type='application/json', **self.auth(self.doctor_user))
+
+    def test_null_clears_a_nullable_field(self):
+        schedule = AvailabilitySchedule.objects.create(doctor=self.doctor, day_of_week=0, start_time=time(8),
+                                                       end_time=time(17), valid_until=date(2030, 1, 1))
+
+        response = self.patch(f'/api/v1/availability-schedule-by-id/{schedule.id}/', {'valid_until': None})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIsNone(AvailabilitySchedule.objects.get(id=schedule.id).valid_until)
+
+    def test_empty_string_clears_a_text_field(self):
+        start = self.appointment.scheduled_time + timedelta(days=10)
+        time_off = TimeOff.objects.create(doctor=self.doctor, start_datetime=start,
+                                          end_datetime=start + timedelta(days=1), reason='Conference')
+
+        response = self.patch(f'/api/v1/time-off-by-id/{time_off.id}/', {'reason': ''})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        time_off = TimeOff.objects.get(id=time_off.id)
+        self.assertEqual((time_off.reason, time_off.version), ('', 2))
+
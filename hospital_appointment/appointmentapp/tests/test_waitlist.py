@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from users.models import Patient
+from appointmentapp import waitlist
+from appointmentapp.models import Appointment, WaitlistEntry
+from .base import APITestCase, create_user
+
+
+class WaitlistOfferTests(APITestCase):
+    """The fixture appointment's patient cancels; patients A, B and C wait for the same doctor, in that order"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        start = cls.appointment.scheduled_time
+        window = {'doctor': cls.doctor, 'earliest_start': start - timedelta(days=1), 'latest_end': start + timedelta(days=1)}
+        # The cancelling patient waits too, e.g. for an earlier slot, and must not be offered their own
+        cls.own_entry = WaitlistEntry.objects.create(patient=cls.patient, **window)
+        cls.entries = {}
+        for name in 'abc':
+            user = create_user(f'waiting_{name}', 'PATIENT', phone_number=f'070000010{ord(name) - 96}')
+            cls.entries[name] = WaitlistEntry.objects.create(patient=Patient.objects.get(user=user), **window)
+
+    def entry(self, name):
+        return WaitlistEntry.objects.get(id=self.entries[name].id)
+
+    def statuses(self):
+        return {name: self.entry(name).status for name in 'abc'}
+
+    def cancel_appointment(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/v1/appointment-by-id/{self.appointment.id}/', {'status': 'CANCELLED'},
+                                         content_type='application/json', **self.auth(self.doctor_user))
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def act(self, name, decision):
+        entry = self.entries[name]
+        return self.client.post(f'/api/v1/waitlist/{entry.id}/{decision}/', **self.auth(entry.patient.user))
+
+    def test_cancelled_slot_is_offered_to_the_longest_waiting_other_patient(self):
+        self.cancel_appointment()
+
+        self.assertEqual(WaitlistEntry.objects.get(id=self.own_entry.id).status, 'WAITING')
+        offered = self.entry('a')
+        self.assertEqual(offered.status, 'OFFERED')
+        self.assertEqual(offered.offered_start, self.appointment.scheduled_time)
+        self.assertEqual(offered.offered_end, self.appointment.end_time)
+        self.assertGreater(offered.offer_expires_at, timezone.now())
+        self.assertEqual(self.statuses(), {'a': 'OFFERED', 'b': 'WAITING', 'c': 'WAITING'})
+
+    def test_accepting_books_the_slot(self):
+        self.cancel_appointment()
+        response = self.act('a', 'accept')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        entry = self.entry('a')
+        self.assertEqual(entry.status, 'BOOKED')
+        appointment = Appointment.objects.get(id=entry.appointment_id)
+        self.assertEqual((appointment.patient_id, appointment.doctor_id), (entry.patient_id, self.doctor.id))
+        self.assertEqual(appointment.scheduled_time, self.appointment.scheduled_time)
+
+    def test_accepting_after_expiry_passes_the_slot_on(self):
+        self.cancel_appointment()
+        WaitlistEntry.objects.filter(id=self.entries['a'].id).update(offer_expires_at=timezone.now() - timedelta(minutes=1))
+
+        response = self.act('a', 'accept')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.statuses(), {'a': 'WAITING', 'b': 'OFFERED', 'c': 'WAITING'})
+        self.assertFalse(Appointment.objects.filter(patient=self.entries['a'].patient).exists())
+
+    def test_accepting_a_taken_slot_is_refused(self):
+        self.cancel_appointment()
+        self.create_appointment(self.appointment.scheduled_time, patient=self.entries['c'].patient)
+
+        response = self.act('a', 'accept')
+
+        self.assertEqual(response.status_code, 409)
+        # The slot is gone, so there is nothing to pass on
+        self.assertEqual(self.statuses(), {'a': 'WAITING', 'b': 'WAITING', 'c': 'WAITING'})
+
+    def test_declined_slot_never_returns_to_a_decliner_or_the_cancelling_patient(self):
+        self.cancel_appointment()
+
+        self.assertEqual(self.act('a', 'decline').status_code, 200)
+        self.assertEqual(self.statuses(), {'a': 'WAITING', 'b': 'OFFERED', 'c': 'WAITING'})
+        self.assertEqual(self.act('b', 'decline').status_code, 200)
+        self.assertEqual(self.statuses(), {'a': 'WAITING', 'b': 'WAITING', 'c': 'OFFERED'})
+        self.assertEqual(self.act('c', 'decline').status_code, 200)
+
+        self.assertEqual(self.statuses(), {'a': 'WAITING', 'b': 'WAITING', 'c': 'WAITING'})
+        self.assertEqual(WaitlistEntry.objects.get(id=self.own_entry.id).status, 'WAITING')
+
+    def test_withdrawing_passes_the_slot_on(self):
+        self.cancel_appointment()
+        entry = self.entries['a']
+
+        response = self.client.delete(f'/api/v1/waitlist/{entry.id}/', **self.auth(entry.patient.user))
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.statuses(), {'a': 'WITHDRAWN', 'b': 'OFFERED', 'c': 'WAITING'})
+
+    def test_expired_offers_are_released_and_passed_on(self):
+        self.cancel_appointment()
+        later = self.entry('a').offer_expires_at + timedelta(seconds=1)
+
+        self.assertEqual(waitlist.expire_offers(now=later), 1)
+
+        self.assertEqual(self.statuses(), {'a': 'WAITING', 'b': 'OFFERED', 'c': 'WAITING'})
+        self.assertEqual(self.entry('b').offer_passed_over, [self.entries['a'].id])
+        self.assertEqual(waitlist.expire_offers(now=later), 0)
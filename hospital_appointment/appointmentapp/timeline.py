@@ -0,0 +1,124 @@
+import base64
+import heapq
+from datetime import datetime
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Appointment, MedicalRecord, Prescription
+from .projections import full_name
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a timeline cursor cannot be decoded"""
+
+
+class Stream:
+    """One kind of timeline entry: a patient-scoped queryset, its timestamp column and the fields it returns.
+
+    Entries sharing a timestamp are ordered by `tiebreak`, a unique column among the returned ones. With the
+    timestamp it must match a (patient, -timestamp, -tiebreak) index so a page is an index range scan.
+    """
+
+    def __init__(self, kind, rank, model, patient_path, timestamp, fields, tiebreak='id'):
+        self.kind = kind
+        # Breaks ties between entries of different kinds sharing a timestamp
+        self.rank = rank
+        self.model = model
+        self.patient_path = patient_path
+        self.timestamp = timestamp
+        self.fields = fields
+        self.tiebreak = tiebreak
+
+    def queryset(self, patient_id, cursor, limit):
+        """The next `limit` entries after `cursor`, newest first, as plain dicts"""
+        queryset = self.model.objects.filter(**{self.patient_path: patient_id})
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor))
+        columns = [name for name, expression in self.fields.items() if expression is None]
+        expressions = {name: expression for name, expression in self.fields.items() if expression is not None}
+        return (
+            queryset.order_by(f'-{self.timestamp}', f'-{self.tiebreak}')
+            .values('id', *columns, at=F(self.timestamp), **expressions)[:limit]
+        )
+
+    def after(self, cursor):
+        """Rows sorting strictly after (at, rank, tiebreak) in descending order"""
+        at, rank, tiebreak = cursor
+        if self.rank < rank:
+            return Q(**{f'{self.timestamp}__lte': at})
+        if self.rank == rank:
+            return Q(**{f'{self.timestamp}__lt': at}) | Q(**{self.timestamp: at, f'{self.tiebreak}__lt': tiebreak})
+        return Q(**{f'{self.timestamp}__lt': at})
+
+
+STREAMS = [
+    Stream('appointment', 0, Appointment, 'patient_id', 'scheduled_time', {
+        'end_time': None,
+        'status': None,
+        'reason': None,
+        'doctor_id': None,
+        'doctor_name': full_name('doctor__user'),
+    }),
+    Stream('medical_record', 1, MedicalRecord, 'patient_id', 'created_at', {
+        'appointment_id': None,
+        'record_type': None,
+        'title': None,
+        'description': None,
+        'is_sensitive': None,
+        'doctor_id': None,
+        'doctor_name': full_name('doctor__user'),
+    }),
+    # One prescription per record, so the record id orders them and medicalrecord_patient_at_idx serves the page
+    Stream('prescription', 2, Prescription, 'medical_record__patient_id', 'medical_record__created_at', {
+        'medical_record_id': None,
+        'medication_name': None,
+        'dosage': None,
+        'frequency': None,
+        'start_date': None,
+        'end_date': None,
+        'refills_remaining': None,
+    }, tiebreak='medical_record_id'),
+]
+
+
+def encode_cursor(at, rank, tiebreak):
+    raw = f'{at.isoformat()}|{rank}|{tiebreak}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        at, rank, tiebreak = raw.split('|')
+        at = datetime.fromisoformat(at)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+        return at, int(rank), int(tiebreak)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def patient_timeline(patient_id, cursor=None, limit=DEFAULT_LIMIT):
+    """One page of the patient's appointments, records and prescriptions merged newest first.
+
+    Each stream is read with a single keyset-paginated query of at most `limit + 1` rows, so a page costs
+    three queries however long the history is.
+    """
+    position = decode_cursor(cursor) if cursor else None
+
+    def entries(stream):
+        for row in stream.queryset(patient_id, position, limit + 1):
+            yield (row['at'], stream.rank, row[stream.tiebreak]), {'kind': stream.kind, **row}
+
+    merged = heapq.merge(*(entries(stream) for stream in STREAMS), key=lambda entry: entry[0], reverse=True)
+    page = [entry for _, entry in zip(range(limit + 1), merged)]
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(*page[-1][0])
+    return {'results': [row for _, row in page], 'next_cursor': next_cursor}
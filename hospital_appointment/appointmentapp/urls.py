@@ -1,33 +1,55 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # ---<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Doctor availability schedule>>>>>>>>>>>>>>>>>>>>>>--------------------
     path('doctor-availability-schedule/', views.AvailabilityScheduleView.as_view(), name='availability-schedule'), #GET, POST Authenticate: Doctor user
-    path('availability-schedule-by-id/<int:id>/', views.AvailabilityScheduleByIdView.as_view(), name='update-availability-schedule'), #PUT, DELETE Authenticate: Doctor user
+    path('availability-schedule-by-id/<int:id>/', views.AvailabilityScheduleByIdView.as_view(), name='update-availability-schedule'), #PUT, PATCH, DELETE Authenticate: Doctor user
     path('all-availability-schedule/', views.GetAllAvailabilityScheduleView.as_view(), name='all-availability-schedule'), #GET, POST Authenticate user
     
     # ---<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Doctor time off schedule>>>>>>>>>>>>>>>>>>>>>>--------------------
     path('time-off/', views.TimeOffView.as_view(), name='time-off'), #GET, POST Authenticate: Doctor user
-    path('time-off-by-id/<int:id>/', views.TimeOffByIdView.as_view(), name='update-time-off'), #PUT, DELETE Authenticate: Doctor user
+    path('time-off-by-id/<int:id>/', views.TimeOffByIdView.as_view(), name='update-time-off'), #PUT, PATCH, DELETE Authenticate: Doctor user
     path('all-time-off/', views.GetAllTimeOffView.as_view(), name='all-time-off'), #GET, POST Authenticate user
     
     # ---<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Appointment>>>>>>>>>>>>>>>>>>>>>>--------------------
     path('appointment/', views.AppointmentView.as_view(), name='appointment'), #GET, POST Authenticate: Doctor user
-    path('appointment-by-id/<int:id>/', views.AppointmentByIdView.as_view(), name='update-appointment'), #PUT, DELETE Authenticate: Doctor user
+    path('appointment-by-id/<int:id>/', views.AppointmentByIdView.as_view(), name='update-appointment'), #PUT, PATCH, DELETE Authenticate: Doctor user
     path('all-appointment/', views.GetAllAppointmentView.as_view(), name='all-appointment'), #GET, POST Authenticate user
     
     # ----<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Medical Record>>>>>>>>>>>>>>>>>>>>>>--------------------
     path('medical-record/', views.MedicalRecordView.as_view(), name='medical-record'), #GET, POST Authenticate: Doctor user
-    path('medical-record-by-id/<int:id>/', views.MedicalRecordByIdView.as_view(), name='update-medical-record'), #PUT, DELETE Authenticate: Doctor user
+    path('medical-record-by-id/<int:id>/', views.MedicalRecordByIdView.as_view(), name='update-medical-record'), #PUT, PATCH, DELETE Authenticate: Doctor user
     path('all-medical-record/', views.GetAllMedicalRecordView.as_view(), name='all-medical-record'), #GET, POST Authenticate user
     
     # ----<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Prescription>>>>>>>>>>>>>>>>>>>>>>--------------------
     path('prescription/', views.PrescriptionView.as_view(), name='prescription'), #GET, POST Authenticate: Doctor user
-    path('prescription-by-id/<int:id>/', views.PrescriptionByIdView.as_view(), name='update-prescription'), #PUT, DELETE Authenticate: Doctor user
+    path('prescription-by-id/<int:id>/', views.PrescriptionByIdView.as_view(), name='update-prescription'), #PUT, PATCH, DELETE Authenticate: Doctor user
     path('all-prescription/', views.GetAllPrescriptionView.as_view(), name='all-prescription'), #GET, POST Authenticate user
+    path('prescriptions/refills-due/', views.RefillsDueView.as_view(), name='refills-due'), #GET Authenticate: Doctor or admin user
+    path('patients/<int:id>/active-medications/', views.ActiveMedicationsView.as_view(), name='active-medications'), #GET Authenticate: Doctor, admin or the patient
+    
+    # ------<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Patient timeline>>>>>>>>>>>>>>>>>>>>>>--------------------
+    path('patients/<int:id>/timeline/', views.PatientTimelineView.as_view(), name='patient-timeline'), #GET Authenticate: Doctor, admin or the patient
+    
+    # ------<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Waitlist>>>>>>>>>>>>>>>>>>>>>>--------------------
+    path('waitlist/', views.WaitlistView.as_view(), name='waitlist'), #GET, POST Authenticate user
+    path('waitlist/<int:id>/', views.WaitlistByIdView.as_view(), name='waitlist-entry'), #GET, DELETE Authenticate: the patient, their doctor or admin user
+    path('waitlist/<int:id>/accept/', views.WaitlistOfferView.as_view(decision='accept'), name='waitlist-accept'), #POST Authenticate: the patient or admin user
+    path('waitlist/<int:id>/decline/', views.WaitlistOfferView.as_view(decision='decline'), name='waitlist-decline'), #POST Authenticate: the patient or admin user
+    
+    # ------<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Analytics>>>>>>>>>>>>>>>>>>>>>>--------------------
+    path('analytics/doctors/', views.DoctorUtilizationView.as_view(), name='doctor-utilization'), #GET Authenticate: Doctor (own figures) or admin user
+    path('analytics/doctors/<int:id>/daily/', views.DoctorDailyStatsView.as_view(), name='doctor-daily-stats'), #GET Authenticate: Doctor (own figures) or admin user
+    path('analytics/specializations/', views.SpecializationStatsView.as_view(), name='specialization-stats'), #GET Authenticate: Admin user
     
     # ------<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Notification>>>>>>>>>>>>>>>>>>>>>>--------------------
     path('notification/', views.GetNotifications.as_view(), name='notification'), #GET Authenticate: Doctor user
-    path('notification-by-id/<int:id>/', views.NotificationById.as_view(), name='update-notification'), #PUT, DELETE Authenticate: Doctor user
+    path('notification-by-id/<int:id>/', views.NotificationById.as_view(), name='update-notification'), #PUT, PATCH, DELETE Authenticate: Doctor user
+    
+    # ------<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<Async reads (ASGI)>>>>>>>>>>>>>>>>>>>>>>--------------------
+    path('async/notification/', async_views.notifications, name='async-notification'), #GET Authenticate user, ?wait= long-polls
+    path('async/doctor-list/', async_views.doctors, name='async-doctor-list'), #GET Authenticate user
+    path('async/get-specialization/', async_views.specializations, name='async-specialization'), #GET
+    path('async/all-availability-schedule/', async_views.availability_schedules, name='async-all-availability-schedule'), #GET Authenticate user
 ]
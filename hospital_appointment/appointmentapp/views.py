@@ -2,6 +2,12 @@ from django.shortcuts import render
 from .serializers import *
 from .models import *
 from .utility import parse_datetime
+from .datetimes import parse_datetimes, format_local
+from .projections import (
+    LIST_VIEW_PARAMETERS, APPOINTMENT_LIST_FIELDS, AVAILABILITY_LIST_FIELDS, MEDICAL_RECORD_LIST_FIELDS,
+    PRESCRIPTION_LIST_FIELDS, NOTIFICATION_LIST_FIELDS, compact_response
+)
+from . import analytics, concurrency, idempotency, medications, notifications, retention, timeline, waitlist
 from users.models import UserDetails,Doctor,Patient,Specialization
 from users.serializers import UserSerializer,DoctorSerializer,PatientSerializer,SpecializationSerializer
 from rest_framework.views import APIView
@@ -11,10 +17,10 @@ from rest_framework import status as http_status
 from rest_framework.permissions import IsAuthenticated
 from oauth2_provider.contrib.rest_framework.permissions import TokenHasReadWriteScope, OAuth2Authentication
 from django.shortcuts import get_object_or_404, get_list_or_404
+from django.db import transaction
 from time import gmtime, strftime
 from datetime import datetime, timedelta
 from django.utils import timezone
-import pytz
 from django.http import HttpResponse
 from django.template import loader
 from drf_yasg.utils import swagger_auto_schema
@@ -53,6 +59,7 @@ class AvailabilityScheduleView(APIView):
                 }
             )
         },
+        manual_parameters=LIST_VIEW_PARAMETERS,
         tags=["Availability Schedule"]
     )
 
@@ -70,7 +77,10 @@ class AvailabilityScheduleView(APIView):
             return Response({'message': 'Doctor not found'}, status=http_status.HTTP_404_NOT_FOUND)
         
         availability = AvailabilitySchedule.objects.filter(doctor_id=current_doctor.id).all()
-        serializer = AvailabilityScheduleSerializer(availability, many=True)
+        compact = compact_response(request, availability, AVAILABILITY_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = AvailabilityScheduleSerializer(doctor_related(availability, 'doctor__'), many=True)
         return Response(serializer.data)
     
     @swagger_auto_schema(
@@ -213,6 +223,54 @@ class AvailabilityScheduleView(APIView):
         ).exists()
         
 # Doctor put/delete availability schedule view----------------------------------------------------------------------------------
+AVAILABILITY_SCHEDULE_UPDATE_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=[],
+    properties={
+        'day_of_week': openapi.Schema(
+            type=openapi.TYPE_INTEGER,
+            description="Day of week (0=Monday, 6=Sunday)",
+            enum=[0, 1, 2, 3, 4, 5, 6]
+        ),
+        'start_time': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_DATETIME,
+            description="Start time in HH:MM:SS format",
+            example="09:00:00"
+        ),
+        'end_time': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_DATETIME,
+            description="End time in HH:MM:SS format",
+            example="17:00:00"
+        ),
+        'is_recurring': openapi.Schema(
+            type=openapi.TYPE_BOOLEAN,
+            description="Whether the slot repeats weekly",
+            default=True
+        ),
+        'valid_from': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_DATE,
+            description="Date from which this slot is valid (YYYY-MM-DD)"
+        ),
+        'valid_until': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_DATE,
+            description="Date until which this slot is valid (YYYY-MM-DD)",
+            required=[False]
+        )
+    },
+    example={
+        "day_of_week": 0,
+        "start_time": "09:00:00",
+        "end_time": "17:00:00",
+        "is_recurring": True,
+        "valid_from": "2023-08-01",
+        "valid_until": "2023-12-31"
+    }
+)
+
 class AvailabilityScheduleByIdView(APIView):
     permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
     authentication_classes = [OAuth2Authentication]
@@ -220,53 +278,7 @@ class AvailabilityScheduleByIdView(APIView):
     @swagger_auto_schema(
         operation_summary="Update availability schedule",
         operation_description="Update an existing availability slot for the doctor. Requires doctor or admin privileges.",
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            required=[],
-            properties={
-                'day_of_week': openapi.Schema(
-                    type=openapi.TYPE_INTEGER,
-                    description="Day of week (0=Monday, 6=Sunday)",
-                    enum=[0, 1, 2, 3, 4, 5, 6]
-                ),
-                'start_time': openapi.Schema(
-                    type=openapi.TYPE_STRING,
-                    format=openapi.FORMAT_DATETIME,
-                    description="Start time in HH:MM:SS format",
-                    example="09:00:00"
-                ),
-                'end_time': openapi.Schema(
-                    type=openapi.TYPE_STRING,
-                    format=openapi.FORMAT_DATETIME,
-                    description="End time in HH:MM:SS format",
-                    example="17:00:00"
-                ),
-                'is_recurring': openapi.Schema(
-                    type=openapi.TYPE_BOOLEAN,
-                    description="Whether the slot repeats weekly",
-                    default=True
-                ),
-                'valid_from': openapi.Schema(
-                    type=openapi.TYPE_STRING,
-                    format=openapi.FORMAT_DATE,
-                    description="Date from which this slot is valid (YYYY-MM-DD)"
-                ),
-                'valid_until': openapi.Schema(
-                    type=openapi.TYPE_STRING,
-                    format=openapi.FORMAT_DATE,
-                    description="Date until which this slot is valid (YYYY-MM-DD)",
-                    required=[False]
-                )
-            },
-            example={
-                "day_of_week": 0,
-                "start_time": "09:00:00",
-                "end_time": "17:00:00",
-                "is_recurring": True,
-                "valid_from": "2023-08-01",
-                "valid_until": "2023-12-31"
-            }
-        ),
+        request_body=AVAILABILITY_SCHEDULE_UPDATE_BODY,
         manual_parameters=[
             openapi.Parameter(
                 name='id',
@@ -317,11 +329,47 @@ class AvailabilityScheduleByIdView(APIView):
     )
 
     def put(self, request, id):
+        return self.update(request, id)
+
+    @swagger_auto_schema(
+        operation_summary="Partially update availability schedule",
+        operation_description="Update only the fields sent; only the columns that change are written. "
+                              "Send `Prefer: return=minimal` to get 204 No Content instead of the availability schedule.",
+        request_body=AVAILABILITY_SCHEDULE_UPDATE_BODY,
+        responses={
+            200: openapi.Response("Availability schedule updated", AvailabilityScheduleSerializer),
+            204: openapi.Response(description="Updated; sent for Prefer: return=minimal"),
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='id',
+                in_=openapi.IN_PATH,
+                type=openapi.TYPE_INTEGER,
+                required=True,
+                description="ID of the availability schedule to update"
+            ),
+            concurrency.PREFER_PARAMETER
+        ],
+        tags=["Availability Schedule"]
+    )
+
+    def patch(self, request, id):
+        return self.update(request, id, partial=True)
+
+    def update(self, request, id, partial=False):
         availability_schedule = get_object_or_404(AvailabilitySchedule, id=id)
-        serializer = AvailabilityScheduleSerializer(availability_schedule, data=request.data)
+        serializer = AvailabilityScheduleSerializer(availability_schedule, data=request.data, partial=partial)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+            availability_schedule.save(update_fields=concurrency.assign_validated(availability_schedule, serializer.validated_data))
+            return concurrency.update_response(request, availability_schedule, AvailabilityScheduleSerializer)
         return Response(serializer.errors, status=http_status.HTTP_400_BAD_REQUEST)
     
     @swagger_auto_schema(
@@ -405,12 +453,16 @@ class GetAllAvailabilityScheduleView(APIView):
                 }
             )
         },
+        manual_parameters=LIST_VIEW_PARAMETERS,
         tags=["Availability Schedule"]
     )
 
     def get(self, request):
         availability = AvailabilitySchedule.objects.all()
-        serializer = AvailabilityScheduleSerializer(availability, many=True)
+        compact = compact_response(request, availability, AVAILABILITY_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = AvailabilityScheduleSerializer(doctor_related(availability, 'doctor__'), many=True)
         return Response(serializer.data)
     
 # Doctor manage time off view----------------------------------------------------------------------------------
@@ -590,8 +642,7 @@ class TimeOffView(APIView):
             
             # Parse datetime strings
             try:
-                start_datetime = parse_datetime(start_datetime)
-                end_datetime = parse_datetime(end_datetime)
+                start_datetime, end_datetime = parse_datetimes([start_datetime, end_datetime])
             except ValueError as e:
                 return Response({'message': str(e)}, 
                             status=http_status.HTTP_400_BAD_REQUEST)
@@ -637,14 +688,10 @@ class TimeOffView(APIView):
     
     def send_notifications(self, doctor, start, end):
         """Send notifications about new time off"""
-        timezone.activate(pytz.timezone('Africa/Nairobi'))        
-        message = f"Time off scheduled from {start.strftime('%b %d, %Y %I:%M %p')} to {end.strftime('%b %d, %Y %I:%M %p')}"
+        message = f"Time off scheduled from {format_local(start)} to {format_local(end)}"
         
         # To doctor
-        Notification.objects.create(
-            user=doctor.user,
-            message=message
-        )
+        notifications.notify(doctor.user_id, notifications.TIME_OFF, message)
         
     def has_time_off_conflict(self, doctor, start, end):
         """Check for overlapping time off periods"""
@@ -656,6 +703,40 @@ class TimeOffView(APIView):
 
         
 # Doctor put/delete time off view----------------------------------------------------------------------------------
+TIME_OFF_UPDATE_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'start_datetime': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_DATETIME,
+            description="New start datetime in ISO 8601 format",
+            example="2023-08-15T09:00:00"
+        ),
+        'end_datetime': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_DATETIME,
+            description="New end datetime in ISO 8601 format",
+            example="2023-08-15T17:00:00"
+        ),
+        'reason': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description="Updated reason for time off",
+            example="Changed to medical conference"
+        ),
+        'is_approved': openapi.Schema(
+            type=openapi.TYPE_BOOLEAN,
+            description="Approval status (admins only)",
+            default=False
+        )
+    },
+    example={
+        "start_datetime": "2023-08-15T09:00:00",
+        "end_datetime": "2023-08-15T17:00:00",
+        "reason": "Medical conference",
+        "is_approved": True
+    }
+)
+
 class TimeOffByIdView(APIView):
     permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
     authentication_classes = [OAuth2Authentication]
@@ -680,41 +761,10 @@ class TimeOffByIdView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            concurrency.IF_MATCH_PARAMETER
         ],
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            properties={
-                'start_datetime': openapi.Schema(
-                    type=openapi.TYPE_STRING,
-                    format=openapi.FORMAT_DATETIME,
-                    description="New start datetime in ISO 8601 format",
-                    example="2023-08-15T09:00:00"
-                ),
-                'end_datetime': openapi.Schema(
-                    type=openapi.TYPE_STRING,
-                    format=openapi.FORMAT_DATETIME,
-                    description="New end datetime in ISO 8601 format",
-                    example="2023-08-15T17:00:00"
-                ),
-                'reason': openapi.Schema(
-                    type=openapi.TYPE_STRING,
-                    description="Updated reason for time off",
-                    example="Changed to medical conference"
-                ),
-                'is_approved': openapi.Schema(
-                    type=openapi.TYPE_BOOLEAN,
-                    description="Approval status (admins only)",
-                    default=False
-                )
-            },
-            example={
-                "start_datetime": "2023-08-15T09:00:00",
-                "end_datetime": "2023-08-15T17:00:00",
-                "reason": "Medical conference",
-                "is_approved": True
-            }
-        ),
+        request_body=TIME_OFF_UPDATE_BODY,
         responses={
             200: openapi.Response(
                 description="Time off updated successfully",
@@ -751,6 +801,14 @@ class TimeOffByIdView(APIView):
                         "message": "Time off request not found"
                     }
                 }
+            ),
+            412: openapi.Response(
+                description="Precondition Failed",
+                examples={
+                    "application/json": {
+                        "message": "This record was changed by another request. Reload it and try again"
+                    }
+                }
             )
         },
         security=[{'Bearer': []}],
@@ -758,6 +816,51 @@ class TimeOffByIdView(APIView):
     )
 
     def put(self, request, id):
+        return self.update(request, id)
+
+    @swagger_auto_schema(
+        operation_summary="Partially update time off request",
+        operation_description="Update only the fields sent; only the columns that change are written. "
+                              "Send `Prefer: return=minimal` to get 204 No Content instead of the time off request.",
+        request_body=TIME_OFF_UPDATE_BODY,
+        responses={
+            200: openapi.Response("Time off request updated", TimeOffSerializer),
+            204: openapi.Response(description="Updated; sent for Prefer: return=minimal"),
+            412: openapi.Response(
+                description="Precondition Failed",
+                examples={
+                    "application/json": {
+                        "message": "This record was changed by another request. Reload it and try again"
+                    }
+                }
+            ),
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='id',
+                in_=openapi.IN_PATH,
+                type=openapi.TYPE_INTEGER,
+                required=True,
+                description="ID of the time off request to update"
+            ),
+            concurrency.IF_MATCH_PARAMETER,
+            concurrency.PREFER_PARAMETER
+        ],
+        tags=['Time-Offs']
+    )
+
+    def patch(self, request, id):
+        return self.update(request, id)
+
+    def update(self, request, id):
         try:
             user= request.user
             if not user:
@@ -776,8 +879,7 @@ class TimeOffByIdView(APIView):
             # Parse datetime strings
             if start_datetime and end_datetime:
                 try:
-                    start_datetime = parse_datetime(start_datetime)
-                    end_datetime = parse_datetime(end_datetime)
+                    start_datetime, end_datetime = parse_datetimes([start_datetime, end_datetime])
                 except ValueError as e:
                     return Response({'message': str(e)}, 
                                 status=http_status.HTTP_400_BAD_REQUEST)
@@ -800,14 +902,19 @@ class TimeOffByIdView(APIView):
                     {'message': 'You can only update your own time off requests'},
                     status=http_status.HTTP_403_FORBIDDEN
                 )
+            precondition = concurrency.check_if_match(request, time_off)
+            if precondition:
+                return precondition
             serializer = TimeOffSerializer(time_off, data=request.data, partial=True)
             if serializer.is_valid():
-                update_time= serializer.save()
-                if update_time.is_approved:
-                    Notification.objects.create(user=update_time.doctor.user, message=f"Time off approved from {update_time.start_datetime} to {update_time.end_datetime}")
-                return Response(serializer.data)
+                time_off.save(update_fields=concurrency.assign_validated(time_off, serializer.validated_data))
+                if time_off.is_approved:
+                    notifications.notify(time_off.doctor.user_id, notifications.TIME_OFF, f"Time off approved from {time_off.start_datetime} to {time_off.end_datetime}")
+                return concurrency.update_response(request, time_off, TimeOffSerializer)
             return Response(serializer.errors, status=http_status.HTTP_400_BAD_REQUEST)
         
+        except VersionConflict:
+            return concurrency.precondition_failed(time_off)
         except Exception as e:
             return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
         
@@ -968,7 +1075,8 @@ class AppointmentView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=['Appointments']
     )
@@ -987,7 +1095,10 @@ class AppointmentView(APIView):
         
         # Get all appointments for the current doctor
         appointments = Appointment.objects.filter(doctor_id=current_doctor.id).all()
-        serializer = AppointmentSerializer(appointments, many=True)
+        compact = compact_response(request, appointments, APPOINTMENT_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = AppointmentSerializer(appointment_related(appointments), many=True)
         return Response(serializer.data)
     
     @swagger_auto_schema(
@@ -1042,12 +1153,14 @@ class AppointmentView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            idempotency.IDEMPOTENCY_KEY_PARAMETER
         ],
         tags=['Appointments']
    
     )
 
+    @idempotency.idempotent
     def post(self, request):
         try:
             user= request.user
@@ -1087,8 +1200,7 @@ class AppointmentView(APIView):
                 
             # Parse datetime strings
             try:
-                scheduled_time = parse_datetime(scheduled_time)
-                end_time = parse_datetime(end_time)
+                scheduled_time, end_time = parse_datetimes([scheduled_time, end_time])
             except ValueError as e:
                 return Response({'message': str(e)}, 
                             status=http_status.HTTP_400_BAD_REQUEST)
@@ -1109,31 +1221,34 @@ class AppointmentView(APIView):
             
             availability= self.check_doctor_availability(doctor, scheduled_time, end_time)
             if availability:
-                return Response({'message': 'Doctor not available at this time'}, 
-                        status=http_status.HTTP_400_BAD_REQUEST)  
+                return idempotency.unstored(Response({'message': 'Doctor not available at this time'},
+                        status=http_status.HTTP_400_BAD_REQUEST))
                 
             
             timeoff_availability= self.check_doctor_time_off(doctor, scheduled_time, end_time)
             if timeoff_availability:
-                return Response({'message': 'Doctor is on leave during this time'}, 
-                        status=http_status.HTTP_400_BAD_REQUEST)
+                return idempotency.unstored(Response({'message': 'Doctor is on leave during this time'},
+                        status=http_status.HTTP_400_BAD_REQUEST))
             
             # Check for overlapping appointments
             appointment_overlap= self.check_appointment_overlap(doctor, scheduled_time, end_time)
             if appointment_overlap:
-                return Response({'message': 'This appointment overlaps with an existing one'}, status=http_status.HTTP_400_BAD_REQUEST)    
+                return idempotency.unstored(Response({'message': 'This appointment overlaps with an existing one'},
+                        status=http_status.HTTP_400_BAD_REQUEST))
             
             # Create appointment
             try:
-                new_appointment = Appointment.objects.create(
-                    patient=patient,
-                    doctor=doctor,
-                    scheduled_time=scheduled_time,
-                    end_time=end_time,
-                    status=status,
-                    reason=reason,
-                    notes=notes
-                )
+                with transaction.atomic():
+                    new_appointment = Appointment.objects.create(
+                        patient=patient,
+                        doctor=doctor,
+                        scheduled_time=scheduled_time,
+                        end_time=end_time,
+                        status=status,
+                        reason=reason,
+                        notes=notes
+                    )
+                    analytics.apply_appointment_change(None, analytics.snapshot(new_appointment))
             except Exception as e:
                 return Response(
                     {'message': 'Appointment scheduling conflict occurred'},
@@ -1148,7 +1263,7 @@ class AppointmentView(APIView):
             return Response(serializer.data, status=http_status.HTTP_201_CREATED)
         
         except Exception as e:
-            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+            return idempotency.failed(e)
     
     def get_doctor(self, user):
         try:
@@ -1218,15 +1333,23 @@ class AppointmentView(APIView):
     
     def send_notifications(self, doctor, start, end):
         """Send notifications about new time off"""
-        timezone.activate(pytz.timezone('Africa/Nairobi'))        
-        message = f"Time off scheduled from {start.strftime('%b %d, %Y %I:%M %p')} to {end.strftime('%b %d, %Y %I:%M %p')}"
+        message = f"Time off scheduled from {format_local(start)} to {format_local(end)}"
         
         # To doctor
-        Notification.objects.create(
-            user=doctor.user,
-            message=message
-        )
+        notifications.notify(doctor.user_id, notifications.TIME_OFF, message)
     
+APPOINTMENT_UPDATE_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'scheduled_time': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        'end_time': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+        'status': openapi.Schema(type=openapi.TYPE_STRING),
+        'reason': openapi.Schema(type=openapi.TYPE_STRING),
+        'notes': openapi.Schema(type=openapi.TYPE_STRING),
+        'patient_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+    }
+)
+
 class AppointmentByIdView(APIView):
     permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
     authentication_classes = [OAuth2Authentication]
@@ -1291,24 +1414,14 @@ class AppointmentByIdView(APIView):
 
             appointment = get_object_or_404(Appointment, id=id)
             serializer = AppointmentSerializer(appointment)
-            return Response(serializer.data)
+            return concurrency.with_etag(Response(serializer.data), appointment)
         except Exception as e:
             return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
     
     @swagger_auto_schema(
         operation_summary="Update an appointment",
         operation_description="Update an appointment by its ID. Requires doctor privileges.",
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            properties={
-                'scheduled_time': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
-                'end_time': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
-                'status': openapi.Schema(type=openapi.TYPE_STRING),
-                'reason': openapi.Schema(type=openapi.TYPE_STRING),
-                'notes': openapi.Schema(type=openapi.TYPE_STRING),
-                'patient_id': openapi.Schema(type=openapi.TYPE_INTEGER),
-            }
-        ),
+        request_body=APPOINTMENT_UPDATE_BODY,
         responses={
             200: openapi.Response("Appointment updated successfully",AppointmentSerializer),
             400: openapi.Response(
@@ -1334,6 +1447,14 @@ class AppointmentByIdView(APIView):
                         "message": "Doctor not found"
                     }
                 }
+            ),
+            412: openapi.Response(
+                description="Precondition Failed",
+                examples={
+                    "application/json": {
+                        "message": "This record was changed by another request. Reload it and try again"
+                    }
+                }
             )
         },
         security=[{'Bearer': []}],
@@ -1351,12 +1472,58 @@ class AppointmentByIdView(APIView):
                 type=openapi.TYPE_INTEGER,
                 required=True,
                 description="Appointment ID"
-            )
+            ),
+            concurrency.IF_MATCH_PARAMETER
         ],
         tags=['Appointments']
     )
 
     def put(self, request, id):
+        return self.update(request, id)
+
+    @swagger_auto_schema(
+        operation_summary="Partially update appointment",
+        operation_description="Update only the fields sent; only the columns that change are written. "
+                              "Send `Prefer: return=minimal` to get 204 No Content instead of the appointment.",
+        request_body=APPOINTMENT_UPDATE_BODY,
+        responses={
+            200: openapi.Response("Appointment updated", AppointmentSerializer),
+            204: openapi.Response(description="Updated; sent for Prefer: return=minimal"),
+            412: openapi.Response(
+                description="Precondition Failed",
+                examples={
+                    "application/json": {
+                        "message": "This record was changed by another request. Reload it and try again"
+                    }
+                }
+            ),
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='id',
+                in_=openapi.IN_PATH,
+                type=openapi.TYPE_INTEGER,
+                required=True,
+                description="Appointment ID"
+            ),
+            concurrency.IF_MATCH_PARAMETER,
+            concurrency.PREFER_PARAMETER
+        ],
+        tags=['Appointments']
+    )
+
+    def patch(self, request, id):
+        return self.update(request, id)
+
+    def update(self, request, id):
         try:
             user= request.user
             if not user:
@@ -1369,7 +1536,14 @@ class AppointmentByIdView(APIView):
             if not current_doctor:
                 return Response({'message': 'Doctor not found'}, status=http_status.HTTP_404_NOT_FOUND)
 
-            appointment = get_object_or_404(Appointment, doctor=current_doctor, id=id)
+            appointment = get_object_or_404(
+                Appointment.objects.select_related('patient__user', 'doctor__user'), doctor=current_doctor, id=id
+            )
+            precondition = concurrency.check_if_match(request, appointment)
+            if precondition:
+                return precondition
+            before = analytics.snapshot(appointment)
+            slot = waitlist.freed_slot(appointment)
             data= request.data
             scheduled_time = data.get('scheduled_time')
             end_time = data.get('end_time')
@@ -1380,8 +1554,7 @@ class AppointmentByIdView(APIView):
             
             if scheduled_time and end_time:
                 try:
-                    scheduled_time= parse_datetime(scheduled_time)
-                    end_time= parse_datetime(end_time)
+                    scheduled_time, end_time= parse_datetimes([scheduled_time, end_time])
                 except ValueError as e:
                     return Response({'message': str(e)}, 
                                 status=http_status.HTTP_400_BAD_REQUEST)
@@ -1407,36 +1580,38 @@ class AppointmentByIdView(APIView):
                 if appointment_overlap:
                     return Response({'message': 'This appointment overlaps with an existing one'}, status=http_status.HTTP_400_BAD_REQUEST)
                 
-            if scheduled_time:
-                appointment.scheduled_time= scheduled_time
-            if end_time:
-                appointment.end_time= end_time            
-            if status:
-                appointment.status= status
-            if reason:
-                appointment.reason= reason
-            if notes:
-                appointment.notes= notes
             if patient_id:
                 return  Response({'message': 'Patient cannot be updated'}, status=http_status.HTTP_400_BAD_REQUEST)
+            changed = concurrency.assign(appointment, {
+                'scheduled_time': scheduled_time, 'end_time': end_time, 'status': status, 'reason': reason, 'notes': notes
+            })
+            if 'scheduled_time' in changed:
+                # A rescheduled appointment gets a fresh reminder
+                appointment.reminder_sent_at= None
+                changed.append('reminder_sent_at')
             
-            appointment.save()  
-            serializer = AppointmentSerializer(appointment)        
+            with transaction.atomic():
+                appointment.save(update_fields=changed)
+                analytics.apply_appointment_change(before, analytics.snapshot(appointment))
+                if appointment.status == 'CANCELLED':
+                    waitlist.offer_freed_slot(slot, exclude_patient_id=appointment.patient_id)
             if status== 'CONFIRMED':
-                Notification.objects.create(user=appointment.patient.user, message=f"Appointment confirmed with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
+                notifications.notify(appointment.patient.user_id, notifications.APPOINTMENT_STATUS, f"Appointment confirmed with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
             elif status== 'CANCELLED':
-                Notification.objects.create(user=appointment.patient.user, message=f"Appointment cancelled with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
+                notifications.notify(appointment.patient.user_id, notifications.APPOINTMENT_STATUS, f"Appointment cancelled with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
             elif status== 'COMPLETED':
-                Notification.objects.create(user=appointment.patient.user, message=f"Appointment completed with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
+                notifications.notify(appointment.patient.user_id, notifications.APPOINTMENT_STATUS, f"Appointment completed with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
             elif status== 'NO_SHOW':
-                Notification.objects.create(user=appointment.patient.user, message=f"Patient no show for appointment with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
+                notifications.notify(appointment.patient.user_id, notifications.APPOINTMENT_STATUS, f"Patient no show for appointment with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
             elif status== 'IN_PROGRESS':
-                Notification.objects.create(user=appointment.patient.user, message=f"Appointment in progress with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
+                notifications.notify(appointment.patient.user_id, notifications.APPOINTMENT_STATUS, f"Appointment in progress with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
             elif status== 'SCHEDULED':
-                Notification.objects.create(user=appointment.patient.user, message=f"Appointment scheduled with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
+                notifications.notify(appointment.patient.user_id, notifications.APPOINTMENT_STATUS, f"Appointment scheduled with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
             elif status== 'RESCHEDULED':
-                Notification.objects.create(user=appointment.patient.user, message=f"Appointment rescheduled with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
-            return Response(serializer.data)
+                notifications.notify(appointment.patient.user_id, notifications.APPOINTMENT_STATUS, f"Appointment rescheduled with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time}")
+            return concurrency.update_response(request, appointment, AppointmentSerializer)
+        except VersionConflict:
+            return concurrency.precondition_failed(appointment)
         except Exception as e:
             return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
         
@@ -1498,8 +1673,12 @@ class AppointmentByIdView(APIView):
             if not current_doctor:
                 return Response({'message': 'Doctor not found'}, status=http_status.HTTP_404_NOT_FOUND)
             appointment = get_object_or_404(Appointment, doctor=current_doctor, id=id)
-            appointment.delete()
-            Notification.objects.create(user=appointment.doctor.user, message=f"Appointment with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time} has been deleted")
+            slot = waitlist.freed_slot(appointment)
+            with transaction.atomic():
+                analytics.apply_appointment_change(analytics.snapshot(appointment), None)
+                appointment.delete()
+                waitlist.offer_freed_slot(slot, exclude_patient_id=appointment.patient_id)
+            notifications.notify(appointment.doctor.user_id, notifications.APPOINTMENT_DELETED, f"Appointment with {appointment.doctor.user.get_full_name()} on {appointment.scheduled_time} has been deleted")
             serializer = AppointmentSerializer(appointment)
             return Response(serializer.data)
         except Exception as e:
@@ -1597,7 +1776,8 @@ class GetAllAppointmentView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=['Appointments']
     )
@@ -1614,7 +1794,10 @@ class GetAllAppointmentView(APIView):
         else:
             appointments = Appointment.objects.all()
 
-        serializer = AppointmentSerializer(appointments, many=True)
+        compact = compact_response(request, appointments, APPOINTMENT_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = AppointmentSerializer(appointment_related(appointments), many=True)
         return Response(serializer.data)
 
 # Doctor save medical record view----------------------------------------------------------------------------------
@@ -1656,7 +1839,8 @@ class MedicalRecordView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=['Medical Records']
     )
@@ -1679,7 +1863,10 @@ class MedicalRecordView(APIView):
             medical_records = MedicalRecord.objects.all()
         else:
             medical_records = MedicalRecord.objects.filter(patient__user=user).all()
-        serializer = MedicalRecordSerializer(medical_records, many=True)
+        compact = compact_response(request, medical_records, MEDICAL_RECORD_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = MedicalRecordSerializer(medical_record_related(medical_records), many=True)
         return Response(serializer.data)
     
     @swagger_auto_schema(
@@ -1810,6 +1997,7 @@ class MedicalRecordView(APIView):
             medical_record = MedicalRecord(
                 doctor=current_doctor,
                 appointment=current_appointment,
+                patient=patient,
                 record_type=record_type,
                 title=title,
                 description=description,
@@ -1823,7 +2011,7 @@ class MedicalRecordView(APIView):
             serializer = MedicalRecordSerializer(medical_record)
             
             # Send notification to doctor
-            Notification.objects.create(user=current_doctor.user, message=f"New medical record created for {patient.user.get_full_name()}")
+            notifications.notify(current_doctor.user_id, notifications.MEDICAL_RECORD_CREATED, f"New medical record created for {patient.user.get_full_name()}")
 
             return Response(serializer.data, status=http_status.HTTP_201_CREATED)
         except Exception as e:
@@ -1842,6 +2030,18 @@ class MedicalRecordView(APIView):
         return duplicate
     
 # Doctor medical record by id view----------------------------------------------------------------------------------    
+MEDICAL_RECORD_UPDATE_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'record_type': openapi.Schema(type=openapi.TYPE_STRING),
+        'title': openapi.Schema(type=openapi.TYPE_STRING),
+        'description': openapi.Schema(type=openapi.TYPE_STRING),
+        'date_recorded': openapi.Schema(type=openapi.TYPE_STRING),
+        'file': openapi.Schema(type=openapi.TYPE_FILE),
+        'is_sensitive': openapi.Schema(type=openapi.TYPE_BOOLEAN)
+    }
+)
+
 class MedicalRecordByIdView(APIView):
     permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
     authentication_classes = [OAuth2Authentication]
@@ -1908,7 +2108,7 @@ class MedicalRecordByIdView(APIView):
 
             medical_record = get_object_or_404(MedicalRecord, id=id)
             serializer = MedicalRecordSerializer(medical_record)
-            return Response(serializer.data)
+            return concurrency.with_etag(Response(serializer.data), medical_record)
         except Exception as e:
             return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
         
@@ -1916,17 +2116,7 @@ class MedicalRecordByIdView(APIView):
         # put
         operation_summary="Update medical record by ID",
         operation_description="Update a medical record by ID. Requires doctor privileges.",
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            properties={
-                'record_type': openapi.Schema(type=openapi.TYPE_STRING),
-                'title': openapi.Schema(type=openapi.TYPE_STRING),
-                'description': openapi.Schema(type=openapi.TYPE_STRING),
-                'date_recorded': openapi.Schema(type=openapi.TYPE_STRING),
-                'file': openapi.Schema(type=openapi.TYPE_FILE),
-                'is_sensitive': openapi.Schema(type=openapi.TYPE_BOOLEAN)
-            }
-        ),
+        request_body=MEDICAL_RECORD_UPDATE_BODY,
         responses={
             200: openapi.Response(
                 description="Medical record updated successfully",
@@ -1955,6 +2145,14 @@ class MedicalRecordByIdView(APIView):
                         "message": "User not found"
                     }
                 }
+            ),
+            412: openapi.Response(
+                description="Precondition Failed",
+                examples={
+                    "application/json": {
+                        "message": "This record was changed by another request. Reload it and try again"
+                    }
+                }
             )
         },
         security=[{'Bearer': []}],
@@ -1972,51 +2170,90 @@ class MedicalRecordByIdView(APIView):
                 type=openapi.TYPE_INTEGER,
                 required=True,
                 description="ID of the medical record to update"
-            )
+            ),
+            concurrency.IF_MATCH_PARAMETER
         ],
         tags=['Medical Records']
     )
 
     def put(self, request, id):
-        try:
-            user= request.user
-            if not user:
-                return Response({'message': 'User not found'}, status=http_status.HTTP_404_NOT_FOUND)
-            if user.user_type not in ['DOCTOR', 'ADMIN']:
-                return Response({'message': 'Only doctors or admins can perform this action'},
-                            status=http_status.HTTP_403_FORBIDDEN)
-
-            current_doctor = Doctor.objects.filter(user=user).first()
-            if not current_doctor:
-                return Response({'message': 'Doctor not found'}, status=http_status.HTTP_404_NOT_FOUND)
-
-            medical_record = get_object_or_404(MedicalRecord, id=id)
-            data= request.data
-            record_type = data.get('record_type')
-            title= data.get('title')
-            description= data.get('description')
-            date_recorded= data.get('date_recorded')
-            file= request.FILES.get('file')
-            is_sensitive= data.get('is_sensitive')
-            
-            if record_type:
-                medical_record.record_type = record_type
-            if title:
-                medical_record.title = title
-            if description:
-                medical_record.description = description
-            if date_recorded:
-                medical_record.date_recorded = date_recorded
-            if file:
-                medical_record.file = file
-            if is_sensitive:
-                medical_record.is_sensitive = is_sensitive           
+        return self.update(request, id)
 
-            medical_record.save()
-            serializer = MedicalRecordSerializer(medical_record)
-            return Response(serializer.data)
-        except Exception as e:
-            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+    @swagger_auto_schema(
+        operation_summary="Partially update medical record",
+        operation_description="Update only the fields sent; only the columns that change are written. "
+                              "Send `Prefer: return=minimal` to get 204 No Content instead of the medical record.",
+        request_body=MEDICAL_RECORD_UPDATE_BODY,
+        responses={
+            200: openapi.Response("Medical record updated", MedicalRecordSerializer),
+            204: openapi.Response(description="Updated; sent for Prefer: return=minimal"),
+            412: openapi.Response(
+                description="Precondition Failed",
+                examples={
+                    "application/json": {
+                        "message": "This record was changed by another request. Reload it and try again"
+                    }
+                }
+            ),
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='id',
+                in_=openapi.IN_PATH,
+                type=openapi.TYPE_INTEGER,
+                required=True,
+                description="Medical record ID"
+            ),
+            concurrency.IF_MATCH_PARAMETER,
+            concurrency.PREFER_PARAMETER
+        ],
+        tags=['Medical Records']
+    )
+
+    def patch(self, request, id):
+        return self.update(request, id)
+
+    def update(self, request, id):
+        try:
+            user= request.user
+            if not user:
+                return Response({'message': 'User not found'}, status=http_status.HTTP_404_NOT_FOUND)
+            if user.user_type not in ['DOCTOR', 'ADMIN']:
+                return Response({'message': 'Only doctors or admins can perform this action'},
+                            status=http_status.HTTP_403_FORBIDDEN)
+
+            current_doctor = Doctor.objects.filter(user=user).first()
+            if not current_doctor:
+                return Response({'message': 'Doctor not found'}, status=http_status.HTTP_404_NOT_FOUND)
+
+            medical_record = get_object_or_404(MedicalRecord, id=id)
+            precondition = concurrency.check_if_match(request, medical_record)
+            if precondition:
+                return precondition
+            data= request.data
+            changed = concurrency.assign(medical_record, {
+                'record_type': data.get('record_type'),
+                'title': data.get('title'),
+                'description': data.get('description'),
+                'date_recorded': data.get('date_recorded'),
+                'file': request.FILES.get('file'),
+                'is_sensitive': data.get('is_sensitive'),
+            })
+
+            medical_record.save(update_fields=changed)
+            return concurrency.update_response(request, medical_record, MedicalRecordSerializer)
+        except VersionConflict:
+            return concurrency.precondition_failed(medical_record)
+        except Exception as e:
+            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
         
     @swagger_auto_schema(
         # delete
@@ -2121,7 +2358,8 @@ class GetAllMedicalRecordView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=['Medical Records']
 
@@ -2144,7 +2382,10 @@ class GetAllMedicalRecordView(APIView):
         elif user.user_type == 'ADMIN':
             medical_records = MedicalRecord.objects.all()
             
-        serializer = MedicalRecordSerializer(medical_records, many=True)
+        compact = compact_response(request, medical_records, MEDICAL_RECORD_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = MedicalRecordSerializer(medical_record_related(medical_records), many=True)
         return Response(serializer.data)
 
 class PrescriptionView(APIView):
@@ -2185,7 +2426,8 @@ class PrescriptionView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=['Prescriptions']
 
@@ -2208,7 +2450,10 @@ class PrescriptionView(APIView):
         elif user.user_type == 'ADMIN':
             prescriptions = Prescription.objects.all()
 
-        serializer = PrescriptionSerializer(prescriptions, many=True)
+        compact = compact_response(request, prescriptions, PRESCRIPTION_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = PrescriptionSerializer(prescription_related(prescriptions), many=True)
         return Response(serializer.data)
     
     @swagger_auto_schema(
@@ -2266,12 +2511,14 @@ class PrescriptionView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            idempotency.IDEMPOTENCY_KEY_PARAMETER
         ],
         tags=['Prescriptions']
 
     )
 
+    @idempotency.idempotent
     def post(self, request):
         try:
             user= request.user
@@ -2327,16 +2574,18 @@ class PrescriptionView(APIView):
                 refills_remaining=refills_remaining,
                 instructions=instructions
             )
-            prescription.save()  
+            # One transaction with the active medication entry the save signal writes
+            with transaction.atomic():
+                prescription.save()
 
             serializer = PrescriptionSerializer(prescription)
 
             # Send notification to doctor
-            Notification.objects.create(user=current_doctor.user, message=f"New prescription created for {current_record.appointment.patient.user.get_full_name()}")
+            notifications.notify(current_doctor.user_id, notifications.PRESCRIPTION_CREATED, f"New prescription created for {current_record.appointment.patient.user.get_full_name()}")
 
             return Response(serializer.data, status=http_status.HTTP_201_CREATED)
         except Exception as e:
-            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+            return idempotency.failed(e)
 
 # Get all prescriptions-------------------------------------------------------------------------------------
 class GetAllPrescriptionView(APIView):
@@ -2377,7 +2626,8 @@ class GetAllPrescriptionView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=['Prescriptions']
 
@@ -2400,10 +2650,26 @@ class GetAllPrescriptionView(APIView):
         elif user.user_type == 'ADMIN':
             prescriptions = Prescription.objects.all()
 
-        serializer = PrescriptionSerializer(prescriptions, many=True)
+        compact = compact_response(request, prescriptions, PRESCRIPTION_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = PrescriptionSerializer(prescription_related(prescriptions), many=True)
         return Response(serializer.data)
 
 # Prescription by id---------------------------------------------------------------------------------------
+PRESCRIPTION_UPDATE_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'medication_name': openapi.Schema(type=openapi.TYPE_STRING),
+        'dosage': openapi.Schema(type=openapi.TYPE_STRING),
+        'frequency': openapi.Schema(type=openapi.TYPE_STRING),
+        'start_date': openapi.Schema(type=openapi.TYPE_STRING),
+        'end_date': openapi.Schema(type=openapi.TYPE_STRING),
+        'refills_remaining': openapi.Schema(type=openapi.TYPE_INTEGER),
+        'instructions': openapi.Schema(type=openapi.TYPE_STRING),
+    }
+)
+
 class PrescriptionByIdView(APIView):
     permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
     authentication_classes = [OAuth2Authentication]
@@ -2477,7 +2743,7 @@ class PrescriptionByIdView(APIView):
                 return Response({'message': 'Prescription not found'}, status=http_status.HTTP_404_NOT_FOUND)
 
             serializer = PrescriptionSerializer(prescription)
-            return Response(serializer.data)
+            return concurrency.with_etag(Response(serializer.data), prescription)
         except Exception as e:
             return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
         
@@ -2485,18 +2751,7 @@ class PrescriptionByIdView(APIView):
         # put
         operation_summary="Update prescription by id",
         operation_description="Update prescription by id. Requires doctor or admin privileges.",
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            properties={
-                'medication_name': openapi.Schema(type=openapi.TYPE_STRING),
-                'dosage': openapi.Schema(type=openapi.TYPE_STRING),
-                'frequency': openapi.Schema(type=openapi.TYPE_STRING),
-                'start_date': openapi.Schema(type=openapi.TYPE_STRING),
-                'end_date': openapi.Schema(type=openapi.TYPE_STRING),
-                'refills_remaining': openapi.Schema(type=openapi.TYPE_INTEGER),
-                'instructions': openapi.Schema(type=openapi.TYPE_STRING),
-            }
-        ),
+        request_body=PRESCRIPTION_UPDATE_BODY,
         responses={
             200: openapi.Response(
                 description="Prescription",
@@ -2517,6 +2772,14 @@ class PrescriptionByIdView(APIView):
                         "message": "User not found"
                     }
                 }
+            ),
+            412: openapi.Response(
+                description="Precondition Failed",
+                examples={
+                    "application/json": {
+                        "message": "This record was changed by another request. Reload it and try again"
+                    }
+                }
             )
         },
         security=[{'Bearer': []}],
@@ -2534,13 +2797,59 @@ class PrescriptionByIdView(APIView):
                 type=openapi.TYPE_INTEGER,
                 required=True,
                 description="ID of the prescription to update"
-            )
+            ),
+            concurrency.IF_MATCH_PARAMETER
         ],
         tags=['Prescriptions']
 
     )
     
     def put(self, request, id):
+        return self.update(request, id)
+
+    @swagger_auto_schema(
+        operation_summary="Partially update prescription",
+        operation_description="Update only the fields sent; only the columns that change are written. "
+                              "Send `Prefer: return=minimal` to get 204 No Content instead of the prescription.",
+        request_body=PRESCRIPTION_UPDATE_BODY,
+        responses={
+            200: openapi.Response("Prescription updated", PrescriptionSerializer),
+            204: openapi.Response(description="Updated; sent for Prefer: return=minimal"),
+            412: openapi.Response(
+                description="Precondition Failed",
+                examples={
+                    "application/json": {
+                        "message": "This record was changed by another request. Reload it and try again"
+                    }
+                }
+            ),
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='id',
+                in_=openapi.IN_PATH,
+                type=openapi.TYPE_INTEGER,
+                required=True,
+                description="Prescription ID"
+            ),
+            concurrency.IF_MATCH_PARAMETER,
+            concurrency.PREFER_PARAMETER
+        ],
+        tags=['Prescriptions']
+    )
+
+    def patch(self, request, id):
+        return self.update(request, id)
+
+    def update(self, request, id):
         try:
             user= request.user
             if not user:
@@ -2561,34 +2870,24 @@ class PrescriptionByIdView(APIView):
             if not prescription:
                 return Response({'message': 'Prescription not found'}, status=http_status.HTTP_404_NOT_FOUND)
 
+            precondition = concurrency.check_if_match(request, prescription)
+            if precondition:
+                return precondition
             data= request.data
-            medication_name= data.get('medication_name')
-            dosage= data.get('dosage')
-            frequency= data.get('frequency')
-            start_date= data.get('start_date')
-            end_date= data.get('end_date')
-            refills_remaining= data.get('refills_remaining')
-            instructions= data.get('instructions')
-
-            if medication_name:
-                prescription.medication_name = medication_name
-            if dosage:
-                prescription.dosage = dosage
-            if frequency:
-                prescription.frequency = frequency
-            if start_date:
-                prescription.start_date = start_date
-            if end_date:
-                prescription.end_date = end_date
-            if refills_remaining:
-                prescription.refills_remaining = refills_remaining
-            if instructions:
-                prescription.instructions = instructions
-
-            prescription.save()
-
-            serializer = PrescriptionSerializer(prescription)
-            return Response(serializer.data)
+            changed = concurrency.assign(prescription, {
+                'medication_name': data.get('medication_name'),
+                'dosage': data.get('dosage'),
+                'frequency': data.get('frequency'),
+                'start_date': data.get('start_date'),
+                'end_date': data.get('end_date'),
+                'refills_remaining': data.get('refills_remaining'),
+                'instructions': data.get('instructions'),
+            })
+
+            prescription.save(update_fields=changed)
+            return concurrency.update_response(request, prescription, PrescriptionSerializer)
+        except VersionConflict:
+            return concurrency.precondition_failed(prescription)
         except Exception as e:
             return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
         
@@ -2675,7 +2974,8 @@ class GetNotifications(APIView):
     
     @swagger_auto_schema(
         operation_summary='Get all notifications',
-        operation_description="Get all notifications",
+        operation_description="Get the unread notifications, newest first. Unread notifications older than "
+                              "NOTIFICATION_UNREAD_TTL_DAYS are left out, as retention purges them",
         responses={
             200: openapi.Response(
                 description="List of notifications",
@@ -2690,7 +2990,8 @@ class GetNotifications(APIView):
                 openapi.IN_HEADER,
                 description='Bearer <token>',
                 type=openapi.TYPE_STRING
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=["Notifications"]
     )
@@ -2700,10 +3001,25 @@ class GetNotifications(APIView):
         if not user:
             return Response({'message': 'User not found'}, status=http_status.HTTP_404_NOT_FOUND)
         
-        notifications = Notification.objects.filter(user=user, is_read=False).all()
-        serializer = NotificationSerializer(notifications, many=True)
+        unread = Notification.objects.filter(user=user, is_read=False)
+        # Older unread notifications are due for purging; the bound also lets the database skip old partitions
+        window_start = retention.unread_window_start()
+        if window_start is not None:
+            unread = unread.filter(created_at__gte=window_start)
+        unread = notifications.newest_first(unread)
+        compact = compact_response(request, unread, NOTIFICATION_LIST_FIELDS)
+        if compact is not None:
+            return compact
+        serializer = NotificationSerializer(unread.select_related('user'), many=True)
         return Response(serializer.data)
     
+NOTIFICATION_UPDATE_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    properties={
+        'is_read': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Is read')
+    }
+)
+
 class NotificationById(APIView):
     permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
     authentication_classes = [OAuth2Authentication]
@@ -2755,12 +3071,7 @@ class NotificationById(APIView):
         return Response(serializer.data)
     
     @swagger_auto_schema(
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            properties={
-                'is_read': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='Is read')
-            }
-        ),
+        request_body=NOTIFICATION_UPDATE_BODY,
         operation_summary='Mark notification as read',
         operation_description="Mark notification as read",
         responses={
@@ -2790,12 +3101,837 @@ class NotificationById(APIView):
     )
 
     def put(self, request, id):
+        return self.update(request, id)
+
+    @swagger_auto_schema(
+        operation_summary="Partially update notification",
+        operation_description="Update only the fields sent; only the columns that change are written. "
+                              "Send `Prefer: return=minimal` to get 204 No Content instead of the notification.",
+        request_body=NOTIFICATION_UPDATE_BODY,
+        responses={
+            200: openapi.Response("Notification updated", NotificationSerializer),
+            204: openapi.Response(description="Updated; sent for Prefer: return=minimal"),
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='id',
+                in_=openapi.IN_PATH,
+                type=openapi.TYPE_INTEGER,
+                required=True,
+                description="Notification ID"
+            ),
+            concurrency.PREFER_PARAMETER
+        ],
+        tags=["Notifications"]
+    )
+
+    def patch(self, request, id):
+        return self.update(request, id)
+
+    def update(self, request, id):
         user= request.user
         if not user:
             return Response({'message': 'User not found'}, status=http_status.HTTP_404_NOT_FOUND)
 
         notification = get_object_or_404(Notification, id=id)
-        notification.is_read = True
-        notification.save()
-        serializer = NotificationSerializer(notification)
-        return Response(serializer.data)
\ No newline at end of file
+        notification.save(update_fields=concurrency.assign(notification, {'is_read': request.data.get('is_read', True)}))
+        return concurrency.update_response(request, notification, NotificationSerializer)
+# Patient timeline view--------------------------------------------------------------------------------------------
+class PatientTimelineView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+
+    @swagger_auto_schema(
+        operation_summary="Patient timeline",
+        operation_description="Appointments, medical records and prescriptions of a patient merged newest first. "
+                              "Pass next_cursor back as cursor to read the next page. "
+                              "Requires doctor or admin privileges, or the patient's own account.",
+        responses={
+            200: openapi.Response(
+                description="One page of timeline entries",
+                examples={
+                    "application/json": {
+                        "results": [
+                            {
+                                "kind": "appointment",
+                                "id": 12,
+                                "at": "2025-01-10T09:00:00Z",
+                                "end_time": "2025-01-10T09:30:00Z",
+                                "status": "COMPLETED",
+                                "reason": "Checkup",
+                                "doctor_id": 3,
+                                "doctor_name": "Jane Doe"
+                            }
+                        ],
+                        "next_cursor": "MjAyNS0wMS0xMFQwOTowMDowMCswMDowMHwwfDEy"
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "message": "Invalid cursor"
+                    }
+                }
+            ),
+            403: openapi.Response(
+                description="Forbidden",
+                examples={
+                    "application/json": {
+                        "message": "You can only view your own timeline"
+                    }
+                }
+            ),
+            404: openapi.Response(
+                description="Not Found",
+                examples={
+                    "application/json": {
+                        "message": "Patient not found"
+                    }
+                }
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='cursor',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description="next_cursor of the previous page"
+            ),
+            openapi.Parameter(
+                name='limit',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description=f"Entries per page (default {timeline.DEFAULT_LIMIT}, max {timeline.MAX_LIMIT})"
+            )
+        ],
+        tags=['Patients']
+    )
+
+    def get(self, request, id):
+        user = request.user
+        patient = Patient.objects.filter(id=id).first()
+        if not patient:
+            return Response({'message': 'Patient not found'}, status=http_status.HTTP_404_NOT_FOUND)
+        if user.user_type == 'PATIENT' and patient.user_id != user.id:
+            return Response({'message': 'You can only view your own timeline'}, status=http_status.HTTP_403_FORBIDDEN)
+
+        try:
+            limit = int(request.query_params.get('limit', timeline.DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'message': 'limit must be an integer'}, status=http_status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, timeline.MAX_LIMIT))
+
+        try:
+            page = timeline.patient_timeline(patient.id, request.query_params.get('cursor'), limit)
+        except timeline.InvalidCursor as e:
+            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+        return Response({'patient_id': patient.id, **page})
+
+# Active medications and refills due views----------------------------------------------------------------------------
+class ActiveMedicationsView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+
+    @swagger_auto_schema(
+        operation_summary="Patient active medications",
+        operation_description="Medications the patient is currently taking, soonest to end first. "
+                              "Requires doctor or admin privileges, or the patient's own account.",
+        responses={
+            200: openapi.Response(
+                description="Active medications",
+                examples={
+                    "application/json": {
+                        "patient_id": 4,
+                        "results": [
+                            {
+                                "prescription_id": 17,
+                                "medication_name": "Amoxicillin",
+                                "dosage": "500mg",
+                                "frequency": "Three times daily",
+                                "start_date": "2025-01-10",
+                                "end_date": "2025-01-17",
+                                "refills_remaining": 1
+                            }
+                        ]
+                    }
+                }
+            ),
+            403: openapi.Response(
+                description="Forbidden",
+                examples={
+                    "application/json": {
+                        "message": "You can only view your own medications"
+                    }
+                }
+            ),
+            404: openapi.Response(
+                description="Not Found",
+                examples={
+                    "application/json": {
+                        "message": "Patient not found"
+                    }
+                }
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            )
+        ],
+        tags=['Prescriptions']
+    )
+
+    def get(self, request, id):
+        user = request.user
+        patient = Patient.objects.filter(id=id).first()
+        if not patient:
+            return Response({'message': 'Patient not found'}, status=http_status.HTTP_404_NOT_FOUND)
+        if user.user_type == 'PATIENT' and patient.user_id != user.id:
+            return Response({'message': 'You can only view your own medications'}, status=http_status.HTTP_403_FORBIDDEN)
+        return Response({'patient_id': patient.id, 'results': medications.active_medications(patient.id)})
+
+
+class RefillsDueView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+
+    @swagger_auto_schema(
+        operation_summary="Refills due",
+        operation_description="Refillable prescriptions across the hospital whose course ends within the next `days` days. "
+                              "Pass next_cursor back as cursor to read the next page. "
+                              "Requires doctor or admin privileges.",
+        responses={
+            200: openapi.Response(
+                description="One page of prescriptions due for a refill, by end date",
+                examples={
+                    "application/json": {
+                        "results": [
+                            {
+                                "patient_id": 4,
+                                "patient_name": "John Doe",
+                                "prescription_id": 17,
+                                "medication_name": "Amoxicillin",
+                                "dosage": "500mg",
+                                "frequency": "Three times daily",
+                                "start_date": "2025-01-10",
+                                "end_date": "2025-01-17",
+                                "refills_remaining": 1
+                            }
+                        ],
+                        "next_cursor": "MjAyNS0wMS0xN3wxNw"
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "message": "days must be an integer between 0 and 90"
+                    }
+                }
+            ),
+            403: openapi.Response(
+                description="Forbidden",
+                examples={
+                    "application/json": {
+                        "message": "Only doctors or admins can perform this action"
+                    }
+                }
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='days',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description="Look-ahead window in days (default 7)"
+            ),
+            openapi.Parameter(
+                name='cursor',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description="next_cursor of the previous page"
+            ),
+            openapi.Parameter(
+                name='limit',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description=f"Entries per page (default {medications.DEFAULT_REFILL_LIMIT}, max {medications.MAX_REFILL_LIMIT})"
+            )
+        ],
+        tags=['Prescriptions']
+    )
+
+    def get(self, request):
+        user = request.user
+        if user.user_type not in ['DOCTOR', 'ADMIN']:
+            return Response({'message': 'Only doctors or admins can perform this action'},
+                          status=http_status.HTTP_403_FORBIDDEN)
+        max_days = medications.MAX_REFILL_WINDOW_DAYS
+        try:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
+            days = -1
+        if not 0 <= days <= max_days:
+            return Response({'message': f'days must be an integer between 0 and {max_days}'},
+                          status=http_status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', medications.DEFAULT_REFILL_LIMIT))
+        except ValueError:
+            return Response({'message': 'limit must be an integer'}, status=http_status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, medications.MAX_REFILL_LIMIT))
+
+        try:
+            page = medications.refills_due(days, request.query_params.get('cursor'), limit)
+        except medications.InvalidCursor as e:
+            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+        return Response(page)
+
+# Doctor utilization analytics views------------------------------------------------------------------------------------
+ANALYTICS_RANGE_PARAMETERS = [
+    openapi.Parameter(
+        name='Authorization',
+        in_=openapi.IN_HEADER,
+        type=openapi.TYPE_STRING,
+        required=True,
+        description="Bearer token for authentication"
+    ),
+    openapi.Parameter(
+        name='start',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        required=False,
+        description=f"First day, YYYY-MM-DD (default {analytics.DEFAULT_RANGE_DAYS} days before end)"
+    ),
+    openapi.Parameter(
+        name='end',
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        required=False,
+        description=f"Last day, YYYY-MM-DD (default today, at most {analytics.MAX_RANGE_DAYS} days after start)"
+    )
+]
+
+class DoctorUtilizationView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+
+    @swagger_auto_schema(
+        operation_summary="Doctor utilization",
+        operation_description="Booked minutes over available minutes, no-show and cancellation rates per doctor "
+                              "for a date range, from the daily rollup. Doctors only see their own figures, "
+                              "admins see every doctor or one `doctor_id`.",
+        responses={
+            200: openapi.Response(
+                description="Totals and rates per doctor, busiest first",
+                examples={
+                    "application/json": {
+                        "start": "2025-01-01",
+                        "end": "2025-01-30",
+                        "results": [
+                            {
+                                "doctor_id": 3,
+                                "doctor_name": "Jane Smith",
+                                "appointments": 42,
+                                "booked_minutes": 1260,
+                                "completed": 35,
+                                "cancelled": 4,
+                                "no_show": 3,
+                                "available_minutes": 4800,
+                                "utilization": 0.2625,
+                                "no_show_rate": 0.0714,
+                                "cancellation_rate": 0.0952
+                            }
+                        ]
+                    }
+                }
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "message": "start and end must be dates in YYYY-MM-DD format"
+                    }
+                }
+            ),
+            403: openapi.Response(
+                description="Forbidden",
+                examples={
+                    "application/json": {
+                        "message": "Only doctors or admins can perform this action"
+                    }
+                }
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=ANALYTICS_RANGE_PARAMETERS + [
+            openapi.Parameter(
+                name='doctor_id',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description="Limit to one doctor (admins)"
+            )
+        ],
+        tags=['Analytics']
+    )
+
+    def get(self, request):
+        user = request.user
+        if user.user_type not in ['DOCTOR', 'ADMIN']:
+            return Response({'message': 'Only doctors or admins can perform this action'},
+                          status=http_status.HTTP_403_FORBIDDEN)
+        try:
+            start, end = analytics.parse_range(request.query_params.get('start'), request.query_params.get('end'))
+        except ValueError as e:
+            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+
+        doctor_ids = None
+        if user.user_type == 'DOCTOR':
+            doctor = Doctor.objects.filter(user=user).first()
+            if not doctor:
+                return Response({'message': 'Doctor not found'}, status=http_status.HTTP_404_NOT_FOUND)
+            doctor_ids = [doctor.id]
+        elif request.query_params.get('doctor_id'):
+            try:
+                doctor_ids = [int(request.query_params['doctor_id'])]
+            except ValueError:
+                return Response({'message': 'doctor_id must be an integer'}, status=http_status.HTTP_400_BAD_REQUEST)
+        return Response({'start': start, 'end': end, 'results': analytics.doctor_summary(start, end, doctor_ids)})
+
+class DoctorDailyStatsView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+
+    @swagger_auto_schema(
+        operation_summary="Doctor daily utilization",
+        operation_description="One entry per day with appointments or availability for a doctor. "
+                              "Doctors can only view their own figures, admins any doctor's.",
+        responses={
+            200: openapi.Response(
+                description="Daily counters and rates",
+                examples={
+                    "application/json": {
+                        "doctor_id": 3,
+                        "start": "2025-01-01",
+                        "end": "2025-01-30",
+                        "results": [
+                            {
+                                "date": "2025-01-06",
+                                "appointments": 6,
+                                "booked_minutes": 180,
+                                "completed": 5,
+                                "cancelled": 0,
+                                "no_show": 1,
+                                "available_minutes": 480,
+                                "utilization": 0.375,
+                                "no_show_rate": 0.1667,
+                                "cancellation_rate": 0.0
+                            }
+                        ]
+                    }
+                }
+            ),
+            403: openapi.Response(
+                description="Forbidden",
+                examples={
+                    "application/json": {
+                        "message": "You can only view your own figures"
+                    }
+                }
+            ),
+            404: openapi.Response(
+                description="Not Found",
+                examples={
+                    "application/json": {
+                        "message": "Doctor not found"
+                    }
+                }
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=ANALYTICS_RANGE_PARAMETERS,
+        tags=['Analytics']
+    )
+
+    def get(self, request, id):
+        user = request.user
+        if user.user_type not in ['DOCTOR', 'ADMIN']:
+            return Response({'message': 'Only doctors or admins can perform this action'},
+                          status=http_status.HTTP_403_FORBIDDEN)
+        doctor = Doctor.objects.filter(id=id).first()
+        if not doctor:
+            return Response({'message': 'Doctor not found'}, status=http_status.HTTP_404_NOT_FOUND)
+        if user.user_type == 'DOCTOR' and doctor.user_id != user.id:
+            return Response({'message': 'You can only view your own figures'}, status=http_status.HTTP_403_FORBIDDEN)
+        try:
+            start, end = analytics.parse_range(request.query_params.get('start'), request.query_params.get('end'))
+        except ValueError as e:
+            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'doctor_id': doctor.id, 'start': start, 'end': end, 'results': analytics.doctor_daily(doctor.id, start, end)
+        })
+
+class SpecializationStatsView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+
+    @swagger_auto_schema(
+        operation_summary="Specialization utilization",
+        operation_description="Utilization, no-show and cancellation rates per specialization for a date range. "
+                              "A doctor counts towards each of their specializations. Requires admin privileges.",
+        responses={
+            200: openapi.Response(
+                description="Totals and rates per specialization",
+                examples={
+                    "application/json": {
+                        "start": "2025-01-01",
+                        "end": "2025-01-30",
+                        "results": [
+                            {
+                                "specialization_id": 2,
+                                "specialization": "Cardiology",
+                                "doctors": 12,
+                                "appointments": 410,
+                                "booked_minutes": 12300,
+                                "completed": 350,
+                                "cancelled": 38,
+                                "no_show": 22,
+                                "available_minutes": 57600,
+                                "utilization": 0.2135,
+                                "no_show_rate": 0.0537,
+                                "cancellation_rate": 0.0927
+                            }
+                        ]
+                    }
+                }
+            ),
+            403: openapi.Response(
+                description="Forbidden",
+                examples={
+                    "application/json": {
+                        "message": "Only admins can perform this action"
+                    }
+                }
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=ANALYTICS_RANGE_PARAMETERS,
+        tags=['Analytics']
+    )
+
+    def get(self, request):
+        if request.user.user_type != 'ADMIN':
+            return Response({'message': 'Only admins can perform this action'}, status=http_status.HTTP_403_FORBIDDEN)
+        try:
+            start, end = analytics.parse_range(request.query_params.get('start'), request.query_params.get('end'))
+        except ValueError as e:
+            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+        return Response({'start': start, 'end': end, 'results': analytics.specialization_summary(start, end)})
+
+# Waitlist views------------------------------------------------------------------------------------------------------
+WAITLIST_ENTRY_EXAMPLE = {
+    "id": 12,
+    "patient": 4,
+    "doctor": 3,
+    "specialization": None,
+    "earliest_start": "2025-01-06T08:00:00Z",
+    "latest_end": "2025-01-20T17:00:00Z",
+    "duration_minutes": 30,
+    "reason": "Follow-up",
+    "status": "OFFERED",
+    "offered_doctor": 3,
+    "offered_start": "2025-01-07T10:00:00Z",
+    "offered_end": "2025-01-07T10:30:00Z",
+    "offer_expires_at": "2025-01-06T12:00:00Z",
+    "appointment": None,
+    "created_at": "2025-01-02T09:15:00Z",
+    "updated_at": "2025-01-06T10:00:00Z"
+}
+
+class WaitlistView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+
+    @swagger_auto_schema(
+        operation_summary="List waitlist entries",
+        operation_description="Patients see their own entries, doctors the entries waiting for them, admins all entries.",
+        responses={
+            200: openapi.Response(
+                description="Waitlist entries, longest waiting first",
+                examples={"application/json": [WAITLIST_ENTRY_EXAMPLE]}
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            ),
+            openapi.Parameter(
+                name='status',
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description="WAITING, OFFERED, BOOKED or WITHDRAWN"
+            )
+        ],
+        tags=['Waitlist']
+    )
+
+    def get(self, request):
+        user = request.user
+        entries = WaitlistEntry.objects.all()
+        if user.user_type == 'PATIENT':
+            entries = entries.filter(patient__user=user)
+        elif user.user_type == 'DOCTOR':
+            entries = entries.filter(doctor__user=user)
+        if request.query_params.get('status'):
+            entries = entries.filter(status=request.query_params['status'].upper())
+        return Response(WaitlistEntrySerializer(entries, many=True).data)
+
+    @swagger_auto_schema(
+        operation_summary="Join the waitlist",
+        operation_description="Wait for an earlier slot with a doctor, or with any doctor of a specialization. "
+                              "When a matching appointment is cancelled the slot is offered to the patient who has "
+                              "waited longest. Patients add themselves; doctors and admins pass `patient_id`.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'doctor_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'specialization_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'earliest_start': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                'latest_end': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                'duration_minutes': openapi.Schema(type=openapi.TYPE_INTEGER, default=30),
+                'reason': openapi.Schema(type=openapi.TYPE_STRING),
+                'patient_id': openapi.Schema(type=openapi.TYPE_INTEGER)
+            },
+            required=['earliest_start', 'latest_end']
+        ),
+        responses={
+            201: openapi.Response(
+                description="Entry created",
+                examples={"application/json": dict(WAITLIST_ENTRY_EXAMPLE, status="WAITING", offered_doctor=None,
+                                                   offered_start=None, offered_end=None, offer_expires_at=None)}
+            ),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={
+                    "application/json": {
+                        "message": "Either doctor_id or specialization_id is required"
+                    }
+                }
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            )
+        ],
+        tags=['Waitlist']
+    )
+
+    def post(self, request):
+        user = request.user
+        data = request.data
+        if user.user_type == 'PATIENT':
+            patient = Patient.objects.filter(user=user).first()
+        else:
+            patient = Patient.objects.filter(id=data.get('patient_id')).first() if data.get('patient_id') else None
+        if not patient:
+            return Response({'message': 'Patient not found'}, status=http_status.HTTP_404_NOT_FOUND)
+
+        doctor_id = data.get('doctor_id')
+        specialization_id = data.get('specialization_id')
+        if not doctor_id and not specialization_id:
+            return Response({'message': 'Either doctor_id or specialization_id is required'},
+                            status=http_status.HTTP_400_BAD_REQUEST)
+        doctor = Doctor.objects.filter(id=doctor_id).first() if doctor_id else None
+        if doctor_id and not doctor:
+            return Response({'message': 'Doctor not found'}, status=http_status.HTTP_404_NOT_FOUND)
+        specialization = Specialization.objects.filter(id=specialization_id).first() if specialization_id else None
+        if specialization_id and not specialization:
+            return Response({'message': 'Specialization not found'}, status=http_status.HTTP_404_NOT_FOUND)
+
+        try:
+            earliest_start, latest_end = parse_datetimes([data.get('earliest_start'), data.get('latest_end')])
+            duration_minutes = int(data.get('duration_minutes', 30))
+        except ValueError as e:
+            return Response({'message': str(e)}, status=http_status.HTTP_400_BAD_REQUEST)
+        if latest_end <= max(earliest_start, timezone.now()):
+            return Response({'message': 'latest_end must be in the future and after earliest_start'},
+                            status=http_status.HTTP_400_BAD_REQUEST)
+        if not 0 < duration_minutes <= (latest_end - earliest_start).total_seconds() // 60:
+            return Response({'message': 'duration_minutes must be positive and fit between earliest_start and latest_end'},
+                            status=http_status.HTTP_400_BAD_REQUEST)
+
+        entry = WaitlistEntry.objects.create(
+            patient=patient, doctor=doctor, specialization=specialization, earliest_start=earliest_start,
+            latest_end=latest_end, duration_minutes=duration_minutes, reason=data.get('reason'),
+        )
+        return Response(WaitlistEntrySerializer(entry).data, status=http_status.HTTP_201_CREATED)
+
+def get_waitlist_entry(user, id):
+    """The entry if `user` may act on it: its patient, the doctor it waits for, or an admin"""
+    entry = get_object_or_404(WaitlistEntry.objects.select_related('patient', 'doctor'), id=id)
+    if user.user_type == 'ADMIN':
+        return entry
+    if user.user_type == 'PATIENT' and entry.patient.user_id == user.id:
+        return entry
+    if user.user_type == 'DOCTOR' and entry.doctor is not None and entry.doctor.user_id == user.id:
+        return entry
+    return None
+
+class WaitlistByIdView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+
+    @swagger_auto_schema(
+        operation_summary="Get waitlist entry",
+        operation_description="Available to the patient, the doctor the entry waits for, and admins.",
+        responses={
+            200: openapi.Response(description="Waitlist entry", examples={"application/json": WAITLIST_ENTRY_EXAMPLE}),
+            403: openapi.Response(
+                description="Forbidden",
+                examples={"application/json": {"message": "You cannot access this waitlist entry"}}
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            )
+        ],
+        tags=['Waitlist']
+    )
+
+    def get(self, request, id):
+        entry = get_waitlist_entry(request.user, id)
+        if entry is None:
+            return Response({'message': 'You cannot access this waitlist entry'}, status=http_status.HTTP_403_FORBIDDEN)
+        return Response(WaitlistEntrySerializer(entry).data)
+
+    @swagger_auto_schema(
+        operation_summary="Leave the waitlist",
+        operation_description="Withdraws the entry. A slot it was holding is offered to the next patient.",
+        responses={
+            200: openapi.Response(description="Withdrawn entry", examples={"application/json": dict(
+                WAITLIST_ENTRY_EXAMPLE, status="WITHDRAWN", offered_doctor=None, offered_start=None,
+                offered_end=None, offer_expires_at=None)}),
+            400: openapi.Response(
+                description="Bad Request",
+                examples={"application/json": {"message": "Only waiting or offered entries can be withdrawn"}}
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            )
+        ],
+        tags=['Waitlist']
+    )
+
+    def delete(self, request, id):
+        entry = get_waitlist_entry(request.user, id)
+        if entry is None:
+            return Response({'message': 'You cannot access this waitlist entry'}, status=http_status.HTTP_403_FORBIDDEN)
+        if entry.status not in ['WAITING', 'OFFERED']:
+            return Response({'message': 'Only waiting or offered entries can be withdrawn'},
+                            status=http_status.HTTP_400_BAD_REQUEST)
+        return Response(WaitlistEntrySerializer(waitlist.withdraw(entry)).data)
+
+class WaitlistOfferView(APIView):
+    permission_classes = [IsAuthenticated, TokenHasReadWriteScope]
+    authentication_classes = [OAuth2Authentication]
+    decision = 'accept'
+
+    @swagger_auto_schema(
+        operation_summary="Accept or decline a waitlist offer",
+        operation_description="`accept/` books the offered slot and returns the appointment. `decline/` keeps the "
+                              "patient waiting and offers the slot to the next patient. Only the patient or an admin "
+                              "can answer an offer.",
+        responses={
+            200: openapi.Response(description="Booked appointment (accept) or the entry (decline)"),
+            409: openapi.Response(
+                description="Conflict",
+                examples={"application/json": {"message": "The offer has expired"}}
+            )
+        },
+        security=[{'Bearer': []}],
+        manual_parameters=[
+            openapi.Parameter(
+                name='Authorization',
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description="Bearer token for authentication"
+            )
+        ],
+        tags=['Waitlist']
+    )
+
+    def post(self, request, id):
+        entry = get_waitlist_entry(request.user, id)
+        if entry is None or request.user.user_type == 'DOCTOR':
+            return Response({'message': 'Only the patient or an admin can answer this offer'},
+                            status=http_status.HTTP_403_FORBIDDEN)
+        try:
+            if self.decision == 'decline':
+                return Response(WaitlistEntrySerializer(waitlist.decline_offer(entry)).data)
+            appointment = waitlist.accept_offer(entry)
+        except waitlist.OfferUnavailable as e:
+            return Response({'message': str(e)}, status=http_status.HTTP_409_CONFLICT)
+        return Response(AppointmentSerializer(appointment).data, status=http_status.HTTP_201_CREATED)
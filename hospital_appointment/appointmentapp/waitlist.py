@@ -0,0 +1,186 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import Doctor
+from . import analytics, notifications
+from .datetimes import format_local
+from .models import Appointment, WaitlistEntry
+
+ACTIVE_STATUSES = ('SCHEDULED', 'CONFIRMED')
+CANDIDATE_SCAN = 50  # Waiting entries examined per freed slot, oldest first
+
+
+class OfferUnavailable(Exception):
+    """Raised when a waitlist offer can no longer be accepted"""
+
+
+def freed_slot(appointment, now=None):
+    """(doctor_id, start, end) an upcoming active appointment would free, or None"""
+    now = now or timezone.now()
+    if appointment.status not in ACTIVE_STATUSES or appointment.scheduled_time <= now:
+        return None
+    return appointment.doctor_id, appointment.scheduled_time, appointment.end_time
+
+
+def offer_freed_slot(slot, exclude_patient_id=None):
+    """Offer a freed slot once the transaction that freed it commits"""
+    if slot is not None:
+        transaction.on_commit(lambda: offer_slot(*slot, exclude_patient_id=exclude_patient_id))
+
+
+def candidates(doctor_id, start, end, exclude_patient_id=None, exclude_entry_ids=()):
+    """Waiting entries whose window contains the start of the slot and whose visit fits in it, longest waiting first"""
+    slot_minutes = int((end - start).total_seconds() // 60)
+    specializations = Doctor.specializations.through.objects.filter(doctor_id=doctor_id).values('specialization_id')
+    entries = WaitlistEntry.objects.filter(
+        Q(doctor_id=doctor_id) | Q(doctor__isnull=True, specialization_id__in=specializations),
+        status='WAITING', earliest_start__lte=start, latest_end__gt=start, duration_minutes__lte=slot_minutes,
+    )
+    if exclude_patient_id is not None:
+        entries = entries.exclude(patient_id=exclude_patient_id)
+    if exclude_entry_ids:
+        entries = entries.exclude(id__in=exclude_entry_ids)
+    return entries.order_by('created_at', 'id')
+
+
+def offer_slot(doctor_id, start, end, exclude_patient_id=None, exclude_entry_ids=(), now=None):
+    """Hold the slot for the best waiting patient and notify them. Returns the entry, or None"""
+    now = now or timezone.now()
+    if start <= now:
+        return None
+    with transaction.atomic():
+        entries = candidates(doctor_id, start, end, exclude_patient_id, exclude_entry_ids).select_for_update(
+            skip_locked=True, of=('self',)
+        )
+        for entry in entries[:CANDIDATE_SCAN]:
+            offered_end = start + timedelta(minutes=entry.duration_minutes)
+            if offered_end > entry.latest_end:
+                continue
+            entry.status = 'OFFERED'
+            entry.offered_doctor_id = doctor_id
+            entry.offered_start = start
+            entry.offered_end = offered_end
+            entry.offer_expires_at = min(now + timedelta(minutes=settings.WAITLIST_OFFER_MINUTES), start)
+            entry.offer_excluded_patient_id = exclude_patient_id
+            entry.offer_passed_over = sorted(exclude_entry_ids)
+            entry.save(update_fields=[
+                'status', 'offered_doctor', 'offered_start', 'offered_end', 'offer_expires_at',
+                'offer_excluded_patient', 'offer_passed_over', 'updated_at'
+            ])
+            doctor = Doctor.objects.select_related('user').get(id=doctor_id)
+            notifications.notify(
+                entry.patient.user_id, notifications.WAITLIST,
+                f"A slot with Dr. {doctor.user.get_full_name()} on {format_local(start)} is available. "
+                f"Accept it before {format_local(entry.offer_expires_at)}",
+            )
+            return entry
+    return None
+
+
+def _release(entry):
+    """Put an offered entry back to waiting. Returns the offer_slot arguments that pass its slot on"""
+    handoff = {
+        'doctor_id': entry.offered_doctor_id, 'start': entry.offered_start, 'end': entry.offered_end,
+        'exclude_patient_id': entry.offer_excluded_patient_id,
+        'exclude_entry_ids': [*entry.offer_passed_over, entry.id],
+    }
+    entry.status = 'WAITING'
+    entry.offered_doctor = entry.offer_excluded_patient = None
+    entry.offered_start = entry.offered_end = entry.offer_expires_at = None
+    entry.offer_passed_over = []
+    entry.save(update_fields=[
+        'status', 'offered_doctor', 'offered_start', 'offered_end', 'offer_expires_at',
+        'offer_excluded_patient', 'offer_passed_over', 'updated_at'
+    ])
+    return handoff
+
+
+def _pass_on(handoff, now=None):
+    # Offer the same slot to the next candidate, skipping everyone who already had it
+    if handoff is not None and handoff['doctor_id'] is not None:
+        offer_slot(**handoff, now=now)
+
+
+def accept_offer(entry, now=None):
+    """Book the offered slot as an appointment, raising OfferUnavailable if it expired or was taken"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        entry = WaitlistEntry.objects.select_for_update().get(id=entry.id)
+        if entry.status != 'OFFERED':
+            raise OfferUnavailable('There is no open offer for this entry')
+        expired = entry.offer_expires_at <= now
+        taken = not expired and Appointment.objects.filter(
+            doctor_id=entry.offered_doctor_id, status__in=ACTIVE_STATUSES,
+            scheduled_time__lt=entry.offered_end, end_time__gt=entry.offered_start,
+        ).exists()
+        appointment = None
+        if not expired and not taken:
+            try:
+                with transaction.atomic():
+                    appointment = Appointment.objects.create(
+                        patient_id=entry.patient_id, doctor_id=entry.offered_doctor_id,
+                        scheduled_time=entry.offered_start, end_time=entry.offered_end,
+                        status='SCHEDULED', reason=entry.reason or 'Booked from the waitlist',
+                    )
+            except IntegrityError:
+                taken = True
+        if appointment is None:
+            handoff = _release(entry)
+        else:
+            analytics.apply_appointment_change(None, analytics.snapshot(appointment))
+            entry.status = 'BOOKED'
+            entry.appointment = appointment
+            entry.save(update_fields=['status', 'appointment', 'updated_at'])
+            notifications.notify(
+                appointment.doctor.user_id, notifications.WAITLIST,
+                f"Waitlisted patient booked the freed slot on {format_local(appointment.scheduled_time)}",
+            )
+            return appointment
+    if taken:
+        raise OfferUnavailable('The slot has already been taken')
+    _pass_on(handoff, now)
+    raise OfferUnavailable('The offer has expired')
+
+
+def decline_offer(entry, now=None):
+    """Return the entry to waiting and offer the slot to the next candidate"""
+    with transaction.atomic():
+        entry = WaitlistEntry.objects.select_for_update().get(id=entry.id)
+        if entry.status != 'OFFERED':
+            raise OfferUnavailable('There is no open offer for this entry')
+        handoff = _release(entry)
+    _pass_on(handoff)
+    return entry
+
+
+def withdraw(entry):
+    """Take the entry off the waitlist, passing on any slot it was holding"""
+    with transaction.atomic():
+        entry = WaitlistEntry.objects.select_for_update().get(id=entry.id)
+        handoff = _release(entry) if entry.status == 'OFFERED' else None
+        entry.status = 'WITHDRAWN'
+        entry.save(update_fields=['status', 'updated_at'])
+    _pass_on(handoff)
+    return entry
+
+
+def expire_offers(now=None):
+    """Release offers nobody answered in time and pass each slot on. Returns how many expired"""
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            entry = (
+                WaitlistEntry.objects.select_for_update(skip_locked=True)
+                .filter(status='OFFERED', offer_expires_at__lte=now).order_by('offer_expires_at').first()
+            )
+            if entry is None:
+                return expired
+            handoff = _release(entry)
+        expired += 1
+        # Timed from the same `now`, so the new offer is not expired within this run
+        _pass_on(handoff, now)
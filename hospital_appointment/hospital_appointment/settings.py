@@ -51,7 +51,8 @@ CORS_ALLOW_HEADERS = [
     'origin',
     'x-custom-header',  
     'X-Frame-Options',  
-    'x-frontend-host'
+    'x-frontend-host',
+    'x-timezone',
 ]
 CORS_ORIGIN_WHITELIST = [
     'http://localhost:5173',  
@@ -107,17 +108,21 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'appointmentapp.metrics.RequestMetricsMiddleware',
+    'appointmentapp.profiling.QueryProfilerMiddleware',
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'appointmentapp.middleware.AsyncWhiteNoiseMiddleware',
     "django.middleware.common.CommonMiddleware",
     'corsheaders.middleware.CorsMiddleware',
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    'oauth2_provider.middleware.OAuth2TokenMiddleware',
+    'appointmentapp.datetimes.TimezoneMiddleware',
 ]
+# Every middleware above runs on the event loop under ASGI. oauth2_provider's OAuth2TokenMiddleware is left
+# out: it is sync-only and does nothing without OAuth2Backend; the API views authenticate bearer tokens themselves.
 
 ROOT_URLCONF = "hospital_appointment.urls"
 
@@ -138,6 +143,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "hospital_appointment.wsgi.application"
+ASGI_APPLICATION = "hospital_appointment.asgi.application"
 AUTH_USER_MODEL = "users.UserDetails"
 LOGIN_URL = '/login'
 
@@ -246,10 +252,69 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         # 'rest_framework.permissions.IsAuthenticated',
         'rest_framework.permissions.AllowAny',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'appointmentapp.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'appointmentapp.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-
+# ---------Metrics---------------------------------------------------------------
+# Per-endpoint latency, query and payload histograms exposed on /metrics
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # Bearer token required to scrape
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)  # Serve /metrics without METRICS_TOKEN, e.g. locally
+
+# ---------Query profiler---------------------------------------------------------
+# Flags statements repeated within one request (N+1 patterns) in the log and the X-Query-Profile header
+QUERY_PROFILER_ENABLED = config('QUERY_PROFILER_ENABLED', default=False, cast=bool)  # Set True in development and CI
+QUERY_PROFILER_THRESHOLD = config('QUERY_PROFILER_THRESHOLD', default=5, cast=int)  # Repeats of one statement shape
+QUERY_PROFILER_RAISE = config('QUERY_PROFILER_RAISE', default=False, cast=bool)  # Fail the request, e.g. in CI
+
+# ---------Benchmarks---------------------------------------------------------
+# appointmentapp.tests.test_benchmarks compares the run_benchmarks scenarios with benchmarks/test_suite_<database>.json
+BENCHMARK_TEST_THRESHOLD = config('BENCHMARK_TEST_THRESHOLD', default=0, cast=float)  # Median slowdown (%) that fails, 0 skips latency
+BENCHMARK_SAVE_BASELINE = config('BENCHMARK_SAVE_BASELINE', default=False, cast=bool)  # Rewrite the baseline instead of comparing
+
+# ---------Appointment reminders---------------------------------------------------------
+APPOINTMENT_REMINDER_LEAD_MINUTES = config('APPOINTMENT_REMINDER_LEAD_MINUTES', default=24 * 60, cast=int)  # Before the start
+REMINDER_BATCH_SIZE = config('REMINDER_BATCH_SIZE', default=500, cast=int)  # Reminders claimed per transaction
+
+# ---------Appointment sweeper---------------------------------------------------------
+# Status given to appointments still open this long after their end time, as FROM=TO pairs
+APPOINTMENT_SWEEP_POLICY = config('APPOINTMENT_SWEEP_POLICY', default='SCHEDULED=NO_SHOW,CONFIRMED=NO_SHOW,IN_PROGRESS=COMPLETED')
+APPOINTMENT_SWEEP_GRACE_MINUTES = config('APPOINTMENT_SWEEP_GRACE_MINUTES', default=60, cast=int)
+APPOINTMENT_SWEEP_BATCH_SIZE = config('APPOINTMENT_SWEEP_BATCH_SIZE', default=1000, cast=int)
+APPOINTMENT_SWEEP_NOTIFY = config('APPOINTMENT_SWEEP_NOTIFY', default=True, cast=bool)  # Tell patients about the new status
+
+# ---------Waitlist---------------------------------------------------------
+WAITLIST_OFFER_MINUTES = config('WAITLIST_OFFER_MINUTES', default=120, cast=int)  # How long a freed slot is held for a patient
+
+# ---------Idempotency keys---------------------------------------------------------
+IDEMPOTENCY_KEY_TTL_HOURS = config('IDEMPOTENCY_KEY_TTL_HOURS', default=24, cast=int)  # How long a create can be safely retried
+
+# ---------Table partitions---------------------------------------------------------
+PARTITION_MONTHS_AHEAD = config('PARTITION_MONTHS_AHEAD', default=3, cast=int)  # Future monthly partitions kept ready
+PARTITION_RETAIN_MONTHS = config('PARTITION_RETAIN_MONTHS', default=0, cast=int)  # Older partitions are detached, 0 keeps all
+
+# ---------Notification retention---------------------------------------------------------
+NOTIFICATION_READ_TTL_DAYS = config('NOTIFICATION_READ_TTL_DAYS', default=30, cast=int)  # Read notifications kept, 0 keeps all
+NOTIFICATION_UNREAD_TTL_DAYS = config('NOTIFICATION_UNREAD_TTL_DAYS', default=180, cast=int)  # Unread ones, 0 keeps all
+NOTIFICATION_PURGE_BATCH_SIZE = config('NOTIFICATION_PURGE_BATCH_SIZE', default=5000, cast=int)  # Rows deleted per transaction
+NOTIFICATION_ARCHIVE = config('NOTIFICATION_ARCHIVE', default=False, cast=bool)  # Copy purged rows to the archive table
+
+# ---------Notification digests---------------------------------------------------------
+# Similar events for one user within this window are merged into one digest notification, 0 disables
+NOTIFICATION_COALESCE_MINUTES = config('NOTIFICATION_COALESCE_MINUTES', default=60, cast=int)
+
+# ---------Async views---------------------------------------------------------
+ASYNC_LONG_POLL_MAX_SECONDS = config('ASYNC_LONG_POLL_MAX_SECONDS', default=30, cast=int)  # Cap on ?wait= for long-polls
+ASYNC_LONG_POLL_INTERVAL_SECONDS = config('ASYNC_LONG_POLL_INTERVAL_SECONDS', default=2, cast=float)  # Re-check period
@@ -18,6 +18,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from appointmentapp import views
+from appointmentapp.metrics import metrics_view
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
@@ -39,6 +40,7 @@ schema_view = get_schema_view(
 urlpatterns = [    
     path('', views.main),
     path("admin/", admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/v1/', include('appointmentapp.urls')),
     path('api/v1/auth/', include('users.urls')),
     
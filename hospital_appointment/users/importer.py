@@ -0,0 +1,216 @@
+import csv
+import json
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Patient, UserDetails
+from .services import register_users
+
+USER_FIELDS = ['phone_number', 'email', 'first_name', 'last_name', 'date_of_birth']
+PATIENT_FIELDS = [
+    'gender', 'address', 'emergency_contact_name', 'emergency_contact_phone',
+    'insurance_provider', 'insurance_policy_number',
+]
+# Column names accepted in place of the model field names, e.g. the keys RegisterPatient reads
+ALIASES = {
+    'phone': 'phone_number',
+    'dob': 'date_of_birth',
+    'insuarance_provider': 'insurance_provider',
+    'insuarance_policy': 'insurance_policy_number',
+    'insurance_policy': 'insurance_policy_number',
+}
+GENDERS = {code.lower(): code for code, _ in Patient.GENDER_CHOICES}
+GENDERS.update({label.lower(): code for code, label in Patient.GENDER_CHOICES})
+MAX_LENGTHS = {
+    'phone_number': 15, 'email': 254, 'first_name': 150, 'last_name': 150, 'emergency_contact_name': 100,
+    'emergency_contact_phone': 15, 'insurance_provider': 100, 'insurance_policy_number': 50,
+}
+
+
+class RowError(ValueError):
+    """Raised when an import row cannot be turned into a patient"""
+
+
+def read_rows(path, file_format=None):
+    """Yield (line number, row) from a CSV or NDJSON file without loading it in memory"""
+    file_format = file_format or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            if not isinstance(row, dict):
+                row = {'__error__': 'Invalid JSON object', 'raw': line.strip()}
+            yield line_number, row
+
+
+def clean_row(row):
+    """Normalised user and patient fields of one row, or RowError"""
+    if '__error__' in row:
+        raise RowError(row['__error__'])
+    data = {}
+    for key, value in row.items():
+        if key is None:
+            raise RowError('Row has more columns than the header')
+        key = ALIASES.get(key.strip().lower(), key.strip().lower())
+        if isinstance(value, str):
+            value = value.strip()
+        data[key] = value if value not in ('', None) else None
+
+    if not data.get('phone_number') or not data.get('email'):
+        raise RowError('Phone number and email are required')
+    data['phone_number'] = str(data['phone_number'])
+    data['email'] = UserDetails.objects.normalize_email(data['email'])
+    try:
+        validate_email(data['email'])
+    except ValidationError:
+        raise RowError(f'Invalid email {data["email"]}')
+    for field, length in MAX_LENGTHS.items():
+        if data.get(field) and len(str(data[field])) > length:
+            raise RowError(f'{field} is longer than {length} characters')
+
+    if data.get('date_of_birth'):
+        try:
+            data['date_of_birth'] = date.fromisoformat(str(data['date_of_birth']))
+        except ValueError:
+            raise RowError('Invalid date_of_birth. Use YYYY-MM-DD')
+    if data.get('gender'):
+        gender = GENDERS.get(str(data['gender']).lower())
+        if gender is None:
+            raise RowError(f'Invalid gender {data["gender"]}')
+        data['gender'] = gender
+
+    return {field: data.get(field) for field in USER_FIELDS + PATIENT_FIELDS}
+
+
+class PatientImporter:
+    """Validate, deduplicate and bulk insert patients chunk by chunk, one transaction per chunk.
+
+    Users and patient profiles are created with users.services.register_users, a few bulk inserts per
+    chunk instead of the per-row post_save profile signal.
+    """
+
+    def __init__(self, chunk_size=1000, on_error=None, on_chunk=None, stats=None):
+        self.chunk_size = chunk_size
+        self.on_error = on_error
+        self.on_chunk = on_chunk
+        self.stats = stats or {'created': 0, 'duplicates': 0, 'invalid': 0}
+        # Phones and emails already taken by earlier rows of the file
+        self.seen_phones = set()
+        self.seen_emails = set()
+
+    def run(self, rows, start_after=0):
+        chunk = []
+        for line, row in rows:
+            if line <= start_after:
+                continue
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self.stats
+
+    def reject(self, line, row, message, reason):
+        self.stats[reason] += 1
+        if self.on_error:
+            self.on_error(line, row, message)
+
+    def import_chunk(self, chunk):
+        valid = []
+        for line, row in chunk:
+            try:
+                valid.append((line, row, clean_row(row)))
+            except RowError as e:
+                self.reject(line, row, str(e), 'invalid')
+
+        accepted = self.deduplicate(valid)
+        try:
+            with transaction.atomic():
+                create_patients([data for _, _, data in accepted])
+        except IntegrityError:
+            # Someone registered one of these contacts since the lookup, check the accepted rows again
+            accepted = self.create_one_by_one(self.deduplicate(accepted))
+
+        for _, _, data in accepted:
+            self.seen_phones.add(data['phone_number'])
+            self.seen_emails.add(data['email'].lower())
+        self.stats['created'] += len(accepted)
+        if self.on_chunk:
+            self.on_chunk(chunk[-1][0], self.stats)
+
+    def create_one_by_one(self, rows):
+        """Insert rows separately, rejecting those that still conflict with a registration made meanwhile"""
+        created = []
+        for line, row, data in rows:
+            try:
+                with transaction.atomic():
+                    create_patients([data])
+            except IntegrityError:
+                self.reject(line, row, f'Phone number {data["phone_number"]} is already registered', 'duplicates')
+            else:
+                created.append((line, row, data))
+        return created
+
+    def deduplicate(self, rows):
+        """Rows whose phone and email are new to the database and to the file so far"""
+        taken_phones, taken_emails = existing_contacts(
+            {data['phone_number'] for _, _, data in rows}, {data['email'] for _, _, data in rows}
+        )
+        accepted, phones, emails = [], set(), set()
+        for line, row, data in rows:
+            phone, email = data['phone_number'], data['email'].lower()
+            if phone in taken_phones or phone in self.seen_phones or phone in phones:
+                self.reject(line, row, f'Phone number {phone} is already registered', 'duplicates')
+            elif email in taken_emails or email in self.seen_emails or email in emails:
+                self.reject(line, row, f'Email {data["email"]} is already registered', 'duplicates')
+            else:
+                phones.add(phone)
+                emails.add(email)
+                accepted.append((line, row, data))
+        return accepted
+
+
+def existing_contacts(phones, emails):
+    """Phones and lower-cased emails among the given ones that already belong to a user"""
+    if not phones and not emails:
+        return set(), set()
+    taken_phones, taken_emails = set(), set()
+    # Stored emails keep the case they were registered with
+    rows = UserDetails.objects.annotate(email_lower=Lower('email')).filter(
+        Q(username__in=phones) | Q(phone_number__in=phones) | Q(email_lower__in={email.lower() for email in emails})
+    ).values_list('username', 'phone_number', 'email')
+    for username, phone_number, email in rows:
+        taken_phones.update((username, phone_number))
+        if email:
+            taken_emails.add(email.lower())
+    return taken_phones, taken_emails
+
+
+def create_patients(rows):
+    """Bulk insert users and their patient profiles for already validated rows"""
+    return register_users([
+        {
+            'fields': {
+                'username': data['phone_number'], 'user_type': 'PATIENT', 'phone_number': data['phone_number'],
+                'email': data['email'], 'first_name': data['first_name'] or '', 'last_name': data['last_name'] or '',
+                'date_of_birth': data['date_of_birth'],
+            },
+            'profile': {field: data[field] for field in PATIENT_FIELDS},
+        }
+        for data in rows
+    ])
@@ -0,0 +1,62 @@
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import importer
+
+
+class Command(BaseCommand):
+    help = 'Import patients from a CSV or NDJSON file in chunks, resuming from the last committed chunk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header row, or one JSON object per line (.ndjson/.jsonl)')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--errors', help='Where rejected rows are written (default <path>.errors.csv)')
+        parser.add_argument('--checkpoint', help='Progress file used to resume (default <path>.checkpoint.json)')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} not found')
+        errors_path = options['errors'] or f'{path}.errors.csv'
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint.json'
+
+        checkpoint = {'line': 0, 'stats': None}
+        if os.path.exists(checkpoint_path) and not options['restart']:
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            self.stdout.write(f'Resuming after line {checkpoint["line"]}')
+
+        resuming = checkpoint['line'] > 0
+        with open(errors_path, 'a' if resuming else 'w', newline='') as errors_file:
+            errors = csv.writer(errors_file)
+            if not resuming:
+                errors.writerow(['line', 'error', 'row'])
+
+            def on_error(line, row, message):
+                errors.writerow([line, message, json.dumps(row, default=str)])
+
+            def on_chunk(line, stats):
+                # Written only after the chunk committed, so a crash replays at most one chunk
+                errors_file.flush()
+                with open(checkpoint_path, 'w') as f:
+                    json.dump({'source': os.path.abspath(path), 'line': line, 'stats': stats}, f)
+                self.stdout.write(
+                    f'line {line}: {stats["created"]} created, {stats["duplicates"]} duplicates, {stats["invalid"]} invalid'
+                )
+
+            patient_importer = importer.PatientImporter(
+                options['chunk_size'], on_error=on_error, on_chunk=on_chunk, stats=checkpoint['stats']
+            )
+            stats = patient_importer.run(importer.read_rows(path, options['format']), start_after=checkpoint['line'])
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats["created"]} patients, {stats["duplicates"]} duplicates and {stats["invalid"]} invalid rows '
+            f'(see {errors_path})'
+        ))
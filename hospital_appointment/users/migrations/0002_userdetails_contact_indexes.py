@@ -0,0 +1,21 @@
+# Generated by Django 4.2.18 on 2026-10-19 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userdetails",
+            index=models.Index(fields=["phone_number"], name="userdetails_phone_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="userdetails",
+            index=models.Index(fields=["email"], name="userdetails_email_idx"),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.18 on 2026-10-19 18:50
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_userdetails_contact_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userdetails",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"),
+                name="userdetails_email_lower_idx",
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser, UserManager, AbstractBaseUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -50,13 +51,23 @@ class UserDetails(AbstractUser):
     # USERNAME_FIELD = 'username'
     # REQUIRED_FIELDS = ['email']
     # objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Registration looks up username, email and phone number together (users.services.find_conflicts)
+            models.Index(fields=['phone_number'], name='userdetails_phone_idx'),
+            models.Index(fields=['email'], name='userdetails_email_idx'),
+            # The patient importer matches emails case-insensitively (users.importer.existing_contacts)
+            models.Index(Lower('email'), name='userdetails_email_lower_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.user_type})"
     
 @receiver(post_save, sender=UserDetails)
 def create_user_profile(sender, instance, created, **kwargs):
-    if created:
+    # users.services creates the profile itself, with its fields filled in
+    if created and not getattr(instance, '_skip_profile_signal', False):
         if instance.user_type == 'PATIENT':
             Patient.objects.create(user=instance)
         elif instance.user_type == 'DOCTOR':
@@ -1,4 +1,5 @@
 from .models import *
+from .services import register_user
 from rest_framework import serializers
 # from django.contrib.auth.models import User
 
@@ -15,13 +16,15 @@ class UserSerializer(serializers.ModelSerializer):
         
     # Function to harsh password
     def create(self, validated_data):
-        password=validated_data.pop('password', None)
-        instance= self.Meta.model(**validated_data)
-        if password is not None:
-            instance.set_password(password)
-        instance.save()
-        return instance
+        specialization_ids = validated_data.pop('specialization_ids', None) or ()
+        return register_user(validated_data, specialization_ids=specialization_ids)
     
+class RegistrationSerializer(UserSerializer):
+    """UserSerializer for sign up, uniqueness is checked up front by users.services.find_conflicts"""
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {**UserSerializer.Meta.extra_kwargs, 'username': {'required': True, 'validators': []}}
+
+
 class PatientSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     class Meta:
@@ -41,4 +44,13 @@ class DoctorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
         fields = ['id', 'user', 'specializations', 'license_number', 'years_of_experience', 'hospital_affiliation', 'biography', 'consultation_fee', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['created_at', 'updated_at']
+
+# List views pass their querysets through these so the nested serializers above read every
+# row's user and specializations from one joined query and one prefetch, not a query per row
+def patient_related(queryset, prefix=''):
+    return queryset.select_related(f'{prefix}user')
+
+
+def doctor_related(queryset, prefix=''):
+    return queryset.select_related(f'{prefix}user').prefetch_related(f'{prefix}specializations')
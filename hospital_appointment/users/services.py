@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Doctor, Patient, Specialization, UserDetails
+
+PROFILE_MODELS = {'PATIENT': Patient, 'DOCTOR': Doctor}
+
+
+class InvalidSpecialization(ValueError):
+    """Raised when a registration references specializations that do not exist"""
+
+
+CONFLICT_MESSAGES = {
+    'username': 'Username already exists',
+    'email': 'Email already exists',
+    'phone_number': 'Phone number already exists',
+}
+
+
+def find_conflicts(**values):
+    """Every field among username, email and phone_number already taken by another user, in one query"""
+    values = {field: value for field, value in values.items() if field in CONFLICT_MESSAGES and value}
+    if not values:
+        return {}
+    lookup = Q()
+    for field, value in values.items():
+        lookup |= Q(**{field: value})
+    conflicts = {}
+    for row in UserDetails.objects.filter(lookup).values(*values):
+        for field, value in values.items():
+            if row[field] == value:
+                conflicts[field] = CONFLICT_MESSAGES[field]
+    # Report in a stable order regardless of which rows matched first
+    return {field: conflicts[field] for field in CONFLICT_MESSAGES if field in conflicts}
+
+
+def resolve_specializations(ids):
+    """Specializations by id in one query, or InvalidSpecialization naming the missing ids"""
+    ids = {int(spec_id) for spec_id in ids}
+    found = Specialization.objects.in_bulk(ids)
+    missing = sorted(ids - set(found))
+    if missing:
+        raise InvalidSpecialization(f'Invalid specialization: {", ".join(map(str, missing))}')
+    return found
+
+
+def build_user(fields):
+    fields = dict(fields)
+    password = fields.pop('password', None)
+    user = UserDetails(**fields)
+    if password is not None:
+        user.set_password(password)
+    else:
+        user.set_unusable_password()
+    return user
+
+
+def assign_specializations(doctors_and_ids):
+    """One bulk insert into the doctor/specialization through table"""
+    through = Doctor.specializations.through
+    through.objects.bulk_create([
+        through(doctor_id=doctor.pk, specialization_id=spec_id)
+        for doctor, spec_ids in doctors_and_ids
+        for spec_id in spec_ids
+    ], ignore_conflicts=True)
+
+
+@transaction.atomic
+def register_user(fields, profile=None, specialization_ids=()):
+    """Create a user, its patient or doctor profile and specializations as one unit of work"""
+    specializations = resolve_specializations(specialization_ids) if specialization_ids else {}
+    user = build_user(fields)
+    # The profile is created here with its fields, instead of empty by the post_save receiver
+    user._skip_profile_signal = True
+    user.save()
+
+    profile_model = PROFILE_MODELS.get(user.user_type)
+    if profile_model is not None:
+        instance = profile_model.objects.create(user=user, **(profile or {}))
+        if profile_model is Doctor and specializations:
+            assign_specializations([(instance, specializations)])
+    return user
+
+
+@transaction.atomic
+def register_users(entries):
+    """Bulk version of register_user.
+
+    `entries` are dicts with `fields` (user fields, optional `password`), optional `profile` and
+    `specialization_ids`. Returns the created users in the same order.
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+    resolve_specializations({spec_id for entry in entries for spec_id in entry.get('specialization_ids') or ()})
+
+    users = UserDetails.objects.bulk_create([build_user(entry['fields']) for entry in entries])
+    if users[0].pk is None:
+        # Backends without RETURNING on bulk inserts
+        ids = dict(UserDetails.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+        for user in users:
+            user.pk = ids[user.username]
+
+    for user_type, profile_model in PROFILE_MODELS.items():
+        pairs = [(user, entry) for user, entry in zip(users, entries) if user.user_type == user_type]
+        if not pairs:
+            continue
+        profiles = profile_model.objects.bulk_create([
+            profile_model(user_id=user.pk, **(entry.get('profile') or {})) for user, entry in pairs
+        ])
+        if profile_model is Doctor:
+            if profiles[0].pk is None:
+                ids = dict(Doctor.objects.filter(user_id__in=[user.pk for user, _ in pairs]).values_list('user_id', 'id'))
+                for profile in profiles:
+                    profile.pk = ids[profile.user_id]
+            assign_specializations([
+                (profile, entry.get('specialization_ids') or ()) for profile, (_, entry) in zip(profiles, pairs)
+            ])
+    return users
@@ -1,3 +1,45 @@
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from .importer import PatientImporter, existing_contacts
+from .models import Patient, UserDetails
+
+
+def rows(*contacts):
+    return [(line, {'phone': phone, 'email': email, 'first_name': 'Test'})
+            for line, (phone, email) in enumerate(contacts, start=2)]
+
+
+class PatientImporterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        UserDetails.objects.create_user(username='0700000001', email='Jane.Doe@Example.com',
+                                        phone_number='0700000001', user_type='PATIENT')
+
+    def import_rows(self, *contacts):
+        errors = []
+        importer = PatientImporter(on_error=lambda line, row, message: errors.append((line, message)))
+        return importer.run(rows(*contacts)), errors
+
+    def test_existing_emails_match_case_insensitively(self):
+        _, taken_emails = existing_contacts({'0711000001'}, {'JANE.DOE@example.com'})
+        self.assertEqual(taken_emails, {'jane.doe@example.com'})
+
+    def test_email_registered_in_another_case_is_a_duplicate(self):
+        stats, errors = self.import_rows(('0711000001', 'jane.doe@EXAMPLE.com'), ('0711000002', 'new@example.com'))
+
+        self.assertEqual(stats, {'created': 1, 'duplicates': 1, 'invalid': 0})
+        self.assertEqual(errors, [(2, 'Email jane.doe@example.com is already registered')])
+        self.assertTrue(Patient.objects.filter(user__username='0711000002').exists())
+
+    def test_conflict_after_the_lookup_rejects_only_the_conflicting_row(self):
+        # As if 0700000001 registered between the duplicate lookup and the insert
+        with mock.patch('users.importer.existing_contacts', return_value=(set(), set())):
+            stats, errors = self.import_rows(('0700000001', 'other@example.com'), ('0711000003', 'third@example.com'))
+
+        self.assertEqual(stats, {'created': 1, 'duplicates': 1, 'invalid': 0})
+        self.assertEqual(errors, [(2, 'Phone number 0700000001 is already registered')])
+        self.assertTrue(Patient.objects.filter(user__username='0711000003').exists())
+        self.assertFalse(UserDetails.objects.filter(email='other@example.com').exists())
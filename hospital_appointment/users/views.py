@@ -14,8 +14,11 @@ import json
 from datetime import datetime, timedelta
 import decouple
 from .utility import *
+from .services import register_user, find_conflicts
+from django.db import IntegrityError
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from appointmentapp.projections import LIST_VIEW_PARAMETERS, DOCTOR_LIST_FIELDS, PATIENT_LIST_FIELDS, compact_response
 
 client_id= decouple.config('CLIENT_ID')
 client_secret= decouple.config('CLIENT_SECRET')
@@ -70,38 +73,23 @@ class RegisterUser(APIView):
             if not username or not password or not email or not phone_number or not user_type:
                 return Response({'message': 'Please provide all the required fields'}, status=status.HTTP_400_BAD_REQUEST)
             
-            if UserDetails.objects.filter(username=username).exists():
-                return Response({'message': 'Username already exists'}, status=status.HTTP_400_BAD_REQUEST)
+            conflicts = find_conflicts(username=username, email=email, phone_number=phone_number)
+            if conflicts:
+                return Response({'message': ', '.join(conflicts.values()), 'conflicts': conflicts}, status=status.HTTP_400_BAD_REQUEST)
             
-            if UserDetails.objects.filter(email=email).exists():
-                return Response({'message': 'Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
+            if user_type == 'DOCTOR' and not specialisations:
+                return Response({'message': 'Please provide specializations'}, status=status.HTTP_400_BAD_REQUEST)
             
-            if UserDetails.objects.filter(phone_number=phone_number).exists():
-                return Response({'message': 'Phone number already exists'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            serializer = UserSerializer(data=request.data)
+            serializer = RegistrationSerializer(data=request.data)
             if serializer.is_valid():
-                saved_user= serializer.save()
-                if saved_user:
-                    if user_type == 'DOCTOR':
-                        if not specialisations:
-                            return Response({'message': 'Please provide specializations'}, status=status.HTTP_400_BAD_REQUEST)
-                        
-                        for spec in specialisations:
-                            specialization= Specialization.objects.get(id=spec)
-                            if not specialization:
-                                return Response({'message': 'Invalid specialization'}, status=status.HTTP_400_BAD_REQUEST)
-                            
-                            doctor= Doctor.objects.filter(user=saved_user).first()
-                            if not doctor:
-                                doctor= Doctor.objects.create(user=saved_user, specialization=specialization)
-                            doctor.specializations.add(specialization)
-                            doctor.save()
-                        
-                    # elif user_type == 'patient':
-                    #     patient= Patient.objects.get(user=saved_user)
-                    #     patient.save()
-                    
+                # User, profile and specializations are created in one transaction (users.services)
+                try:
+                    serializer.save(specialization_ids=specialisations if user_type == 'DOCTOR' else None)
+                except IntegrityError:
+                    # Lost a race with a concurrent sign up, the unique username constraint caught it
+                    conflicts = find_conflicts(username=username, email=email, phone_number=phone_number)
+                    return Response({'message': ', '.join(conflicts.values()) or 'User already exists', 'conflicts': conflicts},
+                                    status=status.HTTP_400_BAD_REQUEST)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
@@ -588,7 +576,8 @@ class GetDoctorsListView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=["Staff"]
     )
@@ -596,7 +585,10 @@ class GetDoctorsListView(APIView):
     def get(self, request, format=None):
         try:
             doctors = Doctor.objects.all()
-            serializer = DoctorSerializer(doctors, many=True)
+            compact = compact_response(request, doctors, DOCTOR_LIST_FIELDS)
+            if compact is not None:
+                return compact
+            serializer = DoctorSerializer(doctor_related(doctors), many=True)
             return Response(serializer.data)
         except Exception as e:
             return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -710,26 +702,27 @@ class RegisterPatient(APIView):
         if not phone_number or not email:
             return Response({'message': 'Please provide phone number and email'}, status=status.HTTP_400_BAD_REQUEST)
         
-        new_user= UserDetails.objects.create(username=phone_number, 
-                                      email=email, 
-                                      phone_number=phone_number, 
-                                      user_type=user_type,
-                                      first_name=first_name,
-                                      last_name=last_name,
-                                      date_of_birth= dob,
-                                      )
+        new_user= register_user(
+            {
+                'username': phone_number,
+                'email': email,
+                'phone_number': phone_number,
+                'user_type': user_type,
+                'first_name': first_name or '',
+                'last_name': last_name or '',
+                'date_of_birth': dob,
+            },
+            profile={
+                'gender': gender,
+                'address': address,
+                'emergency_contact_name': emergency_contact_name,
+                'emergency_contact_phone': emergency_contact_phone,
+                'insurance_policy_number': insuarance_policy,
+                'insurance_provider': insuarance_provider,
+            },
+        )
+        patient= new_user.patient_profile
         
-        patient= None
-        if new_user:
-            patient= Patient.objects.filter(user=new_user).first()
-            patient.gender= gender
-            patient.address= address
-            patient.emergency_contact_name= emergency_contact_name
-            patient.emergency_contact_phone=  emergency_contact_phone
-            patient.insurance_policy_number= insuarance_policy
-            patient.insurance_provider= insuarance_provider
-            patient.save()
-            
         res= {'message': 'Patient registered successfully', 'patient': PatientSerializer(patient).data}
         return Response(res, status=status.HTTP_201_CREATED)
 
@@ -755,7 +748,8 @@ class PatientListView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=["Patients"]
     )
@@ -763,7 +757,10 @@ class PatientListView(APIView):
     def get(self, request, format=None):
         try:
             patients= Patient.objects.all()
-            serializer = PatientSerializer(patients, many=True)
+            compact = compact_response(request, patients, PATIENT_LIST_FIELDS)
+            if compact is not None:
+                return compact
+            serializer = PatientSerializer(patient_related(patients), many=True)
             return Response(serializer.data)
         except Exception as e:
             return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -890,7 +887,8 @@ class PatientSearchView(APIView):
                 type=openapi.TYPE_STRING,
                 required=True,
                 description="Bearer token for authentication"
-            )
+            ),
+            *LIST_VIEW_PARAMETERS
         ],
         tags=["Patients"]
     )
@@ -906,7 +904,10 @@ class PatientSearchView(APIView):
                 models.Q(user__phone_number__icontains=search_term)
             )[:15]
             
-            serializer = PatientSerializer(patients, many=True)
+            compact = compact_response(request, patients, PATIENT_LIST_FIELDS)
+            if compact is not None:
+                return compact
+            serializer = PatientSerializer(patient_related(patients), many=True)
             return Response(serializer.data) 
         except Exception as e:
             return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)